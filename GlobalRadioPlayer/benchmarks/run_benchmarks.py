@@ -0,0 +1,451 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, os.pardir, "src"))
+
+from catalog_sync import CatalogSync
+from facets import FACETS, FacetIndex
+from http_client import MirrorPool, RadioHTTPClient
+from main import GlobalRadioApp
+from persistence import DebouncedWriter
+from player import RadioPlayer
+from radio_api import RadioAPI
+from rate_limiter import TokenBucket
+from response_cache import ResponseCache
+from search_engine import SearchEngine
+from station import load_snapshot, save_snapshot
+from station_model import EVENT_FAVORITE, StationModel
+from station_store import StationStore
+from stream_prober import StreamProber
+from stub_server import StubRadioBrowser
+
+DEFAULT_SIZES = (200, 5_000, 50_000, 500_000)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+RESULT_VERSION = 1
+# 逐字输入的搜索词，每输入一个字符测一次（和搜索框的行为一致）
+TYPED_QUERIES = ("jazz radio", "classic rock fm", "北京音乐", "nova")
+SORT_COLUMNS = ("name", "country", "bitrate")
+SCROLL_POSITIONS = 50  # 列表滚动测试的视口位置数
+FAVORITE_TOGGLES = 50
+LARGE_CATALOG = 50_000  # 超过这个大小的目录，耗时很长的项目只测一次
+
+
+# ---- 计时 ----
+
+def summarize(samples: Sequence[float]) -> Dict[str, Any]:
+    """把一组耗时（秒）汇总为毫秒统计"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "median_ms": round(ordered[count // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(count - 1, int(round(0.95 * (count - 1))))] * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+        "runs": count,
+    }
+
+
+def measure(func: Callable[[], Any], runs: int) -> Dict[str, Any]:
+    """执行runs次并统计耗时；每次执行前做一次垃圾回收，避免把回收时间算进上一项"""
+    samples = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+class Samples:
+    """逐次累积的耗时样本（用于每次输入、每次滚动这类分散的操作）"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def time(self, func: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = func()
+        self.samples.append(time.perf_counter() - start)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize(self.samples)
+
+
+# ---- 被测对象的替身 ----
+
+class FixedMirrors(MirrorPool):
+    """只有一个固定地址的镜像池（指向本地模拟服务，不做DNS发现和测速）"""
+
+    def __init__(self, address: str):
+        super().__init__()
+        self.address = address
+
+    def hosts(self) -> List[str]:
+        return [self.address]
+
+
+class FakeListView:
+    """VirtualTreeview的替身：和虚拟列表一样只为视口内的行生成内容，不需要显示器"""
+
+    def __init__(self, row_builder: Callable[[Any], tuple], visible_rows: int = 18):
+        self.row_builder = row_builder
+        self.visible_rows = visible_rows
+        self.items: Sequence[Any] = []
+        self.top = 0
+        self.rows: List[tuple] = []
+
+    def set_items(self, items: Sequence[Any], keep_position: bool = True):
+        self.items = items
+        if not keep_position:
+            self.top = 0
+        self.top = max(0, min(self.top, len(items) - self.visible_rows))
+        self.render()
+
+    def scroll_to(self, top: int):
+        self.top = max(0, min(top, len(self.items) - self.visible_rows))
+        self.render()
+
+    def refresh_key(self, key: Any):
+        self.render()
+
+    def render(self):
+        items = self.items
+        self.rows = [self.row_builder(items[index])
+                     for index in range(self.top, min(len(items), self.top + self.visible_rows))]
+
+
+class _Label:
+    def config(self, **kwargs):
+        pass
+
+
+class _Var:
+    def __init__(self, value: str = ""):
+        self.value = value
+
+    def get(self) -> str:
+        return self.value
+
+    def set(self, value: str):
+        self.value = value
+
+
+class BenchApp:
+    """借用GlobalRadioApp中与窗口无关的列表逻辑（筛选、搜索结果处理、行内容生成），列表换成FakeListView"""
+
+    SEARCH_RESULT_LIMIT = GlobalRadioApp.SEARCH_RESULT_LIMIT
+    _update_radio_list = GlobalRadioApp._update_radio_list
+    _run_search = GlobalRadioApp._run_search
+    _on_search_result = GlobalRadioApp._on_search_result
+    _refresh_radio_display = GlobalRadioApp._refresh_radio_display
+    _build_radio_row = GlobalRadioApp._build_radio_row
+
+    def __init__(self, model: StationModel, engine: SearchEngine, facet_index: FacetIndex):
+        self.model = model
+        self.search_engine = engine
+        self.facet_index = facet_index
+        self.prober = StreamProber()
+        self.player = RadioPlayer(config_path=None)
+        self.current_view = "all"
+        self.facet_selections: Dict[str, str] = {}
+        self.sort_column: Optional[str] = None
+        self.sort_reverse = False
+        self.filtered_radios: Sequence[Any] = []
+        self.count_label = _Label()
+        self.status_var = _Var()
+        self.radio_list = FakeListView(self._build_radio_row)
+
+    def type_query(self, query: str):
+        """模拟搜索框输入后的完整处理：搜索、筛选、刷新列表（不经过防抖和后台线程）"""
+        results = self._run_search(query, lambda: False, self.search_engine, None,
+                                   self.facet_index, self.facet_selections)
+        self._on_search_result(query, results)
+
+
+# ---- 基准测试 ----
+
+def bench_catalog(size: int, repeat: int, seed: int) -> Dict[str, Any]:
+    """一种目录大小下的全部测试：同步、加载、搜索、筛选、排序、列表绘制、收藏"""
+    heavy_runs = repeat if size <= LARGE_CATALOG else 1
+    results: Dict[str, Any] = {}
+    with StubRadioBrowser(size, seed) as stub:
+        api = _make_api(stub, "api_cache")
+
+        # 全量同步：分页请求模拟服务并写入本地电台库（每次都是新库）
+        stores = []
+
+        def full_import():
+            store = StationStore(f"store_{len(stores)}.db")
+            stores.append(store)
+            api.store = store
+            CatalogSync(api, store).sync()
+        results["sync_full_import"] = measure(full_import, heavy_runs)
+        store = stores.pop()
+        for old in stores:
+            old.close()
+        api.store = store
+        results["sync_delta"] = measure(lambda: CatalogSync(api, store).sync(), repeat)
+
+        # 冷启动加载：读库、建索引、快照
+        radios = []
+
+        def query():
+            radios[:] = store.query(playable_only=True, compact=True)
+        results["catalog_query"] = measure(query, heavy_runs)
+        # 建立新索引前先释放上一次的，大目录重复建立时不会同时占用两份内存
+        built = {}
+
+        def build_search():
+            built.pop("engine", None)
+            built["engine"] = SearchEngine(radios)
+
+        def build_facets():
+            built.pop("facets", None)
+            built["facets"] = FacetIndex(radios)
+        results["search_index_build"] = measure(build_search, heavy_runs)
+        results["facet_index_build"] = measure(build_facets, heavy_runs)
+        engine, facet_index = built["engine"], built["facets"]
+        results["snapshot_save"] = measure(lambda: save_snapshot(radios, "snapshot.bin"), heavy_runs)
+        results["snapshot_load"] = measure(lambda: load_snapshot("snapshot.bin"), heavy_runs)
+        results["snapshot_bytes"] = os.path.getsize("snapshot.bin")
+        model = StationModel()
+        results["model_load"] = measure(lambda: model.load(radios), repeat)
+        store.close()
+
+    app = BenchApp(model, engine, facet_index)
+    results["stations"] = len(radios)
+
+    # 列表：全部电台、筛选、排序
+    results["list_all"] = measure(app._update_radio_list, repeat)
+    selections = _facet_selections(facet_index)
+    filter_samples, count_samples = Samples(), Samples()
+    for _ in range(repeat):
+        for selection in selections:
+            app.facet_selections = selection
+            filter_samples.time(app._update_radio_list)
+            count_samples.time(lambda: _facet_counts(facet_index, selection))
+    app.facet_selections = {}
+    results["facet_filter"] = filter_samples.summary()
+    results["facet_counts"] = count_samples.summary()
+    sort_samples = Samples()
+    for _ in range(repeat):
+        for column in SORT_COLUMNS:
+            for reverse in (False, True):
+                app.sort_column, app.sort_reverse = column, reverse
+                sort_samples.time(app._update_radio_list)
+    app.sort_column, app.sort_reverse = None, False
+    results["facet_sort"] = sort_samples.summary()
+
+    # 搜索：逐字输入，每个字符一次完整的搜索和列表刷新
+    keystroke_samples = Samples()
+    for _ in range(repeat):
+        for query in TYPED_QUERIES:
+            for length in range(1, len(query) + 1):
+                prefix = query[:length]
+                if prefix.strip():
+                    keystroke_samples.time(lambda: app.type_query(prefix))
+    results["search_keystroke"] = keystroke_samples.summary()
+
+    # 列表绘制：在全部电台中滚动
+    app._update_radio_list()
+    view = app.radio_list
+    step = max(1, len(view.items) // SCROLL_POSITIONS)
+    scroll_samples = Samples()
+    for _ in range(repeat):
+        for top in range(0, len(view.items), step):
+            scroll_samples.time(lambda: view.scroll_to(top))
+    results["render_scroll"] = scroll_samples.summary()
+
+    # 收藏：切换收藏、修补列表行并登记保存（和GlobalRadioApp.save_favorites一样交给后台写入）
+    writer = DebouncedWriter(delay=60, max_delay=60)
+    model.subscribe(lambda event, payload: view.refresh_key(payload[0]) if event == EVENT_FAVORITE else None)
+    station_ids = [radio.get("stationuuid") for radio in radios[::max(1, len(radios) // FAVORITE_TOGGLES)]]
+    toggle_samples = Samples()
+    for _ in range(repeat):
+        for station_id in station_ids:
+            toggle_samples.time(lambda: (model.toggle_favorite(station_id),
+                                         writer.write_json("favorites.json", model.favorite_records(),
+                                                           ensure_ascii=False)))
+    results["favorite_toggle"] = toggle_samples.summary()
+    results["favorites_flush"] = measure(writer.flush, 1)
+    writer.close()
+    return results
+
+
+def bench_cache(repeat: int, seed: int) -> Dict[str, Any]:
+    """响应缓存的读写和经由模拟服务的接口请求（与目录大小无关）"""
+    results: Dict[str, Any] = {}
+    runs = repeat * 20
+    with StubRadioBrowser(1000, seed) as stub:
+        cache = ResponseCache(disk_dir="bench_cache")
+        api = _make_api(stub, "api_cache", cache)
+        payload = json.loads(stub.page(0, 200))
+        results["cache_set"] = measure(lambda: cache.set("stations/?limit=200", payload), runs)
+        results["cache_memory_hit"] = measure(lambda: cache.get("stations/?limit=200"), runs)
+
+        def disk_hit():
+            # 新实例没有内存层，只能从磁盘读取
+            ResponseCache(disk_dir="bench_cache").get("stations/?limit=200")
+        results["cache_disk_hit"] = measure(disk_hit, runs)
+
+        def fetch_cold():
+            api.cache.clear()
+            api.get_popular_radios(200)
+        results["api_fetch_cold"] = measure(fetch_cold, runs)
+        results["api_fetch_warm"] = measure(lambda: api.get_popular_radios(200), runs)
+    return results
+
+
+def _make_api(stub: StubRadioBrowser, cache_dir: str, cache: Optional[ResponseCache] = None) -> RadioAPI:
+    """连接模拟服务的RadioAPI（不限速）"""
+    http = RadioHTTPClient(mirrors=FixedMirrors(stub.address), scheme="http", max_attempts=1)
+    return RadioAPI(cache=cache or ResponseCache(disk_dir=cache_dir), http=http,
+                    limiter=TokenBucket(rate=1e9, burst=1_000_000))
+
+
+def _facet_selections(facet_index: FacetIndex) -> List[Dict[str, str]]:
+    """常用的筛选组合：每个分面的最大取值，以及国家和其他分面的组合"""
+    top = {}
+    for facet in FACETS:
+        counts = facet_index.counts(facet, {})
+        if counts:
+            top[facet] = counts[0][0]
+    selections = [{facet: value} for facet, value in top.items()]
+    if "country" in top:
+        selections += [{"country": top["country"], facet: value}
+                       for facet, value in top.items() if facet != "country"]
+    return selections
+
+
+def _facet_counts(facet_index: FacetIndex, selections: Dict[str, str]):
+    """和筛选下拉框刷新时一样，计算每个分面的取值计数和总数"""
+    for facet in FACETS:
+        facet_index.counts(facet, selections)
+        facet_index.total({f: v for f, v in selections.items() if f != facet})
+
+
+# ---- 结果比较 ----
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[Dict[str, Any]]:
+    """与基线比较中位数，变慢超过threshold（比例）且超过min_delta_ms的项目视为退化"""
+    changes = []
+    for group, metrics in current["results"].items():
+        base_metrics = baseline.get("results", {}).get(group, {})
+        for name, value in metrics.items():
+            base = base_metrics.get(name)
+            if not isinstance(value, dict) or not isinstance(base, dict):
+                continue
+            now_ms, base_ms = value["median_ms"], base["median_ms"]
+            ratio = now_ms / base_ms if base_ms > 0 else float("inf")
+            changes.append({
+                "metric": f"{group}.{name}",
+                "baseline_ms": base_ms,
+                "current_ms": now_ms,
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + threshold and now_ms - base_ms > min_delta_ms,
+            })
+    return changes
+
+
+def print_report(report: Dict[str, Any], changes: Optional[List[Dict[str, Any]]]):
+    """在标准错误输出可读的结果表"""
+    by_metric = {change["metric"]: change for change in changes or ()}
+    for group, metrics in report["results"].items():
+        print(f"\n[{group}]", file=sys.stderr)
+        for name, value in metrics.items():
+            if not isinstance(value, dict):
+                print(f"  {name:<22}{value:>12}", file=sys.stderr)
+                continue
+            line = f"  {name:<22}{value['median_ms']:>12.3f} ms  p95 {value['p95_ms']:>10.3f} ms  x{value['runs']}"
+            change = by_metric.get(f"{group}.{name}")
+            if change is not None:
+                line += f"  {change['ratio']:>6.2f}x 基线"
+                if change["regression"]:
+                    line += "  <-- 退化"
+            print(line, file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="全球广播播放器性能基准测试")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="目录大小，逗号分隔（默认%(default)s）")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（默认%(default)s）")
+    parser.add_argument("--seed", type=int, default=0, help="生成目录的随机种子")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="结果JSON的保存路径，为-时输出到标准输出（默认%(default)s）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="用于比较的基线文件（默认%(default)s）")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="中位数变慢超过这个比例视为退化（默认%(default)s）")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="变慢的绝对值低于这个毫秒数时忽略（默认%(default)s）")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    report: Dict[str, Any] = {
+        "version": RESULT_VERSION,
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    # 被测模块会在当前目录写缓存和配置文件，在临时目录中运行
+    workdir = tempfile.mkdtemp(prefix="radio_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for size in sizes:
+            print(f"目录大小 {size} ...", file=sys.stderr)
+            report["results"][f"catalog_{size}"] = bench_catalog(size, args.repeat, args.seed)
+        print("响应缓存 ...", file=sys.stderr)
+        report["results"]["cache"] = bench_cache(args.repeat, args.seed)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    changes = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            changes = compare(report, json.load(f), args.threshold, args.min_delta_ms)
+        report["comparison"] = {
+            "baseline": os.path.abspath(args.baseline),
+            "threshold": args.threshold,
+            "changes": changes,
+            "regressions": [change["metric"] for change in changes if change["regression"]],
+        }
+    print_report(report, changes)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"\n结果已保存：{args.output}", file=sys.stderr)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"\n已保存基线：{args.baseline}", file=sys.stderr)
+    if changes and any(change["regression"] for change in changes):
+        print(f"\n性能退化：{', '.join(report['comparison']['regressions'])}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
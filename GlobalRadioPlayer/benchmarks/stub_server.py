@@ -0,0 +1,103 @@
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import iter_stations
+
+BLOCK_SIZE = 256  # 每个压缩块中的电台数
+
+
+class StubRadioBrowser:
+    """本地的radio-browser模拟服务，提供/json/stations和/json/stations/search接口
+
+    电台在启动时生成并按块压缩保存在内存中，响应时只需解压和拼接，
+    服务本身的开销不会明显计入被测的同步时间。电台按lastchangetime升序排列，
+    reverse=true时倒序。请求计数在requests中。
+    """
+
+    def __init__(self, count: int, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.count = count
+        self._blocks: List[bytes] = []
+        block: List[bytes] = []
+        for station in iter_stations(count, seed):
+            block.append(json.dumps(station, ensure_ascii=False).encode("utf-8"))
+            if len(block) == BLOCK_SIZE:
+                self._blocks.append(zlib.compress(b"\n".join(block), 1))
+                block = []
+        if block:
+            self._blocks.append(zlib.compress(b"\n".join(block), 1))
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "StubRadioBrowser":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="stub-radio-browser")
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubRadioBrowser":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def page(self, offset: int, limit: int, reverse: bool = False) -> bytes:
+        """按偏移量取一页电台，返回JSON数组"""
+        if reverse:
+            end = max(0, self.count - offset)
+            start = max(0, end - limit)
+        else:
+            start = min(offset, self.count)
+            end = min(self.count, start + limit)
+        rows: List[bytes] = []
+        for number in range(start // BLOCK_SIZE, (end + BLOCK_SIZE - 1) // BLOCK_SIZE):
+            block = zlib.decompress(self._blocks[number]).split(b"\n")
+            base = number * BLOCK_SIZE
+            rows.extend(block[max(0, start - base):end - base])
+        if reverse:
+            rows.reverse()
+        return b"[" + b",".join(rows) + b"]"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if not parts.path.startswith("/json/stations"):
+                    self.send_error(404)
+                    return
+                params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                try:
+                    offset = int(params.get("offset", 0))
+                    limit = int(params.get("limit", 100000))
+                except ValueError:
+                    self.send_error(400)
+                    return
+                body = stub.page(offset, limit, params.get("reverse") == "true")
+                stub.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
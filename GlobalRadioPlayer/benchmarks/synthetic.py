@@ -0,0 +1,107 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+# 字段和取值分布仿照radio_cache.json（radio-browser的/json/stations接口返回的格式）
+COUNTRIES = [
+    ("The United States Of America", "US", "english"), ("Germany", "DE", "german"),
+    ("France", "FR", "french"), ("The United Kingdom Of Great Britain And Northern Ireland", "GB", "english"),
+    ("China", "CN", "chinese"), ("Japan", "JP", "japanese"), ("Brazil", "BR", "portuguese"),
+    ("Spain", "ES", "spanish"), ("Italy", "IT", "italian"), ("Russia", "RU", "russian"),
+    ("Mexico", "MX", "spanish"), ("Canada", "CA", "english"), ("Australia", "AU", "english"),
+    ("Netherlands", "NL", "dutch"), ("Poland", "PL", "polish"), ("Greece", "GR", "greek"),
+    ("Türkiye", "TR", "turkish"), ("India", "IN", "hindi"), ("Argentina", "AR", "spanish"),
+    ("Austria", "AT", "german"), ("Switzerland", "CH", "german"), ("Sweden", "SE", "swedish"),
+]
+TAGS = [
+    "pop", "rock", "news", "jazz", "classical", "talk", "dance", "electronic", "hits", "music",
+    "80s", "90s", "oldies", "country", "top 40", "chillout", "ambient", "lounge", "hip-hop", "rnb",
+    "folk", "metal", "blues", "soul", "reggae", "latin", "christian", "sports", "community radio",
+    "public radio", "easy listening", "classic rock", "alternative", "indie", "house", "techno",
+    "trance", "world music", "kids", "comedy", "local news", "university radio", "schlager", "chanson",
+]
+WORDS = [
+    "radio", "fm", "classic", "hits", "jazz", "rock", "news", "city", "one", "love", "sound", "wave",
+    "music", "live", "star", "sun", "nova", "energy", "kiss", "beat", "soul", "gold", "vinyl", "night",
+    "morning", "metro", "coast", "valley", "river", "mountain", "bay", "capital", "central", "smooth",
+    "deep", "urban", "retro", "planet", "zone", "groove", "chill", "lounge", "pulse", "echo", "orbit",
+    "北京", "音乐", "之声", "東京", "ラジオ", "Música", "Café", "Köln", "Zürich", "Москва",
+]
+CODECS = [("MP3", 60), ("AAC", 20), ("AAC+", 10), ("OGG", 5), ("FLAC", 2), ("", 3)]
+BITRATES = [(128, 45), (192, 12), (320, 8), (64, 10), (96, 6), (256, 4), (48, 4), (0, 11)]
+
+_EPOCH = datetime(2020, 1, 1)
+
+
+def _weighted(rng: random.Random, choices) -> object:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def make_station(index: int, seed: int = 0) -> Dict:
+    """按编号确定性地生成一个电台（同样的编号和种子总是得到同样的电台）"""
+    rng = random.Random(seed * 1_000_003 + index)
+    country, countrycode, language = COUNTRIES[min(int(rng.paretovariate(1.2)) - 1, len(COUNTRIES) - 1)]
+    name = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.3:
+        name += f" {rng.randint(87, 108)}.{rng.randint(0, 9)}"
+    host = f"stream{index % 97}.example-{index % 13}.net"
+    url = f"http://{host}/{uuid.UUID(int=index + 1).hex[:12]}"
+    if rng.random() < 0.15:
+        url += rng.choice((".m3u", ".pls", ".m3u8"))
+    url_resolved = f"https://{host}/live/{index}" if rng.random() < 0.97 else ""
+    # 热度呈长尾分布：少数电台票数很高
+    votes = min(int(rng.paretovariate(0.8)) - 1, 500_000)
+    changed = _EPOCH + timedelta(seconds=index * 37 + rng.randint(0, 30))
+    checked = changed + timedelta(days=rng.randint(0, 30))
+    return {
+        "changeuuid": str(uuid.UUID(int=(seed << 64) | (index * 2 + 1))),
+        "stationuuid": str(uuid.UUID(int=(seed << 64) | (index * 2))),
+        "serveruuid": None,
+        "name": name,
+        "url": url,
+        "url_resolved": url_resolved,
+        "homepage": f"https://{host}/",
+        "favicon": f"https://{host}/favicon.png" if rng.random() < 0.6 else "",
+        "tags": ",".join(rng.sample(TAGS, rng.randint(0, 6))),
+        "country": country,
+        "countrycode": countrycode,
+        "iso_3166_2": None,
+        "state": "",
+        "language": language if rng.random() < 0.9 else "",
+        "languagecodes": "",
+        "votes": votes,
+        "lastchangetime": changed.strftime("%Y-%m-%d %H:%M:%S"),
+        "lastchangetime_iso8601": changed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "codec": _weighted(rng, CODECS),
+        "bitrate": _weighted(rng, BITRATES),
+        "hls": 1 if url.endswith(".m3u8") else 0,
+        "lastcheckok": 1 if rng.random() < 0.9 else 0,
+        "lastchecktime": checked.strftime("%Y-%m-%d %H:%M:%S"),
+        "lastchecktime_iso8601": checked.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "lastcheckoktime": checked.strftime("%Y-%m-%d %H:%M:%S"),
+        "lastcheckoktime_iso8601": checked.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "lastlocalchecktime": checked.strftime("%Y-%m-%d %H:%M:%S"),
+        "lastlocalchecktime_iso8601": checked.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "clicktimestamp": checked.strftime("%Y-%m-%d %H:%M:%S"),
+        "clicktimestamp_iso8601": checked.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "clickcount": votes // 7 + rng.randint(0, 20),
+        "clicktrend": rng.randint(-20, 20),
+        "ssl_error": 0,
+        "geo_lat": round(rng.uniform(-60, 70), 5) if rng.random() < 0.4 else None,
+        "geo_long": round(rng.uniform(-180, 180), 5) if rng.random() < 0.4 else None,
+        "geo_distance": None,
+        "has_extended_info": False,
+    }
+
+
+def iter_stations(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict]:
+    """按lastchangetime升序生成编号从start开始的电台"""
+    for index in range(start, count):
+        yield make_station(index, seed)
+
+
+def make_catalog(count: int, seed: int = 0) -> List[Dict]:
+    """生成包含count个电台的目录"""
+    return list(iter_stations(count, seed))
@@ -0,0 +1,136 @@
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from station_store import StationStore
+
+# 同步进度保存在StationStore的meta表中，中断后可从断点继续
+META_STATE = "sync_state"            # "importing" 或 "complete"
+META_OFFSET = "sync_offset"          # 全量导入已完成的偏移量
+META_WATERMARK = "sync_watermark"    # 已同步到的最大lastchangetime
+META_LAST_SYNC = "sync_last_time"    # 上次同步完成的时间戳
+META_LAST_FULL = "sync_last_full"    # 上次完整核对全部电台（并删除上游已删除电台）的时间戳
+
+
+class CatalogSync:
+    """全量电台目录同步：首次分页全量导入，之后只拉取lastchangetime更新过的电台
+
+    增量同步看不到上游删除的电台，因此每隔reconcile_interval秒重新完整导入一次，
+    并删除本地有而上游已不存在的电台。
+    """
+
+    def __init__(self, api, store: StationStore, page_size: int = 1000, delta_page_size: int = 200,
+                 page_overlap: int = 10, progress: Optional[Callable[[str, int], None]] = None,
+                 reconcile_interval: float = 7 * 24 * 3600):
+        self.api = api
+        self.store = store
+        self.page_size = page_size
+        self.delta_page_size = delta_page_size
+        # 相邻分页之间的重叠条数，防止导入期间有电台变动导致偏移错位而漏掉电台
+        self.page_overlap = min(page_overlap, page_size // 2)
+        self.progress = progress
+        self.reconcile_interval = reconcile_interval
+
+    def _report(self, phase: str, count: int):
+        if self.progress:
+            try:
+                self.progress(phase, count)
+            except Exception:
+                pass
+
+    def needs_full_import(self) -> bool:
+        """是否还没有完成过全量导入"""
+        return self.store.get_meta(META_STATE) != "complete"
+
+    def needs_reconcile(self) -> bool:
+        """距上次完整核对是否已超过reconcile_interval"""
+        try:
+            last_full = float(self.store.get_meta(META_LAST_FULL, "0"))
+        except ValueError:
+            last_full = 0
+        return time.time() - last_full >= self.reconcile_interval
+
+    def sync(self) -> Dict[str, int]:
+        """执行一次同步：未完成全量导入时继续导入，到期时完整核对，否则只应用增量变化"""
+        if self.needs_full_import():
+            result = self.full_import()
+        elif self.needs_reconcile():
+            result = self.full_import(restart=True)
+        else:
+            result = self.apply_changes()
+        self.store.set_meta(META_LAST_SYNC, str(int(time.time())))
+        return result
+
+    def full_import(self, restart: bool = False) -> Dict[str, int]:
+        """分页导入全部电台，每页完成后保存断点
+
+        从头完整导入时记录上游的全部电台，结束后删除本地多出的电台；
+        从断点继续的导入看不到之前分页的电台，不做删除，留到下次到期的完整核对。
+        """
+        if restart or self.store.get_meta(META_STATE) != "importing":
+            self.store.set_meta(META_STATE, "importing")
+            self.store.set_meta(META_OFFSET, "0")
+            self.store.set_meta(META_WATERMARK, None)
+
+        offset = int(self.store.get_meta(META_OFFSET, "0"))
+        watermark = self.store.get_meta(META_WATERMARK, "")
+        seen: Optional[Set[str]] = set() if offset == 0 else None
+        fetched = 0
+        written = 0
+        while True:
+            page = self.api.get_stations_page(offset, self.page_size, order="changetimestamp")
+            fetched += len(page)
+            if seen is not None:
+                seen.update(s["stationuuid"] for s in page if s.get("stationuuid"))
+            written += self.store.upsert_many(page)
+            watermark = max([watermark] + [s.get("lastchangetime") or "" for s in page])
+
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size - self.page_overlap
+            self.store.set_meta(META_OFFSET, str(offset))
+            self.store.set_meta(META_WATERMARK, watermark)
+            self._report("import", offset)
+
+        self.store.set_meta(META_WATERMARK, watermark)
+        self.store.set_meta(META_OFFSET, None)
+        self.store.set_meta(META_STATE, "complete")
+        self._report("import", offset + len(page))
+        deleted = 0
+        # 上游一个电台都没返回时多半是接口异常，不清空本地电台库
+        if seen:
+            deleted = self.store.delete_many(self.store.station_ids() - seen)
+        # 断点续传的导入同样刚拉取过全部电台，也记为完成，否则下次同步会立即从头重新导入
+        if fetched:
+            self.store.set_meta(META_LAST_FULL, str(int(time.time())))
+        return {"fetched": fetched, "written": written, "deleted": deleted}
+
+    def apply_changes(self) -> Dict[str, int]:
+        """按lastchangetime倒序拉取自上次同步以来变化的电台，changeuuid未变的会被跳过"""
+        watermark = self.store.get_meta(META_WATERMARK, "") or self.store.latest_change_time()
+        if not watermark:
+            # 没有水位线时增量同步会遍历整个目录，改为（可断点续传的）全量导入
+            return self.full_import(restart=True)
+        offset = 0
+        fetched = 0
+        changed: List[Dict] = []
+        new_watermark = watermark
+        while True:
+            page = self.api.get_stations_page(offset, self.delta_page_size, order="changetimestamp", reverse=True)
+            fetched += len(page)
+            reached_old = False
+            for station in page:
+                change_time = station.get("lastchangetime") or ""
+                # 与水位线相同的秒内可能有多条变化，这里包含等于的情况，由changeuuid去重
+                if change_time < watermark:
+                    reached_old = True
+                    break
+                changed.append(station)
+                new_watermark = max(new_watermark, change_time)
+            if reached_old or len(page) < self.delta_page_size:
+                break
+            offset += self.delta_page_size
+
+        written = self.store.upsert_many(changed)
+        self.store.set_meta(META_WATERMARK, new_watermark)
+        self._report("delta", written)
+        return {"fetched": fetched, "written": written, "deleted": 0}
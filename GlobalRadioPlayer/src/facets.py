@@ -0,0 +1,235 @@
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from station import StationView
+from station_index import fold_text
+from station_store import split_tags
+
+# 可筛选的维度
+FACETS = ("country", "language", "codec", "bitrate", "tag")
+# 比特率分档：(下限, 显示名称)
+BITRATE_BANDS = ((256, "256+"), (192, "192-255"), (128, "128-191"), (64, "64-127"), (1, "1-63"), (0, "未知"))
+# 标签太多，下拉框只列出电台数最多的这些标签
+MAX_TAG_VALUES = 300
+
+
+def _bitrate_band(station: Dict) -> str:
+    try:
+        bitrate = int(station.get("bitrate") or 0)
+    except (TypeError, ValueError):
+        bitrate = 0
+    for lower, label in BITRATE_BANDS:
+        if bitrate >= lower:
+            return label
+    return BITRATE_BANDS[-1][1]
+
+
+def _text_key(value: Optional[str]) -> str:
+    """文本排序键：折叠大小写和变音符号，空值排在最后"""
+    return fold_text(value) if value else "\uffff"
+
+
+def _bitrate_key(station: Dict) -> int:
+    try:
+        return int(station.get("bitrate") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# 可排序的列 -> (排序键, 是否在名称顺序的基础上稳定排序，使同值的电台按名称排列)
+SORT_KEYS: Dict[str, Tuple[Callable[[Dict], object], bool]] = {
+    "name": (lambda s: _text_key(s.get("name")), False),
+    "country": (lambda s: _text_key(s.get("country")), True),
+    "genre": (lambda s: _text_key(s.get("tags")), True),
+    "language": (lambda s: _text_key(s.get("language")), True),
+    "bitrate": (_bitrate_key, True),
+}
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count  # noqa: F811  Python 3.10+
+
+
+class FacetIndex:
+    """分面浏览索引
+
+    电台按在目录中的位置编号，每个维度的每个取值对应一个位图（Python大整数，第i位
+    表示第i个电台），组合筛选就是位图求与，计数就是数1的个数，都在C层完成。
+    各可排序列的顺序在建立索引时预先排好，排序只需按预排顺序过滤位图，不再比较电台。
+    建立索引较慢，应在后台线程完成。
+    """
+
+    def __init__(self, stations: Sequence[Dict] = ()):
+        self._stations = stations
+        self._size = len(stations)
+        self._all = (1 << self._size) - 1
+        self._positions: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACETS}
+        # 预排顺序和名次用4字节的数组保存，比整数列表小得多
+        self._orders: Dict[str, array] = {}
+        self._ranks: Dict[str, array] = {}
+        self._sorted_cache: Dict[Tuple[str, bool], StationView] = {}
+        self._top_tags: List[str] = []
+        self._build()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _build(self):
+        # 先收集各取值的位置，再一次性转成位图；逐位或运算大整数是O(n^2)的
+        positions: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+        country_labels = self._labels["country"]
+        country_positions, language_positions = positions["country"], positions["language"]
+        codec_positions, bitrate_positions, tag_positions = positions["codec"], positions["bitrate"], positions["tag"]
+        for index, station in enumerate(self._stations):
+            station_id = station.get("stationuuid")
+            if station_id:
+                self._positions[station_id] = index
+            countrycode = (station.get("countrycode") or "").strip().upper()
+            if countrycode:
+                country_positions.setdefault(countrycode, []).append(index)
+                country_labels.setdefault(countrycode, station.get("country") or countrycode)
+            for language in split_tags(station.get("language")):
+                language_positions.setdefault(language, []).append(index)
+            codec = (station.get("codec") or "").strip().upper()
+            if codec:
+                codec_positions.setdefault(codec, []).append(index)
+            bitrate_positions.setdefault(_bitrate_band(station), []).append(index)
+            for tag in split_tags(station.get("tags")):
+                tag_positions.setdefault(tag, []).append(index)
+
+        byte_count = (self._size + 7) // 8
+        for facet, values in positions.items():
+            postings = self._postings[facet]
+            for value, indexes in values.items():
+                bitmap = bytearray(byte_count)
+                for index in indexes:
+                    bitmap[index >> 3] |= 1 << (index & 7)
+                postings[value] = int.from_bytes(bitmap, "little")
+        # 标签下拉框只列出电台最多的标签，这个列表只与目录有关，预先算好
+        self._top_tags = sorted(tag_positions, key=lambda tag: -len(tag_positions[tag]))[:MAX_TAG_VALUES]
+
+        stations = self._stations
+        name_order = None
+        for column, (key, by_name) in SORT_KEYS.items():
+            keys = [key(station) for station in stations]
+            base = name_order if by_name and name_order is not None else range(self._size)
+            order = array("I", sorted(base, key=keys.__getitem__))
+            if column == "name":
+                name_order = order
+            ranks = array("I", bytes(4 * self._size))
+            for rank, index in enumerate(order):
+                ranks[index] = rank
+            self._orders[column] = order
+            self._ranks[column] = ranks
+
+    # ---- 筛选 ----
+
+    def mask(self, selections: Dict[str, str], exclude: Optional[str] = None) -> int:
+        """组合筛选条件的位图（exclude指定的维度不参与，用于计算该维度自己的计数）"""
+        result = self._all
+        for facet, value in selections.items():
+            if facet == exclude or value is None:
+                continue
+            result &= self._postings.get(facet, {}).get(value, 0)
+            if not result:
+                break
+        return result
+
+    def counts(self, facet: str, selections: Dict[str, str]) -> List[Tuple[str, str, int]]:
+        """在其他维度的筛选条件下，该维度各取值的电台数[(值, 显示名称, 数量)]，按数量降序"""
+        base = self.mask(selections, exclude=facet)
+        postings = self._postings.get(facet, {})
+        candidates = list(self._top_tags) if facet == "tag" else list(postings)
+        # 当前选中的取值即使计数为0也要保留，否则下拉框中找不到它
+        selected = selections.get(facet)
+        if selected is not None and selected in postings and selected not in candidates:
+            candidates.append(selected)
+        labels = self._labels[facet]
+        result = []
+        for value in candidates:
+            count = _popcount(postings[value] & base) if base != self._all else _popcount(postings[value])
+            if count or value == selected:
+                result.append((value, labels.get(value, value), count))
+        result.sort(key=lambda item: (-item[2], item[1]))
+        return result
+
+    def total(self, selections: Dict[str, str]) -> int:
+        """满足筛选条件的电台数"""
+        return _popcount(self.mask(selections))
+
+    def station_ids(self, selections: Dict[str, str]) -> Set[str]:
+        """满足筛选条件的电台stationuuid集合（用于限定搜索范围）"""
+        return {station_id for station_id in (s.get("stationuuid") for s in self.select(selections)) if station_id}
+
+    def has_value(self, facet: str, value: str) -> bool:
+        """目录中是否有电台具有该取值（不限于下拉框列出的取值）"""
+        return value in self._postings.get(facet, {})
+
+    def _contains(self, mask: int) -> Callable[[Dict], bool]:
+        if mask == self._all:
+            return lambda station: True
+        bits = mask.to_bytes((self._size + 7) // 8, "little")
+        positions = self._positions
+
+        def contains(station: Dict) -> bool:
+            index = positions.get(station.get("stationuuid"))
+            return index is not None and bool(bits[index >> 3] >> (index & 7) & 1)
+        return contains
+
+    # ---- 查询 ----
+
+    def select(self, selections: Dict[str, str], sort: Optional[str] = None,
+               reverse: bool = False) -> StationView:
+        """按筛选条件和排序列返回电台视图；没有排序列时保持目录顺序"""
+        mask = self.mask(selections)
+        if not mask:
+            return StationView(self._stations, ())
+        if mask == self._all:
+            return self._sorted_all(sort, reverse)
+        order = self._orders.get(sort) if sort else None
+        if order is None:
+            order = range(self._size)
+        elif reverse:
+            order = reversed(order)
+        bits = mask.to_bytes((self._size + 7) // 8, "little")
+        return StationView(self._stations, (i for i in order if bits[i >> 3] >> (i & 7) & 1))
+
+    def _sorted_all(self, sort: Optional[str], reverse: bool) -> StationView:
+        if sort not in self._orders:
+            return StationView(self._stations)
+        key = (sort, reverse)
+        cached = self._sorted_cache.get(key)
+        if cached is None:
+            order = self._orders[sort]
+            cached = StationView(self._stations, order[::-1] if reverse else order)
+            self._sorted_cache[key] = cached
+        return cached
+
+    def filter(self, stations: Sequence[Dict], selections: Dict[str, str]) -> List[Dict]:
+        """用筛选条件过滤任意电台列表（如搜索结果、收藏），保持原顺序"""
+        if not selections:
+            return list(stations)
+        contains = self._contains(self.mask(selections))
+        return [station for station in stations if contains(station)]
+
+    def sort(self, stations: Sequence[Dict], column: str, reverse: bool = False) -> List[Dict]:
+        """按预排顺序对任意电台列表排序；不在索引中的电台排在最后"""
+        ranks = self._ranks.get(column)
+        if ranks is None:
+            return list(stations)
+        positions = self._positions
+        missing = len(ranks)
+
+        def rank(station: Dict) -> int:
+            index = positions.get(station.get("stationuuid"))
+            return ranks[index] if index is not None else missing
+        result = sorted(stations, key=rank)
+        if reverse:
+            result.reverse()
+        return result
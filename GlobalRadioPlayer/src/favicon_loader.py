@@ -0,0 +1,277 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import tkinter as tk
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import requests
+
+from http_client import get_shared_session
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    # 没有Pillow时只支持Tk能直接解码的PNG/GIF，缩放在主线程用整数倍抽样完成
+    PIL_AVAILABLE = False
+
+# 图标文件的最大字节数，超过的不下载
+MAX_ICON_BYTES = 512 * 1024
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_GIF_SIGNATURES = (b"GIF87a", b"GIF89a")
+
+
+class FaviconLoader:
+    """电台图标加载器
+
+    只加载请求的（可见行的）图标：后台线程池限制并发下载数，在后台线程解码并缩小为
+    缩略图，按内容的sha1存入磁盘缓存（相同的图标只存一份，超过容量时删除最久未用的），
+    主线程中只做创建PhotoImage这一步，并按批交付，滚动时不会卡顿。
+    """
+
+    def __init__(self, root, size: int = 16, max_concurrency: int = 4, cache_dir: str = "favicon_cache",
+                 max_memory_items: int = 512, max_disk_bytes: int = 32 * 1024 * 1024,
+                 on_loaded: Optional[Callable[[List[str]], None]] = None, timeout: tuple = (3, 5)):
+        self.root = root
+        self.size = size
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.on_loaded = on_loaded  # on_loaded(已加载的图标地址列表)，在主线程调用
+        self.timeout = timeout
+        self.session = get_shared_session()
+
+        self._images: "OrderedDict[str, tk.PhotoImage]" = OrderedDict()  # 图标地址 -> 图片（LRU）
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._wanted: Set[str] = set()   # 最近一次请求的图标，已滚出视口的不再下载
+        self._ready = deque()            # 后台线程解码好的(地址, 图片数据)，等待主线程创建图片
+        self._deliver_scheduled = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="favicon")
+
+        # 磁盘缓存索引：地址的sha1 -> 内容文件名；首次使用时加载
+        self._index: Optional[Dict[str, str]] = None
+        self._index_dirty = False
+        self._index_saved = 0.0
+
+    # ---- 主线程接口 ----
+
+    def get(self, url: Optional[str]) -> Optional[tk.PhotoImage]:
+        """返回已加载的图标，没有加载时返回None"""
+        if not url:
+            return None
+        image = self._images.get(url)
+        if image is not None:
+            self._images.move_to_end(url)
+        return image
+
+    def request(self, urls: Iterable[str]):
+        """请求加载一批图标（通常是可见行的），已加载、正在加载或失败过的会跳过"""
+        wanted = {url for url in urls if url and url.startswith(("http://", "https://"))}
+        with self._lock:
+            self._wanted = wanted
+            todo = [url for url in wanted
+                    if url not in self._images and url not in self._pending and url not in self._failed]
+            self._pending.update(todo)
+        for url in todo:
+            self._executor.submit(self._load, url)
+
+    def close(self):
+        """停止下载并保存磁盘缓存索引"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._save_index(force=True)
+
+    # ---- 后台线程 ----
+
+    def _load(self, url: str):
+        try:
+            with self._lock:
+                # 排队期间已经滚出视口的图标不再下载
+                if url not in self._wanted:
+                    self._pending.discard(url)
+                    return
+            data = self._read_disk(url)
+            if data is None:
+                data = self._thumbnail(self._download(url))
+                if data is not None:
+                    self._write_disk(url, data)
+            if data is None:
+                with self._lock:
+                    self._failed.add(url)
+                    self._pending.discard(url)
+                return
+        except Exception:
+            with self._lock:
+                self._failed.add(url)
+                self._pending.discard(url)
+            return
+
+        self._ready.append((url, data))
+        with self._lock:
+            if self._deliver_scheduled:
+                return
+            self._deliver_scheduled = True
+        try:
+            self.root.after(0, self._deliver)
+        except RuntimeError:
+            # 窗口已关闭
+            pass
+
+    def _download(self, url: str) -> Optional[bytes]:
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                data = b""
+                for chunk in response.iter_content(16 * 1024):
+                    data += chunk
+                    if len(data) > MAX_ICON_BYTES:
+                        return None
+                return data
+        except requests.exceptions.RequestException:
+            return None
+
+    def _thumbnail(self, data: Optional[bytes]) -> Optional[bytes]:
+        """把图标缩小为size x size的PNG；没有Pillow时只检查格式，缩放留给主线程"""
+        if not data:
+            return None
+        if not PIL_AVAILABLE:
+            if data.startswith(_PNG_SIGNATURE) or data.startswith(_GIF_SIGNATURES):
+                return data
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = image.convert("RGBA")
+                image.thumbnail((self.size, self.size), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, format="PNG", optimize=True)
+                return output.getvalue()
+        except Exception:
+            return None
+
+    # ---- 磁盘缓存 ----
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _ensure_index(self) -> Dict[str, str]:
+        if self._index is None:
+            try:
+                with open(self._index_path(), "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _read_disk(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            name = self._ensure_index().get(self._url_key(url))
+        if name is None:
+            return None
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 记录最近使用时间，淘汰时参考
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, url: str, data: bytes):
+        # 文件名是内容的sha1，不同电台使用同一个图标时只保存一份
+        name = hashlib.sha1(data).hexdigest() + ".img"
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if not os.path.exists(path):
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._ensure_index()[self._url_key(url)] = name
+            self._index_dirty = True
+            self._save_index()
+
+    def _save_index(self, force: bool = False):
+        """保存索引（调用方持有锁）；平时最多每5秒写一次，同时淘汰超出容量的文件"""
+        if not self._index_dirty or (not force and time.time() - self._index_saved < 5):
+            return
+        self._evict_disk()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self._index_path() + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, separators=(",", ":"))
+            os.replace(temp_path, self._index_path())
+        except OSError:
+            return
+        self._index_dirty = False
+        self._index_saved = time.time()
+
+    def _evict_disk(self):
+        """磁盘缓存超过容量时删除最久未使用的文件（调用方持有锁）"""
+        try:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".img"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.name))
+                    total += stat.st_size
+        except OSError:
+            return
+        if total <= self.max_disk_bytes:
+            return
+        removed = set()
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes * 0.8:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            removed.add(name)
+            total -= size
+        if removed and self._index:
+            self._index = {key: name for key, name in self._index.items() if name not in removed}
+
+    # ---- 交付（主线程） ----
+
+    def _deliver(self):
+        with self._lock:
+            self._deliver_scheduled = False
+        loaded = []
+        while self._ready:
+            url, data = self._ready.popleft()
+            with self._lock:
+                self._pending.discard(url)
+            try:
+                image = tk.PhotoImage(master=self.root, data=data)
+                if not PIL_AVAILABLE:
+                    factor = max(1, -(-max(image.width(), image.height()) // self.size))
+                    if factor > 1:
+                        image = image.subsample(factor)
+            except tk.TclError:
+                with self._lock:
+                    self._failed.add(url)
+                continue
+            self._images[url] = image
+            self._images.move_to_end(url)
+            loaded.append(url)
+        while len(self._images) > self.max_memory_items:
+            self._images.popitem(last=False)
+        if loaded and self.on_loaded is not None:
+            self.on_loaded(loaded)
@@ -0,0 +1,556 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+from facets import FACETS, FacetIndex
+from persistence import get_shared_writer
+from player import RadioPlayer, VLC_AVAILABLE
+from player_pool import PlayerPool
+from search_engine import SearchEngine
+from station import load_snapshot, save_snapshot
+from station_model import StationModel, EVENT_FAVORITE
+
+DEFAULT_HOST = "127.0.0.1"  # 默认只监听本机
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+RESPONSE_CACHE_ENTRIES = 512  # 缓存的查询响应数量（目录重新加载时清空）
+SNAPSHOT_PATH = "catalog_snapshot.bin"
+FAVORITES_PATH = "favorites.json"
+DEFAULT_ZONE = "default"  # /play、/pause等不带分区的接口控制的分区
+
+_STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class HttpError(Exception):
+    """返回给客户端的错误响应"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _int_param(params: Dict[str, str], name: str, default: int, minimum: int = 0,
+               maximum: Optional[int] = None) -> int:
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"参数{name}必须是整数")
+    value = max(minimum, value)
+    return min(value, maximum) if maximum is not None else value
+
+
+class HeadlessService:
+    """无界面的播放服务：在asyncio事件循环中运行RadioPlayer，通过本地HTTP/JSON接口控制
+
+    电台目录在后台线程加载（先加载快照，再读取本地电台库并同步），搜索在单独的线程中
+    执行，不会阻塞其他客户端。只读的查询接口按参数缓存编码好的响应，相同的并发请求
+    只计算一次。播放器事件通过事件总线在事件循环中分发。
+
+    接口：
+        GET  /status                   播放状态、当前电台、正在播放的标题、音量
+        GET  /search?q=&limit=         搜索电台
+        GET  /stations?country=&language=&codec=&bitrate=&tag=&sort=&reverse=&offset=&limit=
+        GET  /stations/<stationuuid>   电台详情
+        GET  /facets?country=...       各筛选维度的取值和电台数
+        POST /play {"stationuuid"}     播放电台（或{"url"}播放任意地址）
+        POST /pause  /resume  /stop
+        GET  /volume   POST /volume {"volume"}
+        GET  /favorites  POST /favorites {"stationuuid"}  DELETE /favorites/<stationuuid>
+        GET  /zones  POST /zones {"name", "volume", "output_device"}  DELETE /zones/<name>
+        POST /zones/<name>/play|pause|resume|stop|volume|device   其他播放分区（默认分区名为default）
+        GET  /devices                  可用的音频输出设备
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, sync: bool = True,
+                 player: Optional[RadioPlayer] = None):
+        self.host = host
+        self.port = port
+        self.sync = sync  # 是否从radio-browser同步电台目录
+        self.player = player or RadioPlayer()
+        # 播放分区：上面的播放器是默认分区，其余分区共用同一个VLC实例
+        self.pool = PlayerPool()
+        self.pool.add_zone(DEFAULT_ZONE, self.player)
+        self.model = StationModel()
+        self.search_engine = SearchEngine()
+        self.facet_index = FacetIndex()
+        self.store = None
+        self.catalog_loading = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_generation = 0  # 目录或收藏变化时递增，计算期间变化的结果不缓存
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 搜索和目录加载都是CPU密集的，各用一个线程，事件循环只负责收发
+        self._search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="headless-search")
+        self._catalog_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="headless-catalog")
+        self._routes: Dict[Tuple[str, str], Callable[..., Awaitable[Any]]] = {
+            ("GET", "status"): self._get_status,
+            ("GET", "search"): self._get_search,
+            ("GET", "stations"): self._get_stations,
+            ("GET", "facets"): self._get_facets,
+            ("POST", "play"): self._post_play,
+            ("POST", "pause"): self._post_pause,
+            ("POST", "resume"): self._post_resume,
+            ("POST", "stop"): self._post_stop,
+            ("GET", "volume"): self._get_volume,
+            ("POST", "volume"): self._post_volume,
+            ("GET", "favorites"): self._get_favorites,
+            ("POST", "favorites"): self._post_favorite,
+            ("DELETE", "favorites"): self._delete_favorite,
+            ("GET", "zones"): self._get_zones,
+            ("POST", "zones"): self._post_zones,
+            ("DELETE", "zones"): self._delete_zone,
+            ("GET", "devices"): self._get_devices,
+        }
+        # 这些接口的列表响应只取决于电台目录、收藏和参数，可以缓存（不含正在播放的标题）
+        self._cacheable = {"search", "stations", "facets"}
+
+    # ---- 生命周期 ----
+
+    async def serve(self):
+        """启动服务并一直运行"""
+        self._loop = asyncio.get_running_loop()
+        self.pool.attach_asyncio(self._loop)
+        self._load_favorites()
+        self.model.subscribe(self._on_model_change)
+        self._update_metadata_watch()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        logger.info(f"无界面服务已启动: http://{self.host}:{self.port}/")
+        self.catalog_loading = True
+        self._loop.run_in_executor(self._catalog_executor, self._load_catalog)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        """停止播放并写完未保存的数据（事件循环结束后调用，监听socket随serve()一起关闭）"""
+        self.pool.close()
+        self._search_executor.shutdown(wait=False)
+        self._catalog_executor.shutdown(wait=False)
+        get_shared_writer().flush()
+
+    # ---- 电台目录 ----
+
+    def _load_catalog(self):
+        """加载电台目录（在后台线程执行）：先用快照，再读取本地电台库，最后同步"""
+        try:
+            stations = load_snapshot(SNAPSHOT_PATH)
+            if stations:
+                self._publish_catalog(stations)
+
+            from radio_api import RadioAPI
+            from station_store import StationStore
+            if self.store is None:
+                self.store = StationStore()
+                if self.store.count() == 0:
+                    self.store.import_json_file("radio_cache.json")
+            api = RadioAPI(store=self.store)
+            if self.store.count() > 0:
+                self._publish_catalog(api.query_stations(playable_only=True, compact=True))
+
+            if self.sync:
+                from catalog_sync import CatalogSync
+                CatalogSync(api, self.store).sync()
+                stations = api.query_stations(playable_only=True, compact=True)
+                self._publish_catalog(stations)
+                save_snapshot(stations, SNAPSHOT_PATH)
+        except Exception as e:
+            logger.error(f"加载电台目录失败: {e}", exc_info=True)
+        finally:
+            self._loop.call_soon_threadsafe(setattr, self, "catalog_loading", False)
+
+    def _publish_catalog(self, stations):
+        """建立索引后交给事件循环替换目录（在后台线程调用）"""
+        engine = SearchEngine(stations)
+        facet_index = FacetIndex(stations)
+        self._loop.call_soon_threadsafe(self._apply_catalog, stations, engine, facet_index)
+
+    def _apply_catalog(self, stations, engine, facet_index):
+        self.search_engine = engine
+        self.facet_index = facet_index
+        self.model.load(stations)
+        self._invalidate_cache()
+        logger.info(f"电台目录已加载: {len(stations)} 个电台")
+
+    # ---- 收藏 ----
+
+    def _load_favorites(self):
+        try:
+            if os.path.exists(FAVORITES_PATH):
+                with open(FAVORITES_PATH, "r", encoding="utf-8") as f:
+                    self.model.load_favorites(json.load(f))
+        except Exception as e:
+            logger.error(f"加载收藏失败：{e}")
+
+    def _invalidate_cache(self):
+        self._cache.clear()
+        self._cache_generation += 1
+
+    def _on_model_change(self, event, payload):
+        if event == EVENT_FAVORITE:
+            self._invalidate_cache()
+            get_shared_writer().write_json(FAVORITES_PATH, self.model.favorite_records(), ensure_ascii=False)
+            self._update_metadata_watch()
+
+    def _update_metadata_watch(self):
+        self.player.watch_metadata(
+            (radio.get("stationuuid"), radio.get("url_resolved") or radio.get("url"))
+            for radio in self.model.favorites())
+
+    # ---- HTTP ----
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的请求（支持keep-alive）"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, {"error": "请求头过大"}, keep_alive=False)
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "无效的请求"}, keep_alive=False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() != "HTTP/1.0")
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": "请求体过大"}, keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._dispatch(method.upper(), target, body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        body = payload if isinstance(payload, bytes) else self._encode(payload)
+        head = (f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'OK')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    def _encode(payload) -> bytes:
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        """按路径分发请求，返回(状态码, 响应数据或编码好的响应体)"""
+        parts = urlsplit(target)
+        segments = [unquote(s) for s in parts.path.strip("/").split("/") if s]
+        if not segments:
+            segments = ["status"]
+        resource, args = segments[0], segments[1:]
+        params = dict(parse_qsl(parts.query))
+        handler = self._routes.get((method, resource))
+        if handler is None:
+            if any(key[1] == resource for key in self._routes):
+                return 405, {"error": f"{resource}不支持{method}"}
+            return 404, {"error": f"未知的接口: {parts.path}"}
+
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError
+        except ValueError:
+            return 400, {"error": "请求体必须是JSON对象"}
+
+        try:
+            if method == "GET" and resource in self._cacheable and not args:
+                return 200, await self._cached(resource, args, params, handler)
+            return 200, await handler(args, params, data)
+        except HttpError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            logger.error(f"处理请求{method} {target}出错: {e}", exc_info=True)
+            return 500, {"error": str(e)}
+
+    async def _cached(self, resource, args, params, handler) -> bytes:
+        """返回缓存的响应体；相同的请求正在计算时等待同一个结果"""
+        # 参数原样排序作为缓存键，不能像radio-browser接口那样转小写：分面取值区分大小写
+        key = "/".join([resource] + args) + "?" + urlencode(sorted(params.items()))
+        body = self._cache.get(key)
+        if body is not None:
+            self._cache.move_to_end(key)
+            return body
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        try:
+            generation = self._cache_generation
+            body = self._encode(await handler(args, params, {}))
+            # 计算期间目录或收藏有变化时不缓存旧结果
+            if generation == self._cache_generation:
+                self._cache[key] = body
+                while len(self._cache) > RESPONSE_CACHE_ENTRIES:
+                    self._cache.popitem(last=False)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他请求在等待时，避免"异常从未被获取"的警告
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    # ---- 查询接口 ----
+
+    def _station_json(self, station, live: bool = False) -> Dict:
+        """电台的JSON表示；live为True时附带正在播放的标题（这样的响应不缓存）"""
+        record = station.to_dict() if hasattr(station, "to_dict") else dict(station)
+        station_id = record.get("stationuuid")
+        record["favorite"] = self.model.is_favorite(station_id)
+        if live:
+            record["now_playing"] = self.player.get_now_playing(station_id)
+        return record
+
+    def _selections(self, params: Dict[str, str]) -> Dict[str, str]:
+        return {facet: params[facet] for facet in FACETS if params.get(facet)}
+
+    async def _get_status(self, args, params, data):
+        station = self.model.get(self.player.current_station_id)
+        return {
+            "state": self.player.get_state(),
+            "station": self._station_json(station, live=True) if station is not None else None,
+            "now_playing": self.player.get_now_playing(self.player.current_station_id),
+            "volume": self.player.volume,
+            "reconnect": self.player.supervisor.status(),
+            "vlc_available": VLC_AVAILABLE,
+            "catalog": {"stations": len(self.model), "loading": self.catalog_loading},
+        }
+
+    async def _get_search(self, args, params, data):
+        query = params.get("q", "").strip()
+        if not query:
+            raise HttpError(400, "缺少搜索词q")
+        limit = _int_param(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        engine = self.search_engine
+        results = await self._loop.run_in_executor(
+            self._search_executor, lambda: engine.search(query, limit=limit))
+        return {"query": query, "stations": [self._station_json(s) for s in results]}
+
+    async def _get_stations(self, args, params, data):
+        if args:
+            station = self.model.get(args[0])
+            if station is None:
+                raise HttpError(404, "未找到电台")
+            return self._station_json(station, live=True)
+        sort = params.get("sort") or None
+        reverse = params.get("reverse", "").lower() in ("1", "true", "yes")
+        offset = _int_param(params, "offset", 0)
+        limit = _int_param(params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        selections = self._selections(params)
+        if selections or sort:
+            stations = self.facet_index.select(selections, sort, reverse)
+        else:
+            stations = self.model.stations()
+        return {
+            "total": len(stations),
+            "offset": offset,
+            "stations": [self._station_json(s) for s in stations[offset:offset + limit]],
+        }
+
+    async def _get_facets(self, args, params, data):
+        selections = self._selections(params)
+        return {
+            "total": self.facet_index.total(selections),
+            "facets": {
+                facet: [{"value": value, "label": label, "count": count}
+                        for value, label, count in self.facet_index.counts(facet, selections)]
+                for facet in FACETS
+            },
+        }
+
+    # ---- 控制接口 ----
+
+    def _play_target(self, data) -> Tuple[str, Optional[str], List[str]]:
+        """请求体中要播放的(流地址, stationuuid, 备用地址)"""
+        station_id = data.get("stationuuid")
+        fallback_urls = []
+        if station_id:
+            station = self.model.get(station_id)
+            if station is None:
+                raise HttpError(404, "未找到电台")
+            url = station.get("url_resolved") or station.get("url")
+            fallback_urls.append(station.get("url"))
+        else:
+            url = data.get("url")
+            if not url:
+                raise HttpError(400, "需要stationuuid或url")
+        if not VLC_AVAILABLE:
+            raise HttpError(503, "VLC不可用")
+        return url, station_id, fallback_urls
+
+    async def _post_play(self, args, params, data):
+        # 经由分区池在工作线程中执行，连接流媒体时不阻塞事件循环
+        url, station_id, fallback_urls = self._play_target(data)
+        result = await self._wait(self.pool.play(DEFAULT_ZONE, url, station_id, fallback_urls))
+        if result != 0:
+            raise HttpError(503, "播放失败")
+        return await self._get_status(args, params, data)
+
+    async def _post_pause(self, args, params, data):
+        await self._wait(self.pool.pause(DEFAULT_ZONE))
+        return await self._get_status(args, params, data)
+
+    async def _post_resume(self, args, params, data):
+        await self._wait(self.pool.resume(DEFAULT_ZONE))
+        return await self._get_status(args, params, data)
+
+    async def _post_stop(self, args, params, data):
+        await self._wait(self.pool.stop(DEFAULT_ZONE))
+        return await self._get_status(args, params, data)
+
+    async def _get_volume(self, args, params, data):
+        return {"volume": self.player.volume}
+
+    async def _post_volume(self, args, params, data):
+        if "volume" not in data:
+            raise HttpError(400, "缺少volume")
+        try:
+            return {"volume": self.pool.set_volume(DEFAULT_ZONE, data["volume"])}
+        except ValueError:
+            raise HttpError(400, "volume必须是0-100的数字")
+
+    async def _get_favorites(self, args, params, data):
+        return {"stations": [self._station_json(s, live=True) for s in self.model.favorites()]}
+
+    async def _post_favorite(self, args, params, data):
+        station_id = data.get("stationuuid") or (args[0] if args else None)
+        if not station_id or self.model.get(station_id) is None:
+            raise HttpError(404, "未找到电台")
+        self.model.set_favorite(station_id, True)
+        return await self._get_favorites(args, params, data)
+
+    async def _delete_favorite(self, args, params, data):
+        station_id = args[0] if args else data.get("stationuuid")
+        if not station_id or not self.model.is_favorite(station_id):
+            raise HttpError(404, "该电台不在收藏中")
+        self.model.set_favorite(station_id, False)
+        return await self._get_favorites(args, params, data)
+
+    # ---- 播放分区 ----
+
+    def _zone_json(self, name: str) -> Dict:
+        status = self.pool.status(name)
+        station = self.model.get(status["station_id"])
+        status["station"] = self._station_json(station, live=True) if station is not None else None
+        status["now_playing"] = self.pool.zone(name).get_now_playing(status["station_id"])
+        return status
+
+    def _zone_name(self, args) -> str:
+        name = args[0] if args else None
+        if name not in self.pool:
+            raise HttpError(404, f"没有这个分区: {name}")
+        return name
+
+    @staticmethod
+    async def _wait(future):
+        """等待分区操作完成；操作被同一分区的同类新操作取代时返回409"""
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            raise HttpError(409, "操作已被同一分区的新操作取代")
+
+    async def _get_zones(self, args, params, data):
+        if args:
+            return self._zone_json(self._zone_name(args))
+        return {"zones": [self._zone_json(name) for name in self.pool.zones()]}
+
+    async def _post_zones(self, args, params, data):
+        if not args:
+            name = str(data.get("name") or "").strip()
+            if not name or "/" in name:
+                raise HttpError(400, "需要有效的分区名name")
+            if name in self.pool:
+                raise HttpError(400, f"分区已存在: {name}")
+            try:
+                self.pool.create_zone(name, volume=data.get("volume"), output_device=data.get("output_device"))
+            except ValueError:
+                raise HttpError(400, "volume必须是0-100的数字")
+            return self._zone_json(name)
+
+        name = self._zone_name(args)
+        action = args[1] if len(args) > 1 else ""
+        if action == "play":
+            url, station_id, fallback_urls = self._play_target(data)
+            result = await self._wait(self.pool.play(name, url, station_id, fallback_urls))
+            if result != 0:
+                raise HttpError(503, "播放失败")
+        elif action in ("pause", "resume", "stop"):
+            await self._wait(getattr(self.pool, action)(name))
+        elif action == "volume":
+            try:
+                self.pool.set_volume(name, data.get("volume"))
+            except ValueError:
+                raise HttpError(400, "volume必须是0-100的数字")
+        elif action == "device":
+            self.pool.set_output_device(name, data.get("device"))
+        else:
+            raise HttpError(404, f"未知的分区操作: {action}")
+        return self._zone_json(name)
+
+    async def _delete_zone(self, args, params, data):
+        name = self._zone_name(args)
+        if name == DEFAULT_ZONE:
+            raise HttpError(400, "默认分区不能删除")
+        await self._wait(self.pool.remove_zone(name))
+        return {"zones": [self._zone_json(zone) for zone in self.pool.zones()]}
+
+    async def _get_devices(self, args, params, data):
+        devices = await self._loop.run_in_executor(None, self.pool.output_devices)
+        return {"devices": [{"id": device, "description": description} for device, description in devices]}
+
+
+def run_headless(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, sync: bool = True):
+    """以无界面服务方式运行，直到被中断"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service = HeadlessService(host, port, sync=sync)
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,171 @@
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# DNS轮询地址，解析后反查可得到所有可用镜像
+DISCOVERY_HOST = "all.api.radio-browser.info"
+# 发现失败时使用的默认镜像列表
+DEFAULT_MIRRORS = [
+    "de1.api.radio-browser.info",
+    "de2.api.radio-browser.info",
+    "fi1.api.radio-browser.info",
+]
+USER_AGENT = "GlobalRadioPlayer/1.0"
+
+_shared_session: Optional[requests.Session] = None
+_shared_client: Optional["RadioHTTPClient"] = None
+_shared_lock = threading.RLock()  # 共享客户端初始化时会再获取共享会话
+
+
+def get_shared_session() -> requests.Session:
+    """获取进程内共享的HTTP会话（连接池复用keep-alive连接，避免每次请求重新握手）"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _shared_session = session
+        return _shared_session
+
+
+def get_shared_client() -> "RadioHTTPClient":
+    """获取进程内共享的radio-browser客户端（同步和异步API共用）"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = RadioHTTPClient()
+        return _shared_client
+
+
+class MirrorPool:
+    """radio-browser镜像池：发现镜像、测量延迟并按延迟和失败情况排序"""
+
+    def __init__(self, session: Optional[requests.Session] = None, probe_timeout: float = 2.0,
+                 refresh_interval: float = 1800, failure_cooldown: float = 60):
+        self.session = session or get_shared_session()
+        self.probe_timeout = probe_timeout
+        self.refresh_interval = refresh_interval
+        self.failure_cooldown = failure_cooldown
+        self._latency: Dict[str, float] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def discover(self) -> List[str]:
+        """通过DNS轮询地址发现所有镜像，失败时回退到默认列表"""
+        hosts = []
+        try:
+            infos = socket.getaddrinfo(DISCOVERY_HOST, 443, proto=socket.IPPROTO_TCP)
+            for info in infos:
+                ip = info[4][0]
+                try:
+                    name = socket.gethostbyaddr(ip)[0]
+                except OSError:
+                    continue
+                if name.endswith("api.radio-browser.info") and name not in hosts:
+                    hosts.append(name)
+        except OSError:
+            pass
+        return hosts or list(DEFAULT_MIRRORS)
+
+    def _probe(self, host: str) -> float:
+        """测量单个镜像的响应延迟，失败返回无穷大"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"https://{host}/json/stats", timeout=self.probe_timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            return float("inf")
+        return time.perf_counter() - start
+
+    def refresh(self):
+        """重新发现镜像并并发测量延迟"""
+        hosts = self.discover()
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            latencies = dict(zip(hosts, executor.map(self._probe, hosts)))
+        with self._lock:
+            self._latency = latencies
+            self._last_refresh = time.time()
+
+    def hosts(self) -> List[str]:
+        """按优先级返回镜像列表：未处于失败冷却期的在前，延迟低的在前"""
+        if time.time() - self._last_refresh > self.refresh_interval:
+            with self._refresh_lock:
+                # 多个线程同时发现过期时只刷新一次
+                if time.time() - self._last_refresh > self.refresh_interval:
+                    self.refresh()
+        now = time.time()
+        with self._lock:
+            return sorted(
+                self._latency,
+                key=lambda host: (self._failed_until.get(host, 0) > now, self._latency[host])
+            )
+
+    def mark_success(self, host: str, elapsed: float):
+        """记录成功请求，用指数滑动平均更新延迟"""
+        with self._lock:
+            old = self._latency.get(host, elapsed)
+            if old == float("inf"):
+                old = elapsed
+            self._latency[host] = old * 0.7 + elapsed * 0.3
+            self._failed_until.pop(host, None)
+
+    def mark_failure(self, host: str):
+        """记录失败请求，该镜像在冷却期内排到最后"""
+        with self._lock:
+            self._failed_until[host] = time.time() + self.failure_cooldown
+
+
+class RadioHTTPClient:
+    """带连接池、镜像故障转移和抖动重试的radio-browser客户端"""
+
+    def __init__(self, session: Optional[requests.Session] = None, mirrors: Optional[MirrorPool] = None,
+                 connect_timeout: float = 4, read_timeout: float = 10,
+                 max_attempts: int = 3, backoff_base: float = 0.3, scheme: str = "https"):
+        self.session = session or get_shared_session()
+        self.scheme = scheme  # 连接本地的模拟服务（如基准测试）时为http
+        self.mirrors = mirrors or MirrorPool(self.session)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+
+    def get_json(self, path: str, params: Optional[Dict] = None):
+        """请求JSON接口，连接错误、超时、5xx或返回内容不是合法JSON时换镜像重试，全部失败则抛出最后一个异常"""
+        hosts = self.mirrors.hosts()
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            host = hosts[attempt % len(hosts)]
+            start = time.perf_counter()
+            try:
+                response = self.session.get(f"{self.scheme}://{host}{path}", params=params, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.HTTPError as e:
+                # 4xx属于请求本身的问题，换镜像也没有意义，直接抛出
+                if e.response is not None and e.response.status_code < 500:
+                    raise
+                last_error = e
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+            except ValueError as e:
+                # 镜像返回了截断的内容或错误页面（如代理的HTML），换其他镜像
+                last_error = e
+            else:
+                self.mirrors.mark_success(host, time.perf_counter() - start)
+                return data
+
+            self.mirrors.mark_failure(host)
+            if attempt + 1 < self.max_attempts:
+                # 全抖动指数退避，避免多个请求同时重试
+                time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+        raise last_error
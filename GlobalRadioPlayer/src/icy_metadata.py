@@ -0,0 +1,204 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from stream_prober import ProbeError, open_stream
+
+_STREAM_TITLE_RE = re.compile(r"StreamTitle='(.*?)';", re.DOTALL)
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def parse_stream_title(block: bytes) -> Optional[str]:
+    """从ICY元数据块中取出StreamTitle，没有时返回None"""
+    raw = block.rstrip(b"\0")
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    match = _STREAM_TITLE_RE.search(text)
+    return match.group(1).strip() if match else None
+
+
+class IcyParser:
+    """把夹带ICY元数据的音频流拆分为音频和元数据
+
+    服务器每发送metaint字节音频后插入一个元数据块：1字节长度L，随后L*16字节文本。
+    feed()返回的音频片段是传入数据的memoryview切片，不复制音频数据；
+    只有很小的元数据块会被拷贝出来解析。
+    """
+
+    def __init__(self, metaint: int):
+        self.metaint = metaint
+        self._audio_left = metaint   # 距离下一个元数据块还剩的音频字节数
+        self._meta_left: Optional[int] = None  # 当前元数据块还剩的字节数，None表示下一个字节是长度
+        self._meta_buf = bytearray()
+
+    def feed(self, data) -> Tuple[List[memoryview], List[str]]:
+        """处理一段流数据，返回(音频片段列表, 新出现的标题列表)"""
+        data = memoryview(data)
+        audio: List[memoryview] = []
+        titles: List[str] = []
+        pos, size = 0, len(data)
+        while pos < size:
+            if self._audio_left:
+                take = min(self._audio_left, size - pos)
+                audio.append(data[pos:pos + take])
+                pos += take
+                self._audio_left -= take
+            elif self._meta_left is None:
+                self._meta_left = data[pos] * 16
+                pos += 1
+                if not self._meta_left:
+                    # 长度为0表示标题没有变化
+                    self._meta_left = None
+                    self._audio_left = self.metaint
+            else:
+                take = min(self._meta_left, size - pos)
+                self._meta_buf += data[pos:pos + take]
+                pos += take
+                self._meta_left -= take
+                if not self._meta_left:
+                    title = parse_stream_title(bytes(self._meta_buf))
+                    if title is not None:
+                        titles.append(title)
+                    self._meta_buf.clear()
+                    self._meta_left = None
+                    self._audio_left = self.metaint
+        return audio, titles
+
+
+def metaint_of(headers: Dict[str, str]) -> int:
+    """响应头中的icy-metaint，没有或无效时返回0"""
+    value = headers.get("icy-metaint", "").strip()
+    return int(value) if value.isdigit() else 0
+
+
+class MetadataHub:
+    """收藏电台的"正在播放"标题轮询
+
+    不为每个电台保持常驻连接：按轮询间隔依次短暂连接电台，读到第一个标题
+    （或达到字节上限）后立即断开；同时连接的数量不超过max_watchers，因此总带宽有上限。
+    已有连接在读取的电台（正在播放、正在录制）通过set_shared()排除，由那条连接
+    直接上报标题，不再额外连接。
+    """
+
+    def __init__(self, on_title: Callable[[str, str], None], max_watchers: int = 3,
+                 poll_interval: float = 120, max_bytes_per_poll: int = 256 * 1024,
+                 connect_timeout: float = 5.0, read_timeout: float = 10.0):
+        self.on_title = on_title
+        self.max_watchers = max_watchers
+        self.poll_interval = poll_interval
+        self.max_bytes_per_poll = max_bytes_per_poll
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._watch: Dict[str, str] = {}        # stationuuid -> 流地址
+        self._next_poll: Dict[str, float] = {}  # stationuuid -> 下次轮询时间
+        self._shared = set()
+        self._polling = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_watchers, thread_name_prefix="icy")
+        self._scheduler: Optional[threading.Thread] = None
+
+    def set_watch_list(self, stations: Iterable[Tuple[str, str]]):
+        """设置需要轮询的电台[(stationuuid, 流地址)]"""
+        with self._lock:
+            self._watch = {sid: url for sid, url in stations if sid and url}
+            for sid in list(self._next_poll):
+                if sid not in self._watch:
+                    del self._next_poll[sid]
+            if self._scheduler is None and self._watch:
+                self._scheduler = threading.Thread(target=self._schedule_loop, daemon=True, name="icy-scheduler")
+                self._scheduler.start()
+        self._wakeup.set()
+
+    def set_shared(self, station_id: str, shared: bool):
+        """标记电台已有其他连接在读取（不再单独轮询）"""
+        with self._lock:
+            if shared:
+                self._shared.add(station_id)
+            else:
+                self._shared.discard(station_id)
+
+    def close(self):
+        """停止轮询"""
+        self._closed = True
+        self._wakeup.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_loop(self):
+        while not self._closed:
+            now = time.time()
+            with self._lock:
+                due = [(sid, url) for sid, url in self._watch.items()
+                       if sid not in self._shared and sid not in self._polling
+                       and self._next_poll.get(sid, 0) <= now]
+                # 线程池的工作线程数就是同时连接数的上限，这里也不多提交
+                due = due[:max(0, self.max_watchers - len(self._polling))]
+                for sid, _ in due:
+                    self._polling.add(sid)
+                    self._next_poll[sid] = now + self.poll_interval
+            for sid, url in due:
+                self._executor.submit(self._poll, sid, url)
+            self._wakeup.wait(1.0)
+            self._wakeup.clear()
+
+    def _poll(self, station_id: str, url: str):
+        try:
+            title = self.read_title(url)
+            if title is None:
+                # 不支持ICY元数据的电台降低轮询频率
+                with self._lock:
+                    self._next_poll[station_id] = time.time() + self.poll_interval * 10
+            elif not self._closed:
+                self.on_title(station_id, title)
+        except Exception as e:
+            print(f"读取电台标题失败: {e}")
+        finally:
+            with self._lock:
+                self._polling.discard(station_id)
+            self._wakeup.set()
+
+    def read_title(self, url: str) -> Optional[str]:
+        """连接电台读取第一个StreamTitle后断开，读不到返回None"""
+        for _ in range(5):
+            try:
+                sock, status, headers, body, _, _ = open_stream(url, self.connect_timeout, self.read_timeout)
+            except ProbeError:
+                return None
+            if status in _REDIRECT_STATUSES and headers.get("location"):
+                sock.close()
+                url = urljoin(url, headers["location"])
+                continue
+            break
+        else:
+            return None
+
+        try:
+            metaint = metaint_of(headers)
+            if not 200 <= status < 300 or not metaint:
+                return None
+            parser = IcyParser(metaint)
+            received = 0
+            chunk = bytearray(16 * 1024)
+            view = memoryview(chunk)
+            data = body
+            while received <= self.max_bytes_per_poll and not self._closed:
+                if data:
+                    received += len(data)
+                    _, titles = parser.feed(data)
+                    if titles:
+                        return titles[-1]
+                count = sock.recv_into(view)
+                if not count:
+                    return None
+                data = view[:count]
+            return None
+        except OSError:
+            return None
+        finally:
+            sock.close()
@@ -1,3 +1,7 @@
+import time
+_PROCESS_START = time.perf_counter()  # --profile-startup从这里开始计时，包括导入模块的耗时
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
@@ -5,30 +9,108 @@ import threading
 import json
 import sys
 from typing import List, Dict
-from player import RadioPlayer
+from facets import FACETS, FacetIndex
+from persistence import get_shared_writer
+from player import RadioPlayer, VLC_AVAILABLE
+from search_engine import SearchEngine
+from search_pipeline import SearchPipeline
+from station import load_snapshot, save_snapshot
+from station_model import StationModel, EVENT_FAVORITE, EVENT_UPDATED
+from startup_profiler import StartupProfiler
+from stream_prober import StreamProber
+from virtual_list import VirtualTreeview
 import logging
 
+# Tcl/Tk路径的查找结果缓存，避免每次启动都扫描目录
+TCL_PATH_CACHE = "tcl_paths.json"
+
+
+def _find_tcl_paths():
+    """在Python安装目录中查找Tcl/Tk库，返回(tcl路径, tk路径)，找不到时为(None, None)"""
+    # 使用更灵活的路径查找方式
+    python_paths = [
+        os.path.dirname(os.path.dirname(sys.executable)),  # 当前Python路径
+        sys.prefix,  # Python安装目录
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),  # 脚本所在目录
+        # 手动路径（请修改为你的实际路径）
+        r"C:\Users\wangy\AppData\Local\Programs\Python\Python313"
+    ]
+
+    # 添加环境变量中的路径
+    if 'PYTHONHOME' in os.environ:
+        python_paths.append(os.environ['PYTHONHOME'])
+
+    for python_path in python_paths:
+        # 尝试不同版本的Tcl/Tk
+        for version in ['8.6', '8.5']:
+            tcl_candidate = os.path.join(python_path, "tcl", f"tcl{version}")
+            tk_candidate = os.path.join(python_path, "tcl", f"tk{version}")
+            if (os.path.exists(os.path.join(tcl_candidate, "init.tcl"))
+                    and os.path.exists(os.path.join(tk_candidate, "tk.tcl"))):
+                return tcl_candidate, tk_candidate
+    return None, None
+
+
+def setup_tcl_paths() -> bool:
+    """在创建Tk实例前设置Tcl/Tk库路径，解决初始化错误
+
+    查找结果（包括没有找到）按Python解释器缓存，之后启动只需检查缓存的路径是否仍然有效。
+    """
+    cached = None
+    try:
+        with open(TCL_PATH_CACHE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if cached and cached.get("executable") == sys.executable and (
+            cached.get("tcl") is None or os.path.exists(os.path.join(cached["tcl"], "init.tcl"))):
+        tcl_lib_path, tk_lib_path = cached.get("tcl"), cached.get("tk")
+    else:
+        tcl_lib_path, tk_lib_path = _find_tcl_paths()
+        try:
+            with open(TCL_PATH_CACHE, "w", encoding="utf-8") as f:
+                json.dump({"executable": sys.executable, "tcl": tcl_lib_path, "tk": tk_lib_path}, f)
+        except OSError:
+            pass
+
+    # 如果找到有效路径，设置环境变量
+    if tcl_lib_path and tk_lib_path:
+        os.environ["TCL_LIBRARY"] = tcl_lib_path
+        os.environ["TK_LIBRARY"] = tk_lib_path
+        os.environ["TCLHOME"] = os.path.dirname(tcl_lib_path)
+        return True
+    return False
+
 
 class GlobalRadioApp:
     # 常量定义
     DEFAULT_GEOMETRY = "1100x700"
+    SEARCH_RESULT_LIMIT = 500  # 搜索结果最多显示的电台数量
+    PROBE_TOP_COUNT = 50  # 加载目录后预先探测的热门电台数量
+    PROBE_DELAY_MS = 400  # 滚动停止多久后探测可见电台
+    PREWARM_DELAY_MS = 250  # 选中电台多久后预热
+    PREWARM_FAVORITE_COUNT = 3  # 启动时预热的收藏电台数量
+    PREWARM_STARTUP_DELAY_MS = 2000  # 启动多久后再预热收藏电台（预热会创建VLC实例）
+    SNAPSHOT_PATH = "catalog_snapshot.bin"  # 电台目录快照，启动时先显示它
     MIN_GEOMETRY = "900x600"
+    SORTABLE_COLUMNS = ("name", "country", "genre", "language", "bitrate")
+    FACET_LABELS = {"country": "国家", "language": "语言", "codec": "编码", "bitrate": "比特率", "tag": "标签"}
     COLUMN_CONFIG = {
         "favorite": {"width": 60, "anchor": "center"},
         "name": {"width": 250, "anchor": "w"},
+        "now_playing": {"width": 200, "anchor": "w"},
         "country": {"width": 120, "anchor": "center"},
         "genre": {"width": 180, "anchor": "w"},
         "language": {"width": 120, "anchor": "center"},
         "bitrate": {"width": 80, "anchor": "center"}
     }
 
-    def __init__(self, root):
+    def __init__(self, root, profiler: StartupProfiler = None):
         # 设置日志
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
-
-        # 首先强制设置Tcl/Tk路径（关键修复）
-        self.setup_tcl_paths()
+        self.profiler = profiler or StartupProfiler()
 
         self.root = root
         self.root.title("全球广播播放器")
@@ -37,19 +119,36 @@ class GlobalRadioApp:
 
         # 状态变量
         self.status_var = tk.StringVar(value="就绪 - 正在加载电台列表...")
-        self.current_playing_index = -1  # 当前播放的电台索引
+        self.current_station_id = None  # 当前播放的电台ID
+        self._reconnecting = False  # 播放器是否在自动重连
         self.current_view = "all"  # 当前视图："all"或"favorites"
         self.search_var = tk.StringVar()
 
         # 存储数据
-        self.all_radios: List[Dict] = []  # 所有电台
+        self.model = StationModel()  # 以stationuuid为键的电台目录和收藏
         self.filtered_radios: List[Dict] = []  # 当前显示的电台
-        self.favorite_radios: List[Dict] = []  # 收藏的电台
-        self.favorite_ids = set()  # 收藏的电台ID集合，用于快速判断
+        self.store = None  # 本地电台库（首次刷新时在后台线程打开）
+        self.search_engine = SearchEngine()  # 搜索引擎（倒排索引），每次加载电台目录时重建
+        self.prober = StreamProber()  # 流地址探测，用于隐藏失效电台和按起播速度排序
+        self._probe_after_id = None
+        self._prewarm_after_id = None
+        self.recorder = None  # 多电台录音，首次录音时创建
+        self.recordings_window = None
+        self.favicons = None  # 电台图标加载器，首次需要图标时创建
+        self.facet_index = FacetIndex()  # 分面筛选和列排序索引，每次加载电台目录时在后台重建
+        self.facet_selections: Dict[str, str] = {}  # 维度 -> 选中的取值
+        self.facet_values: Dict[str, List] = {}  # 维度 -> 下拉框各项对应的取值（第一项"全部"为None）
+        self.sort_column = None
+        self.sort_reverse = False
 
         # 初始化播放器
         self.player = RadioPlayer()
         self.player.add_state_callback(self.on_player_state_change)
+        self.player.add_metadata_callback(self.on_metadata_change)
+        # VLC事件在Tk主循环中按帧分发，回调可以直接操作控件
+        self.player.events.attach_tk(self.root)
+
+        self.profiler.mark("player")
 
         # 加载收藏的电台
         self.load_favorites()
@@ -62,62 +161,28 @@ class GlobalRadioApp:
 
         # 创建UI
         self.create_widgets()
+        self._update_facet_boxes()
+        self.model.subscribe(self.on_model_change)
+        self.profiler.mark("widgets")
+
+        # 在后台轮询收藏电台的正在播放标题
+        self._update_metadata_watch()
+
+        # 窗口显示出来后再预热最常听的收藏电台，缩短首次播放的等待
+        self.root.after(self.PREWARM_STARTUP_DELAY_MS, lambda: self.player.prewarm(
+            self._stream_url(r) for r in self.model.favorites()[:self.PREWARM_FAVORITE_COUNT]))
+
+        # 关闭窗口时先收尾（写完录音等）
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # 启动时加载电台
         self.refresh_radios()
 
-    def setup_tcl_paths(self):
-        """强制设置Tcl/Tk库路径，解决初始化错误"""
-        # 使用更灵活的路径查找方式
-        python_paths = [
-            os.path.dirname(os.path.dirname(sys.executable)),  # 当前Python路径
-            sys.prefix,  # Python安装目录
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 脚本所在目录
-        ]
-
-        # 添加环境变量中的路径
-        if 'PYTHONHOME' in os.environ:
-            python_paths.append(os.environ['PYTHONHOME'])
-
-        tcl_lib_path = None
-        tk_lib_path = None
-
-        for python_path in python_paths:
-            # 尝试不同版本的Tcl/Tk
-            for version in ['8.6', '8.5']:
-                tcl_candidate = os.path.join(python_path, "tcl", f"tcl{version}")
-                tk_candidate = os.path.join(python_path, "tcl", f"tk{version}")
-
-                if os.path.exists(os.path.join(tcl_candidate, "init.tcl")):
-                    tcl_lib_path = tcl_candidate
-
-                if os.path.exists(os.path.join(tk_candidate, "tk.tcl")):
-                    tk_lib_path = tk_candidate
-
-                if tcl_lib_path and tk_lib_path:
-                    break
-
-            if tcl_lib_path and tk_lib_path:
-                break
-
-        # 如果找到有效路径，设置环境变量
-        if tcl_lib_path and tk_lib_path:
-            os.environ["TCL_LIBRARY"] = tcl_lib_path
-            os.environ["TK_LIBRARY"] = tk_lib_path
-            os.environ["TCLHOME"] = os.path.dirname(tcl_lib_path)
-            return True
-        else:
-            return False
-
     def check_vlc_available(self):
-        """检查VLC是否正确安装"""
-        try:
-            import vlc
-            vlc.Instance()
-            return True
-        except Exception as e:
-            self.logger.error(f"VLC检查失败: {e}")
-            return False
+        """检查VLC是否正确安装（只检查能否加载libvlc，VLC实例在第一次播放时才创建）"""
+        if not VLC_AVAILABLE:
+            self.logger.error("VLC检查失败: 无法加载python-vlc或libvlc")
+        return VLC_AVAILABLE
 
     def create_widgets(self):
         # 主容器
@@ -172,58 +237,70 @@ class GlobalRadioApp:
         ttk.Label(search_frame, text="搜索:").pack(side=tk.LEFT, padx=(10, 5))
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=20)
         search_entry.pack(side=tk.LEFT)
+        self.search_pipeline = SearchPipeline(self.root, self._run_search, self._on_search_result)
         self.search_var.trace('w', self.on_search_change)
 
         # 电台数量统计
         self.count_label = ttk.Label(top_frame, text="电台数量：0")
         self.count_label.pack(side=tk.RIGHT, padx=(10, 0))
 
+        # 分面筛选栏：各下拉框显示在其他筛选条件下的电台数
+        filter_frame = ttk.Frame(main_container)
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        self.facet_boxes = {}
+        for facet in FACETS:
+            ttk.Label(filter_frame, text=f"{self.FACET_LABELS[facet]}:").pack(side=tk.LEFT, padx=(0, 3))
+            box = ttk.Combobox(filter_frame, state="readonly", width=14)
+            box.pack(side=tk.LEFT, padx=(0, 10))
+            box.bind("<<ComboboxSelected>>", lambda event, facet=facet: self.on_facet_change(facet))
+            self.facet_boxes[facet] = box
+        ttk.Button(filter_frame, text="清除筛选", command=self.clear_facets).pack(side=tk.LEFT)
+
         # 中间：电台列表区域
         list_frame = ttk.LabelFrame(main_container, text="电台列表（双击播放）")
         list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
 
-        # 创建水平滚动条
-        h_scrollbar = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL)
-        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-
-        # 创建垂直滚动条
-        v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        # 电台表格
-        columns = ("favorite", "name", "country", "genre", "language", "bitrate")
-        self.radio_tree = ttk.Treeview(
+        # 电台表格（虚拟化列表，只为可见行创建条目）
+        columns = ("favorite", "name", "now_playing", "country", "genre", "language", "bitrate")
+        self.radio_list = VirtualTreeview(
             list_frame,
             columns=columns,
-            show="headings",
-            height=18,
-            xscrollcommand=h_scrollbar.set,
-            yscrollcommand=v_scrollbar.set
+            row_builder=self._build_radio_row,
+            key_func=lambda radio: radio.get('stationuuid'),
+            image_func=lambda radio: self.favicons.get(radio.get('favicon')) if self.favicons else None,
+            show="tree headings",
+            height=18
         )
+        self.radio_tree = self.radio_list.tree
 
-        # 设置列标题和宽度
+        # 设置列标题和宽度（#0列只显示图标）
+        self.radio_tree.heading("#0", text="")
+        self.radio_tree.column("#0", width=36, minwidth=36, stretch=False, anchor="center")
         self.radio_tree.heading("favorite", text="收藏")
         self.radio_tree.heading("name", text="电台名称")
+        self.radio_tree.heading("now_playing", text="正在播放")
         self.radio_tree.heading("country", text="国家/地区")
         self.radio_tree.heading("genre", text="节目类型")
         self.radio_tree.heading("language", text="语言")
         self.radio_tree.heading("bitrate", text="比特率(kbps)")
+        # 点击可排序列的标题按该列排序，再次点击反向
+        self.column_titles = {col: self.radio_tree.heading(col, "text") for col in self.SORTABLE_COLUMNS}
+        for col in self.SORTABLE_COLUMNS:
+            self.radio_tree.heading(col, command=lambda col=col: self.sort_by(col))
 
         # 应用列配置
         for col, config in self.COLUMN_CONFIG.items():
             self.radio_tree.column(col, width=config["width"], anchor=config["anchor"])
 
-        # 关联滚动条
-        h_scrollbar.config(command=self.radio_tree.xview)
-        v_scrollbar.config(command=self.radio_tree.yview)
-
         # 放置表格
-        self.radio_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.radio_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
         # 绑定双击事件
         self.radio_tree.bind("<Double-1>", self.play_on_double_click)
         # 绑定选择事件
-        self.radio_tree.bind("<<TreeviewSelect>>", self.on_selection_change)
+        self.radio_list.bind_select(self.on_selection_change)
+        self.radio_list.bind_scroll(self._schedule_probe_visible)
+        self.radio_list.bind_scroll(self._request_visible_favicons)
 
         # 底部播放控制区
         control_frame = ttk.LabelFrame(main_container, text="播放控制")
@@ -258,7 +335,24 @@ class GlobalRadioApp:
             command=self.stop_playback,
             width=10
         )
-        self.stop_btn.pack(side=tk.LEFT, padx=(0, 20))
+        self.stop_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        # 录音按钮
+        self.record_btn = ttk.Button(
+            buttons_frame,
+            text="录制选中电台",
+            command=self.toggle_recording,
+            width=15
+        )
+        self.record_btn.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.recordings_btn = ttk.Button(
+            buttons_frame,
+            text="录音列表",
+            command=self.show_recordings,
+            width=10
+        )
+        self.recordings_btn.pack(side=tk.LEFT, padx=(0, 20))
 
         # 音量控制
         volume_frame = ttk.Frame(control_frame)
@@ -286,54 +380,106 @@ class GlobalRadioApp:
         """音量变化回调"""
         self.player.set_volume(value)
 
-    def on_selection_change(self, event):
+    def on_selection_change(self, station_id):
         """选择变化回调"""
-        selected = self.radio_tree.selection()
-        if selected:
-            index = self.radio_tree.index(selected[0])
-            if 0 <= index < len(self.filtered_radios):
-                radio = self.filtered_radios[index]
-                station_id = radio.get('stationuuid')
-                if station_id in self.favorite_ids:
-                    self.favorite_btn.config(text="取消收藏")
-                else:
-                    self.favorite_btn.config(text="收藏选中电台")
+        if station_id is not None:
+            if self.model.is_favorite(station_id):
+                self.favorite_btn.config(text="取消收藏")
+            else:
+                self.favorite_btn.config(text="收藏选中电台")
+            self._update_record_button(station_id)
+            self._schedule_prewarm()
+
+    def _schedule_prewarm(self):
+        """选中变化时防抖，停留片刻后再预热，避免键盘快速移动时预热大量电台"""
+        if self._prewarm_after_id is not None:
+            self.root.after_cancel(self._prewarm_after_id)
+        self._prewarm_after_id = self.root.after(self.PREWARM_DELAY_MS, self._prewarm_selection)
+
+    def _prewarm_selection(self):
+        """预热选中的电台及其上下相邻的电台"""
+        self._prewarm_after_id = None
+        index = self.radio_list.selected_index()
+        if index < 0:
+            return
+        neighbours = self.filtered_radios[max(0, index - 1):index + 2]
+        # 选中的电台放在最前面，最先开始预热
+        ordered = [self.filtered_radios[index]] + [r for r in neighbours if r is not self.filtered_radios[index]]
+        self.player.prewarm(self._stream_url(r) for r in ordered)
+
+    def _stream_url(self, radio):
+        """电台的播放地址（优先使用解析器缓存的最终流地址）"""
+        return self.player.resolve_url(radio.get("url_resolved") or radio.get("url"), radio.get("stationuuid"))
 
     def on_player_state_change(self, state):
         """播放器状态变化回调"""
         if state == "playing":
             self.pause_btn.config(text="暂停")
+            if self._reconnecting:
+                # 自动重连成功
+                self._reconnecting = False
+                radio = self.model.get(self.current_station_id)
+                if radio is not None:
+                    self.status_var.set(f"正在播放：{radio.get('name', '未知电台')}")
         elif state == "paused":
             self.pause_btn.config(text="继续")
         elif state == "stopped":
             self.pause_btn.config(text="暂停")
+        elif state == "reconnecting":
+            # 断流或卡顿，播放器正在自动重连（多次失败后会换备用地址）
+            self._reconnecting = True
+            self.status_var.set("连接中断，正在重连…")
         elif state == "ended":
+            # 播放器放弃重连后才会收到
+            self._reconnecting = False
             self.status_var.set("播放结束")
-            self.current_playing_index = -1
+            self.current_station_id = None
         elif state == "error":
+            self._reconnecting = False
             self.status_var.set("播放出错")
 
+    def on_metadata_change(self, update):
+        """电台标题变化回调（在主线程调用）"""
+        station_id, title = update
+        self.radio_list.refresh_key(station_id)
+        if station_id == self.current_station_id and title:
+            radio = self.model.get(station_id)
+            if radio is not None:
+                self.status_var.set(f"正在播放：{radio.get('name', '未知电台')} - {title}")
+
+    def _update_metadata_watch(self):
+        """把收藏的电台设为后台标题轮询的监视列表"""
+        self.player.watch_metadata(
+            (radio.get("stationuuid"), self._stream_url(radio)) for radio in self.model.favorites())
+
     def on_search_change(self, *args):
         """搜索框内容变化时的回调"""
         search_term = self.search_var.get().lower()
         if search_term:
-            # 进行搜索过滤
-            if self.current_view == "favorites":
-                base_list = [r for r in self.all_radios if r.get('stationuuid') in self.favorite_ids]
-            else:
-                base_list = self.all_radios
-
-            self.filtered_radios = [
-                r for r in base_list
-                if search_term in r.get("name", "").lower() or
-                   search_term in r.get("country", "").lower() or
-                   search_term in r.get("tags", "").lower() or
-                   search_term in r.get("language", "").lower()
-            ]
+            # 防抖后在后台线程搜索，收藏视图只在收藏的电台中搜索
+            within = set(self.model.favorite_ids) if self.current_view == "favorites" else None
+            self.search_pipeline.submit(search_term, engine=self.search_engine, within=within,
+                                        facet_index=self.facet_index, selections=dict(self.facet_selections))
         else:
             # 恢复原始过滤
+            self.search_pipeline.cancel()
             self._update_radio_list()
 
+    def _run_search(self, query, should_stop, engine, within, facet_index, selections):
+        """执行搜索（在后台线程调用）：模糊搜索并按相关度和热度排序
+
+        有筛选条件时只在满足条件的电台中搜索，结果数量上限不会被筛掉的电台占用。
+        """
+        if selections:
+            matched = facet_index.station_ids(selections)
+            within = matched if within is None else within & matched
+        return engine.search(query, limit=self.SEARCH_RESULT_LIMIT, within=within, should_stop=should_stop)
+
+    def _on_search_result(self, query, results):
+        """搜索结果回调（在主线程调用，只会收到最新一次查询的结果）"""
+        if self.sort_column:
+            results = self.facet_index.sort(results, self.sort_column, self.sort_reverse)
+        self.filtered_radios = [r for r in results if not self.prober.is_dead(r.get('stationuuid'))]
         self._refresh_radio_display()
 
     def refresh_radios(self):
@@ -348,62 +494,220 @@ class GlobalRadioApp:
     def _fetch_radios(self):
         """实际获取电台数据的函数（在后台执行）"""
         try:
-            from radio_api import RadioAPI  # 延迟导入，加快启动速度
-            api = RadioAPI()
-
-            # 获取热门电台
-            self.all_radios = api.get_popular_radios(limit=200)
+            # 首次启动先显示上次保存的目录快照，不等待打开数据库和同步
+            if len(self.model) == 0:
+                stations = load_snapshot(self.SNAPSHOT_PATH)
+                if stations:
+                    self.root.after(0, self._apply_snapshot, stations)
+                    # 快照先显示，再建立索引，电台库加载完之前也能搜索和筛选
+                    self.root.after(0, self._apply_snapshot_index, SearchEngine(stations), FacetIndex(stations))
 
-            # 过滤掉无效电台
-            self.all_radios = [
-                r for r in self.all_radios
-                if r.get('url_resolved') and r.get('name')
-            ]
-
-            # 切换到主线程更新UI
-            self.root.after(0, self._update_radio_list)
+            from radio_api import RadioAPI  # 延迟导入，加快启动速度
+            from station_store import StationStore
+            if self.store is None:
+                self.store = StationStore()
+                # 首次使用时从旧版JSON缓存迁移
+                if self.store.count() == 0:
+                    self.store.import_json_file("radio_cache.json")
+            from catalog_sync import CatalogSync
+            api = RadioAPI(store=self.store)
+
+            # 先显示本地电台库中已有的电台
+            if self.store.count() > 0:
+                self._load_catalog(api)
+
+            # 同步电台目录（首次分页全量导入，之后只拉取有变化的电台）
+            CatalogSync(api, self.store, progress=self._on_sync_progress).sync()
+            self._load_catalog(api, snapshot=True)
 
         except Exception as e:
             self.logger.error(f"获取电台列表时出错: {e}", exc_info=True)
             self.root.after(0, lambda: self.status_var.set(f"刷新失败：{str(e)}"))
+            self.root.after(0, self.profiler.finish, "failed")
         finally:
             # 恢复按钮状态
             self.root.after(0, lambda: self.refresh_btn.config(state=tk.NORMAL))
 
+    def _load_catalog(self, api, snapshot=False):
+        """从本地电台库读取电台并重建搜索索引（在后台线程执行），snapshot为True时同时更新目录快照"""
+        # 从本地电台库读取紧凑的电台记录，过滤掉无效电台
+        radios = api.query_stations(playable_only=True, compact=True)
+        engine = SearchEngine(radios)
+        facet_index = FacetIndex(radios)
+        if snapshot:
+            try:
+                save_snapshot(radios, self.SNAPSHOT_PATH)
+            except OSError as e:
+                self.logger.warning(f"保存电台目录快照失败: {e}")
+
+        # 切换到主线程更新模型，模型事件会刷新列表
+        self.root.after(0, self._apply_catalog, radios, engine, facet_index)
+
+    def _apply_catalog(self, radios, engine, facet_index):
+        """在主线程替换电台目录、搜索引擎和分面索引"""
+        self.search_engine = engine
+        self.facet_index = facet_index
+        # 新目录中不存在的筛选取值不再保留
+        self.facet_selections = {facet: value for facet, value in self.facet_selections.items()
+                                 if facet_index.has_value(facet, value)}
+        self._update_facet_boxes()
+        self.model.load(radios)
+        self.profiler.finish("catalog")
+
+        # 预先探测收藏和热门电台，完成后按探测结果重新排序
+        targets = self.model.favorites() + self.model.stations()[:self.PROBE_TOP_COUNT]
+        self.prober.submit(targets, lambda results: self.root.after(
+            0, self._apply_probe_results, results, True))
+
+    def _apply_snapshot(self, stations):
+        """显示目录快照（在主线程调用）；本地电台库已经先加载完时忽略"""
+        if len(self.model) > 0:
+            return
+        self.model.load(stations)
+        self.profiler.mark("snapshot")
+
+    def _apply_snapshot_index(self, engine, facet_index):
+        """使用目录快照的搜索引擎和分面索引（在主线程调用）；电台库的目录已经加载时忽略"""
+        if len(self.facet_index) > 0:
+            return
+        self.search_engine = engine
+        self.facet_index = facet_index
+        self._update_facet_boxes()
+        self._refresh_list_view()
+
+    def _schedule_probe_visible(self):
+        """视口变化时防抖，滚动停下后再探测可见电台"""
+        if self._probe_after_id is not None:
+            self.root.after_cancel(self._probe_after_id)
+        self._probe_after_id = self.root.after(self.PROBE_DELAY_MS, self._probe_visible)
+
+    def _request_visible_favicons(self):
+        """加载可见行的图标（已滚出视口的图标不再下载）"""
+        if self.favicons is None:
+            if not self.radio_list.visible_items():
+                return
+            from favicon_loader import FaviconLoader  # 延迟导入（会导入requests），加快启动速度
+            self.favicons = FaviconLoader(self.root, on_loaded=lambda urls: self.radio_list.refresh_rows())
+        self.favicons.request(radio.get('favicon') for radio in self.radio_list.visible_items())
+
+    def _probe_visible(self):
+        """探测视口内的电台（已有未过期结果的会跳过）"""
+        self._probe_after_id = None
+        self.prober.submit(self.radio_list.visible_items(), lambda results: self.root.after(
+            0, self._apply_probe_results, results, False))
+
+    def _apply_probe_results(self, results, reorder):
+        """应用探测结果（在主线程调用）
+
+        reorder为True时重新排序并隐藏失效电台；否则只更新对应的行，
+        避免用户正在浏览时列表跳动。
+        """
+        if reorder and self.current_view == "all" and not self.search_var.get():
+            self._update_radio_list()
+        else:
+            for station_id in results:
+                self.radio_list.refresh_key(station_id)
+
+    def _on_sync_progress(self, phase, count):
+        """电台目录同步进度回调（在后台线程调用）"""
+        if phase == "import":
+            text = f"正在导入电台目录：已导入 {count} 个电台..."
+        else:
+            text = f"电台目录已更新：{count} 个电台有变化"
+        self.root.after(0, lambda: self.status_var.set(text))
+
     def _update_radio_list(self):
         """更新电台列表显示"""
         # 根据当前视图筛选电台
         if self.current_view == "favorites":
-            self.filtered_radios = [r for r in self.all_radios if r.get('stationuuid') in self.favorite_ids]
+            radios = self.facet_index.filter(self.model.favorites(), self.facet_selections)
+            if self.sort_column:
+                radios = self.facet_index.sort(radios, self.sort_column, self.sort_reverse)
+            self.filtered_radios = radios
+        elif self.facet_selections or self.sort_column:
+            # 筛选和排序都由预先建立的索引完成，不需要逐个比较电台
+            radios = self.facet_index.select(self.facet_selections, self.sort_column, self.sort_reverse)
+            if self.sort_column:
+                self.filtered_radios = [r for r in radios if not self.prober.is_dead(r.get('stationuuid'))]
+            else:
+                self.filtered_radios = self.prober.order(radios)
         else:
-            self.filtered_radios = self.all_radios.copy()
+            self.filtered_radios = self.prober.order(self.model.stations())
 
         self._refresh_radio_display()
 
+    def _update_facet_boxes(self):
+        """刷新各筛选下拉框的选项和计数"""
+        for facet, box in self.facet_boxes.items():
+            counts = self.facet_index.counts(facet, self.facet_selections)
+            total = self.facet_index.total(
+                {f: v for f, v in self.facet_selections.items() if f != facet})
+            self.facet_values[facet] = [None] + [value for value, _, _ in counts]
+            box["values"] = [f"全部 ({total})"] + [f"{label} ({count})" for _, label, count in counts]
+            selected = self.facet_selections.get(facet)
+            box.current(self.facet_values[facet].index(selected) if selected in self.facet_values[facet] else 0)
+
+    def on_facet_change(self, facet):
+        """筛选下拉框选择变化"""
+        index = self.facet_boxes[facet].current()
+        values = self.facet_values.get(facet, [None])
+        value = values[index] if 0 <= index < len(values) else None
+        if value is None:
+            self.facet_selections.pop(facet, None)
+        else:
+            self.facet_selections[facet] = value
+        self._update_facet_boxes()
+        self._refresh_list_view()
+
+    def clear_facets(self):
+        """清除所有筛选条件"""
+        self.facet_selections.clear()
+        self._update_facet_boxes()
+        self._refresh_list_view()
+
+    def sort_by(self, column):
+        """按列排序，再次点击同一列时反向"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        for col, title in self.column_titles.items():
+            mark = (" ▼" if self.sort_reverse else " ▲") if col == self.sort_column else ""
+            self.radio_tree.heading(col, text=title + mark)
+        self._refresh_list_view()
+
+    def _refresh_list_view(self):
+        """按当前视图重新生成列表，正在搜索时重新执行搜索"""
+        if self.search_var.get():
+            self.on_search_change()
+        else:
+            self._update_radio_list()
+
+    def _build_radio_row(self, radio):
+        """生成电台在列表中显示的一行内容"""
+        # 标记收藏状态
+        station_id = radio.get('stationuuid')
+        favorite_mark = "★" if self.model.is_favorite(station_id) else ""
+        # 探测过的电台显示实际比特率，失效的电台标记为不可用
+        bitrate = radio.get("bitrate", "0")
+        probe = self.prober.get(station_id)
+        if probe is not None:
+            bitrate = (probe["bitrate"] or bitrate) if probe["ok"] else "不可用"
+        return (
+            favorite_mark,
+            radio.get("name", "未知名称"),
+            self.player.get_now_playing(station_id),
+            radio.get("country", "未知地区"),
+            radio.get("tags", "未知类型").replace(",", " | ")[:30],
+            radio.get("language", "未知语言"),
+            bitrate
+        )
+
     def _refresh_radio_display(self):
         """刷新电台列表显示（不重新获取数据）"""
-        # 清空现有列表
-        for item in self.radio_tree.get_children():
-            self.radio_tree.delete(item)
-
-        # 添加新数据
-        for radio in self.filtered_radios:
-            station_id = radio.get('stationuuid')
-            # 标记收藏状态
-            favorite_mark = "★" if station_id in self.favorite_ids else ""
-
-            self.radio_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    favorite_mark,
-                    radio.get("name", "未知名称"),
-                    radio.get("country", "未知地区"),
-                    radio.get("tags", "未知类型").replace(",", " | ")[:30],
-                    radio.get("language", "未知语言"),
-                    radio.get("bitrate", "0")
-                )
-            )
+        # 虚拟列表只重绘可见行
+        self.radio_list.set_items(self.filtered_radios)
 
         # 更新数量统计
         count = len(self.filtered_radios)
@@ -415,6 +719,21 @@ class GlobalRadioApp:
         else:
             self.status_var.set(f"就绪 - 显示 {count} 个电台")
 
+    def on_model_change(self, event, payload):
+        """电台模型事件回调：按事件修补列表，而不是每次都重建"""
+        if event == EVENT_FAVORITE:
+            self._update_metadata_watch()
+        if event == EVENT_FAVORITE and self.current_view != "favorites":
+            self.radio_list.refresh_key(payload[0])
+        elif event == EVENT_UPDATED:
+            for station_id in payload:
+                self.radio_list.refresh_key(station_id)
+        elif self.search_var.get():
+            # 列表成员有变化，正在搜索时重新执行搜索以保留搜索结果
+            self.on_search_change()
+        else:
+            self._update_radio_list()
+
     def switch_view(self, view_type):
         """切换电台视图（所有/收藏）"""
         self.current_view = view_type
@@ -429,101 +748,90 @@ class GlobalRadioApp:
 
     def toggle_favorite(self):
         """收藏/取消收藏选中的电台"""
-        selected = self.radio_tree.selection()
-        if not selected:
+        station_id = self.radio_list.selected_key()
+        if station_id is None:
             self.status_var.set("请先选中一个电台")
             return
 
-        # 获取选中电台的索引
-        index = self.radio_tree.index(selected[0])
-        if 0 <= index < len(self.filtered_radios):
-            radio = self.filtered_radios[index]
-            station_id = radio.get('stationuuid')
-
-            if station_id in self.favorite_ids:
-                # 取消收藏
-                self.favorite_ids.remove(station_id)
-                self.favorite_radios = [r for r in self.favorite_radios if r.get('stationuuid') != station_id]
-                self.status_var.set(f"已取消收藏：{radio.get('name', '未知电台')}")
-                self.favorite_btn.config(text="收藏选中电台")
-            else:
-                # 添加收藏
-                self.favorite_ids.add(station_id)
-                self.favorite_radios.append(radio)
-                self.status_var.set(f"已收藏：{radio.get('name', '未知电台')}")
-                self.favorite_btn.config(text="取消收藏")
+        radio = self.model.get(station_id)
+        if radio is None:
+            self.status_var.set("选中的电台不存在")
+            return
 
-            # 保存收藏
-            self.save_favorites()
-            # 更新列表
-            self._update_radio_list()
+        # 切换收藏状态（模型事件会修补对应的行）
+        if self.model.toggle_favorite(station_id):
+            self.status_var.set(f"已收藏：{radio.get('name', '未知电台')}")
+            self.favorite_btn.config(text="取消收藏")
         else:
-            self.status_var.set("选中的电台不存在")
+            self.status_var.set(f"已取消收藏：{radio.get('name', '未知电台')}")
+            self.favorite_btn.config(text="收藏选中电台")
+
+        # 保存收藏
+        self.save_favorites()
 
     def load_favorites(self):
         """加载收藏的电台"""
         try:
             if os.path.exists("favorites.json"):
                 with open("favorites.json", "r", encoding="utf-8") as f:
-                    self.favorite_radios = json.load(f)
-                    # 更新ID集合
-                    self.favorite_ids = {r.get('stationuuid') for r in self.favorite_radios if r.get('stationuuid')}
+                    self.model.load_favorites(json.load(f))
         except Exception as e:
             self.logger.error(f"加载收藏失败：{e}")
-            self.favorite_radios = []
-            self.favorite_ids = set()
+            self.model.load_favorites([])
 
     def save_favorites(self):
-        """保存收藏的电台到本地"""
+        """保存收藏的电台到本地（在后台合并写入，连续收藏多个电台只写一次文件）"""
+        get_shared_writer().write_json("favorites.json", self.model.favorite_records(),
+                                       on_error=self._on_save_favorites_error, ensure_ascii=False)
+
+    def _on_save_favorites_error(self, error):
+        """保存收藏失败（在后台线程调用）"""
+        self.logger.error(f"保存收藏失败：{error}")
         try:
-            with open("favorites.json", "w", encoding="utf-8") as f:
-                json.dump(self.favorite_radios, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.logger.error(f"保存收藏失败：{e}")
-            self.status_var.set(f"保存收藏失败：{str(e)}")
+            self.root.after(0, lambda: self.status_var.set(f"保存收藏失败：{str(error)}"))
+        except RuntimeError:
+            # 窗口已关闭
+            pass
 
     def play_on_double_click(self, event):
         """双击播放选中的电台"""
-        selected = self.radio_tree.selection()
-        if selected:
-            self.current_playing_index = self.radio_tree.index(selected[0])
+        radio = self.radio_list.item_at(event.y)
+        if radio is not None:
+            self.radio_list.select_key(radio.get('stationuuid'))
             self.play_selected()
 
     def play_selected(self):
         """播放选中的电台"""
-        selected = self.radio_tree.selection()
-        if not selected:
+        station_id = self.radio_list.selected_key()
+        radio = self.model.get(station_id)
+        if radio is None:
             self.status_var.set("请先选中一个电台")
             return
 
-        self.current_playing_index = self.radio_tree.index(selected[0])
-
-        if 0 <= self.current_playing_index < len(self.filtered_radios):
-            radio = self.filtered_radios[self.current_playing_index]
-            stream_url = radio.get("url_resolved") or radio.get("url")
-
-            if stream_url:
-                try:
-                    # 播放电台
-                    self.player.play_stream(stream_url)
-                    self.status_var.set(f"正在播放：{radio.get('name', '未知电台')}")
-                    # 更新收藏按钮状态
-                    station_id = radio.get('stationuuid')
-                    if station_id in self.favorite_ids:
-                        self.favorite_btn.config(text="取消收藏")
-                    else:
-                        self.favorite_btn.config(text="收藏选中电台")
-                except Exception as e:
-                    self.logger.error(f"播放电台时出错: {e}")
-                    self.status_var.set(f"播放失败：{str(e)}")
-                    self.current_playing_index = -1
-            else:
-                self.status_var.set("该电台无可用播放地址")
-                self.current_playing_index = -1
+        stream_url = radio.get("url_resolved") or radio.get("url")
+        if stream_url:
+            try:
+                # 播放电台（播放器会优先使用缓存的最终流地址）
+                self.player.play_stream(stream_url, station_id, fallback_urls=[radio.get("url")])
+                self.current_station_id = station_id
+                self._reconnecting = False
+                self.status_var.set(f"正在播放：{radio.get('name', '未知电台')}")
+                # 更新收藏按钮状态
+                if self.model.is_favorite(station_id):
+                    self.favorite_btn.config(text="取消收藏")
+                else:
+                    self.favorite_btn.config(text="收藏选中电台")
+            except Exception as e:
+                self.logger.error(f"播放电台时出错: {e}")
+                self.status_var.set(f"播放失败：{str(e)}")
+                self.current_station_id = None
+        else:
+            self.status_var.set("该电台无可用播放地址")
+            self.current_station_id = None
 
     def toggle_play_pause(self):
         """切换播放/暂停状态"""
-        if self.current_playing_index == -1 or not self.filtered_radios:
+        if self.current_station_id is None:
             self.status_var.set("请先选择电台播放")
             return
 
@@ -532,37 +840,140 @@ class GlobalRadioApp:
             self.status_var.set("已暂停播放")
         else:
             self.player.resume()
-            if 0 <= self.current_playing_index < len(self.filtered_radios):
-                radio_name = self.filtered_radios[self.current_playing_index].get('name', '未知电台')
-                self.status_var.set(f"继续播放：{radio_name}")
+            radio = self.model.get(self.current_station_id)
+            if radio is not None:
+                self.status_var.set(f"继续播放：{radio.get('name', '未知电台')}")
 
     def stop_playback(self):
         """停止播放"""
         self.player.stop()
         self.status_var.set("已停止播放")
-        self.current_playing_index = -1
+        self.current_station_id = None
+
+
+    def on_close(self):
+        """关闭窗口：停止录音并把缓冲区中的数据写完后退出"""
+        if self.recorder is not None:
+            self.recorder.stop_all()
+        if self.favicons is not None:
+            self.favicons.close()
+        # 写完还没保存的收藏和播放器配置
+        get_shared_writer().flush()
+        self.root.destroy()
+
+    def toggle_recording(self):
+        """开始/停止录制选中的电台（可以同时录制多个电台）"""
+        station_id = self.radio_list.selected_key()
+        radio = self.model.get(station_id)
+        if radio is None:
+            self.status_var.set("请先选中一个电台")
+            return
 
+        if self.recorder is None:
+            from recorder import Recorder  # 延迟导入，加快启动速度
+            # 录音连接顺带读取流中的标题，与播放器共用标题通知
+            self.recorder = Recorder(on_metadata=self.player.publish_metadata)
+
+        name = radio.get("name", "未知电台")
+        if self.recorder.is_recording(station_id):
+            self.recorder.stop(station_id)
+            if station_id != self.player.current_station_id:
+                self.player.set_metadata_shared(station_id, False)
+            self.status_var.set(f"已停止录制：{name}")
+        else:
+            stream_url = self.player.resolve_url(radio.get("url_resolved") or radio.get("url"), station_id)
+            try:
+                self.recorder.start(station_id, stream_url, name)
+            except RuntimeError as e:
+                self.status_var.set(str(e))
+                return
+            self.player.set_metadata_shared(station_id, True)
+            self.status_var.set(f"正在录制：{name}")
+        self._update_record_button(station_id)
+
+    def _update_record_button(self, station_id):
+        """根据选中电台的录制状态更新录音按钮"""
+        if self.recorder is not None and self.recorder.is_recording(station_id):
+            self.record_btn.config(text="停止录制")
+        else:
+            self.record_btn.config(text="录制选中电台")
 
-if __name__ == "__main__":
-    # 在创建Tk实例前最后一次设置Tcl路径
-    # 获取Python安装路径（尝试多种方式）
-    python_paths = [
-        # 从解释器路径获取
-        os.path.dirname(os.path.dirname(sys.executable)),
-        # 手动路径（请修改为你的实际路径）
-        r"C:\Users\wangy\AppData\Local\Programs\Python\Python313"
-    ]
+    def show_recordings(self):
+        """显示录音列表窗口（每秒刷新吞吐量和丢弃字节数）"""
+        if self.recordings_window is not None and self.recordings_window.winfo_exists():
+            self.recordings_window.lift()
+            return
 
-    # 尝试设置路径
-    for python_path in python_paths:
-        tcl_path = os.path.join(python_path, "tcl", "tcl8.6")
-        tk_path = os.path.join(python_path, "tcl", "tk8.6")
-        if os.path.exists(os.path.join(tcl_path, "init.tcl")):
-            os.environ["TCL_LIBRARY"] = tcl_path
-            os.environ["TK_LIBRARY"] = tk_path
-            break
+        window = tk.Toplevel(self.root)
+        window.title("录音列表")
+        window.geometry("760x300")
+        columns = ("name", "state", "throughput", "written", "dropped", "files")
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        for col, text, width in (("name", "电台名称", 220), ("state", "状态", 90),
+                                 ("throughput", "速率(KB/s)", 100), ("written", "已写入(MB)", 100),
+                                 ("dropped", "丢弃(KB)", 90), ("files", "文件数", 70)):
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor="w" if col == "name" else "center")
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.recordings_window = window
+
+        state_names = {"connecting": "连接中", "recording": "录制中",
+                       "reconnecting": "重连中", "stopped": "已停止"}
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            stats = self.recorder.stats() if self.recorder is not None else []
+            tree.delete(*tree.get_children())
+            for item in stats:
+                state = state_names.get(item["state"], item["state"])
+                if item["error"]:
+                    state = f"{state}（{item['error']}）"
+                tree.insert("", tk.END, values=(
+                    item["name"],
+                    state,
+                    f"{item['throughput'] / 1024:.1f}",
+                    f"{item['bytes_written'] / (1024 * 1024):.1f}",
+                    f"{item['dropped'] / 1024:.0f}",
+                    item["files"],
+                ))
+            window.after(1000, refresh)
+
+        refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全球广播播放器")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="输出启动各阶段的耗时（显示出电台目录后退出）")
+    parser.add_argument("--headless", action="store_true",
+                        help="不显示界面，以本地HTTP/JSON服务方式运行")
+    parser.add_argument("--host", default="127.0.0.1", help="无界面服务监听的地址")
+    parser.add_argument("--port", type=int, default=8765, help="无界面服务监听的端口")
+    parser.add_argument("--no-sync", action="store_true", help="无界面服务不从网络同步电台目录")
+    args = parser.parse_args()
+
+    if args.headless:
+        from headless import run_headless  # 不需要Tk
+        run_headless(args.host, args.port, sync=not args.no_sync)
+        return
+
+    profiler = StartupProfiler(enabled=args.profile_startup, start=_PROCESS_START)
+    profiler.mark("imports")
+    # 在创建Tk实例前设置Tcl路径
+    setup_tcl_paths()
+    profiler.mark("tcl_paths")
 
     # 启动应用
     root = tk.Tk()
-    app = GlobalRadioApp(root)
+    profiler.mark("tk_root")
+    if args.profile_startup:
+        profiler.on_finish = lambda: root.after(0, root.destroy)
+    # 空闲回调在主循环开始、窗口第一次绘制时执行
+    root.after_idle(profiler.mark, "first_paint")
+    app = GlobalRadioApp(root, profiler=profiler)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+_shared_writer: Optional["DebouncedWriter"] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_writer() -> "DebouncedWriter":
+    """获取进程内共享的延迟写入器（进程退出时自动写完未保存的数据）"""
+    global _shared_writer
+    with _shared_lock:
+        if _shared_writer is None:
+            _shared_writer = DebouncedWriter()
+            atexit.register(_shared_writer.close)
+        return _shared_writer
+
+
+def atomic_write(path: str, data: bytes):
+    """先写临时文件并落盘，再替换目标文件；中途崩溃也不会留下写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DebouncedWriter:
+    """合并写入的配置持久化
+
+    同一个文件在delay秒内的多次保存只写最后一次（连续保存时最晚max_delay秒写一次），
+    序列化和磁盘I/O都在后台线程完成，调用方（通常是Tk主线程）只登记数据。
+    传入的数据在登记后不应再被修改。flush()立即写完所有未保存的数据，退出前调用。
+    """
+
+    def __init__(self, delay: float = 0.5, max_delay: float = 2.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        # 文件路径 -> {"data", "dump_kwargs", "on_error", "first", "last"}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        # 写文件时持有，保证同一文件的新数据不会被旧数据覆盖
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def write_json(self, path: str, data: Any, on_error: Optional[Callable[[Exception], None]] = None,
+                   **dump_kwargs):
+        """登记要保存为JSON的数据，稍后在后台写入；on_error在后台线程中调用"""
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(path)
+            self._pending[path] = {
+                "data": data,
+                "dump_kwargs": dump_kwargs,
+                "on_error": on_error,
+                "first": entry["first"] if entry else now,
+                "last": now,
+            }
+            if self._closed:
+                # 已关闭时不再有后台线程，直接写
+                pending = self._take(lambda entry: True)
+            else:
+                pending = None
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True, name="persistence")
+                    self._thread.start()
+                self._cond.notify()
+        if pending:
+            with self._write_lock:
+                self._write(pending)
+
+    def flush(self):
+        """立即写入所有未保存的数据（阻塞）"""
+        with self._write_lock:
+            with self._cond:
+                pending = self._take(lambda entry: True)
+            self._write(pending)
+
+    def close(self):
+        """写完未保存的数据并停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def _due(self, entry: Dict[str, Any]) -> float:
+        return min(entry["last"] + self.delay, entry["first"] + self.max_delay)
+
+    def _take(self, should_take: Callable[[Dict[str, Any]], bool]) -> Dict[str, Dict[str, Any]]:
+        """取出满足条件的待写数据（调用方持有_cond）"""
+        taken = {path: entry for path, entry in self._pending.items() if should_take(entry)}
+        for path in taken:
+            del self._pending[path]
+        return taken
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        wait = min(self._due(entry) for entry in self._pending.values()) - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+            with self._write_lock:
+                with self._cond:
+                    now = time.monotonic()
+                    pending = self._take(lambda entry: self._due(entry) <= now)
+                self._write(pending)
+
+    @staticmethod
+    def _write(pending: Dict[str, Dict[str, Any]]):
+        for path, entry in pending.items():
+            try:
+                data = json.dumps(entry["data"], **entry["dump_kwargs"]).encode("utf-8")
+                atomic_write(path, data)
+            except Exception as e:
+                if entry["on_error"] is not None:
+                    entry["on_error"](e)
+                else:
+                    print(f"保存{path}失败: {e}")
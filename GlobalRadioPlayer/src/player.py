@@ -1,35 +1,407 @@
 try:
     import vlc
     VLC_AVAILABLE = True
-except ImportError:
+except (ImportError, OSError):
+    # OSError：装了python-vlc但找不到libvlc
     VLC_AVAILABLE = False
     print("警告: 未安装 VLC 模块，播放功能将不可用")
     print("请运行 'pip install python-vlc' 安装")
 
 import json
 import os
-from typing import Callable, Optional
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
 
+from persistence import get_shared_writer
+
+# VLC缓冲时长（毫秒）：网络流默认1000毫秒，直播电台不需要这么长的缓冲
+DEFAULT_NETWORK_CACHING = 600
+DEFAULT_LIVE_CACHING = 300
+
+
+_shared_instance = None
+_shared_instance_lock = threading.Lock()
+
+
+def get_vlc_instance(args: Iterable[str] = ()):
+    """进程内共享的VLC实例，首次调用时创建（创建时要加载全部插件，比较慢）"""
+    global _shared_instance
+    with _shared_instance_lock:
+        if _shared_instance is None:
+            _shared_instance = vlc.Instance(*args)
+        return _shared_instance
+
+
+EVENT_STATE = "state"  # 播放状态变化，payload为状态字符串
+EVENT_METADATA = "metadata"  # 电台标题变化，payload为(stationuuid, 标题)
+_REPEATABLE_STATES = ("playing", "paused", "stopped")
+
+
+class PlayerEventBus:
+    """播放器事件总线：VLC回调线程只把事件放进队列，由使用方自己的事件循环取出分发
+
+    deque的append/popleft是原子操作，生产者不需要加锁，也不会被慢的回调阻塞。
+    每次取出时合并同一批中的事件：同一种事件（和同一个key）只保留最后一次；
+    播放状态只合并相邻的播放/暂停/停止，结束、出错、重连等状态每次都分发，
+    播放状态和上次已分发的相同时不再分发。
+    attach_tk()按帧间隔在Tk主循环中分发，attach_asyncio()在asyncio事件循环中分发；
+    两者都没有挂接时在post()中直接同步分发。
+    """
 
-class RadioPlayer:
     def __init__(self):
+        self._queue = deque()
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._last_delivered: Dict[str, Any] = {}
+        self._tk_root = None
+        self._tk_interval = 16
+        self._tk_after_id = None
+        self._loop = None
+        self._drain_scheduled = False
+
+    def subscribe(self, event: str, callback: Callable[[Any], None]):
+        """订阅事件，callback(payload)在使用方的事件循环中调用"""
+        self._subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event: str, callback: Callable[[Any], None]):
+        """取消订阅"""
+        callbacks = self._subscribers.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def post(self, event: str, payload: Any = None, key: Any = None):
+        """发布事件（任意线程调用，不阻塞）；key不同的同种事件不会相互合并"""
+        self._queue.append((event, key, payload))
+        if self._loop is not None:
+            # 一批事件只安排一次分发
+            if not self._drain_scheduled:
+                self._drain_scheduled = True
+                self._loop.call_soon_threadsafe(self.drain)
+        elif self._tk_root is None:
+            self.drain()
+
+    def attach_tk(self, root, interval_ms: int = 16):
+        """在Tk主循环中按帧间隔分发事件"""
+        self.detach()
+        self._tk_root = root
+        self._tk_interval = interval_ms
+        self._tk_after_id = root.after(interval_ms, self._tk_pump)
+
+    def attach_asyncio(self, loop):
+        """在asyncio事件循环中分发事件"""
+        self.detach()
+        self._loop = loop
+        if self._queue:
+            self._drain_scheduled = True
+            loop.call_soon_threadsafe(self.drain)
+
+    def detach(self):
+        """取消挂接，之后的事件同步分发"""
+        if self._tk_root is not None and self._tk_after_id is not None:
+            try:
+                self._tk_root.after_cancel(self._tk_after_id)
+            except Exception:
+                pass
+        self._tk_root = None
+        self._tk_after_id = None
+        self._loop = None
+        self._drain_scheduled = False
+
+    def _tk_pump(self):
+        self.drain()
+        if self._tk_root is not None:
+            self._tk_after_id = self._tk_root.after(self._tk_interval, self._tk_pump)
+
+    def drain(self):
+        """取出队列中的全部事件，合并后分发（在使用方的事件循环中调用）"""
+        self._drain_scheduled = False
+        latest: Dict[tuple, Any] = {}
+        state_run = 0  # 被其他状态隔开的播放/暂停/停止分属不同的段，只在段内合并
+        queue = self._queue
+        while queue:
+            event, key, payload = queue.popleft()
+            slot = (event, key)
+            if event == EVENT_STATE:
+                if payload not in _REPEATABLE_STATES:
+                    state_run += 1
+                    slot = (event, key, state_run)
+                    state_run += 1
+                else:
+                    slot = (event, key, state_run)
+            # 重新插入使事件按最后一次出现的顺序分发
+            latest.pop(slot, None)
+            latest[slot] = payload
+        for slot, payload in latest.items():
+            event = slot[0]
+            if event == EVENT_STATE:
+                # 重复的播放/暂停/停止状态没有意义；结束和出错每次都要通知
+                if payload in _REPEATABLE_STATES and self._last_delivered.get(event) == payload:
+                    continue
+                self._last_delivered[event] = payload
+            for callback in list(self._subscribers.get(event, ())):
+                try:
+                    callback(payload)
+                except Exception as e:
+                    print(f"播放器事件处理失败: {e}")
+
+
+class StreamSupervisor:
+    """断流自动恢复：监视播放中断和缓冲卡顿，按指数退避重连，多次失败后切换到备用地址
+
+    VLC回调线程只登记事件，重连在定时器线程中执行（不能在VLC回调中调用播放器）。
+    同一地址连续失败failover_after次后换下一个候选地址（缓存的最终地址、url_resolved、url……），
+    连续失败max_failures次后放弃并通知"error"。播放稳定stable_after秒后失败计数清零。
+    每次重连的时间、地址和结果记录在attempts中。
+    """
+
+    def __init__(self, player: "RadioPlayer", base_delay: float = 1.0, max_delay: float = 30.0,
+                 failover_after: int = 2, max_failures: int = 10, stall_timeout: float = 15.0,
+                 stable_after: float = 30.0, history: int = 50):
+        self.player = player
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failover_after = failover_after
+        self.max_failures = max_failures
+        self.stall_timeout = stall_timeout  # 连接或缓冲超过这个时间没有恢复视为卡死
+        self.stable_after = stable_after
+        self.attempts: deque = deque(maxlen=history)  # 最近的重连记录
+        self._lock = threading.RLock()
+        self._generation = 0  # 每次开始/停止监视时加一，过期的定时器据此忽略
+        self._station_id: Optional[str] = None
+        self._candidates: List[str] = []
+        self._index = 0
+        self._failures = 0  # 连续失败次数
+        self._url_failures = 0  # 当前地址的连续失败次数
+        self._playing_since: Optional[float] = None
+        self._buffering = False
+        self._attempt: Optional[Dict[str, Any]] = None  # 进行中的重连
+        self._reconnect_timer: Optional[threading.Timer] = None
+        self._watchdog: Optional[threading.Timer] = None
+        self.state = "idle"  # idle / watching / reconnecting / failed
+
+    # ---- 由RadioPlayer调用 ----
+
+    def begin(self, station_id: Optional[str], candidates: Iterable[str]):
+        """开始监视新的播放（用户发起），候选地址按优先级排列，第一个是正在播放的地址"""
+        with self._lock:
+            self._reset()
+            self._station_id = station_id
+            self._candidates = [url for url in dict.fromkeys(candidates) if url]
+            self.state = "watching"
+            self._arm_watchdog()
+
+    def end(self):
+        """停止监视（用户停止或切换播放器）"""
+        with self._lock:
+            self._reset()
+            self.state = "idle"
+
+    def on_playing(self):
+        with self._lock:
+            if self.state == "idle":
+                return
+            self._playing_since = time.monotonic()
+            if not self._buffering:
+                self._cancel_watchdog()
+            if self._attempt is not None:
+                self._finish_attempt("ok")
+            self.state = "watching"
+
+    def on_buffering(self, cache: float):
+        """缓冲进度（百分比）：开始缓冲时启动卡顿检测，缓冲满后取消"""
+        with self._lock:
+            if self.state == "idle":
+                return
+            if cache >= 100:
+                self._buffering = False
+                self._cancel_watchdog()
+            elif not self._buffering:
+                self._buffering = True
+                self._arm_watchdog()
+
+    def on_failure(self, reason: str) -> bool:
+        """播放结束或出错；安排了重连返回True，不在监视或已放弃时返回False"""
+        with self._lock:
+            if self.state in ("idle", "failed") or not self._candidates:
+                return False
+            if self._reconnect_timer is not None:
+                # 已经安排了重连（例如卡顿后又收到结束事件）
+                return True
+            self._cancel_watchdog()
+            now = time.monotonic()
+            if self._playing_since is not None and now - self._playing_since >= self.stable_after:
+                # 稳定播放过一段时间后的中断，从头开始退避
+                self._failures = 0
+                self._url_failures = 0
+            if self._attempt is not None:
+                self._finish_attempt("failed")
+            self._playing_since = None
+            self._buffering = False
+            self._failures += 1
+            self._url_failures += 1
+            if self._failures > self.max_failures:
+                self.state = "failed"
+                self._record(reason, None, 0, "gave_up")
+                return False
+
+            if self._url_failures >= self.failover_after and len(self._candidates) > 1:
+                self._failover()
+            delay = min(self.max_delay, self.base_delay * 2 ** (self._failures - 1))
+            self.state = "reconnecting"
+            self._attempt = self._record(reason, self._candidates[self._index], delay, "pending")
+            self._reconnect_timer = threading.Timer(delay, self._reconnect, (self._generation,))
+            self._reconnect_timer.daemon = True
+            self._reconnect_timer.start()
+            return True
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "station_id": self._station_id,
+                "url": self._candidates[self._index] if self._candidates else None,
+                "failures": self._failures,
+                "attempts": list(self.attempts)[-10:],
+            }
+
+    # ---- 内部 ----
+
+    def _reset(self):
+        self._generation += 1
+        for timer in (self._reconnect_timer, self._watchdog):
+            if timer is not None:
+                timer.cancel()
+        self._reconnect_timer = self._watchdog = None
+        if self._attempt is not None:
+            self._finish_attempt("cancelled")
+        self._station_id = None
+        self._candidates = []
+        self._index = self._failures = self._url_failures = 0
+        self._playing_since = None
+        self._buffering = False
+
+    def _failover(self):
+        """换到下一个候选地址；放弃的是第一个（解析器缓存的）地址时同时丢弃缓存"""
+        if self._index == 0 and self._station_id:
+            self.player.invalidate_resolved(self._station_id)
+        self._index = (self._index + 1) % len(self._candidates)
+        self._url_failures = 0
+
+    def _record(self, reason: str, url: Optional[str], delay: float, outcome: str) -> Dict[str, Any]:
+        attempt = {
+            "station_id": self._station_id,
+            "reason": reason,
+            "url": url,
+            "failures": self._failures,
+            "delay": delay,
+            "time": time.time(),
+            "outcome": outcome,
+        }
+        self.attempts.append(attempt)
+        return attempt
+
+    def _finish_attempt(self, outcome: str):
+        self._attempt["outcome"] = outcome
+        if "started" in self._attempt:
+            self._attempt["elapsed"] = round(time.monotonic() - self._attempt.pop("started"), 3)
+        self._attempt = None
+
+    def _reconnect(self, generation: int):
+        # 不能持有self._lock调用VLC（VLC回调线程也要获取它）；用播放器的启动锁与用户操作互斥
+        with self.player._start_lock:
+            with self._lock:
+                if generation != self._generation or self.state != "reconnecting":
+                    return
+                self._reconnect_timer = None
+                self._attempt["started"] = time.monotonic()
+                url, station_id = self._candidates[self._index], self._station_id
+                self._arm_watchdog()
+            started = self.player._start(url, station_id)
+        if not started:
+            self.player._on_supervised_failure("error")
+
+    def _arm_watchdog(self):
+        self._cancel_watchdog()
+        if self.stall_timeout <= 0:
+            return
+        self._watchdog = threading.Timer(self.stall_timeout, self._on_stall, (self._generation,))
+        self._watchdog.daemon = True
+        self._watchdog.start()
+
+    def _cancel_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+    def _on_stall(self, generation: int):
+        with self._lock:
+            if generation != self._generation or self._watchdog is None:
+                return
+            self._watchdog = None
+        # 查询VLC状态时不能持有self._lock，查询后再确认期间没有开始新的播放或重连
+        if self.player.is_paused():
+            # 用户在缓冲时暂停，不算卡顿
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+        self.player._on_supervised_failure("stalled")
+
+
+class RadioPlayer:
+    PREWARM_MAX_ENTRIES = 8  # 预热媒体的最大数量
+    PREWARM_TTL = 120  # 预热媒体的有效期（秒），流地址中的令牌可能过期
+    PREWARM_PARSE_TIMEOUT_MS = 5000
+
+    def __init__(self, writer=None, config_path: Optional[str] = "player_config.json", stream_resolver=None):
+        self.writer = writer or get_shared_writer()  # 配置在后台合并写入
+        self.config_path = config_path  # 为None时不读写配置文件（由使用方管理，如播放分区）
+        self.output_device: Optional[str] = None  # 音频输出设备ID，None为系统默认
+        self.network_caching = DEFAULT_NETWORK_CACHING
+        self.live_caching = DEFAULT_LIVE_CACHING
+        # 预热的媒体：url -> (Media, 创建时间)，按最近使用排序
+        self._prewarmed: "OrderedDict[str, tuple]" = OrderedDict()
+        self._prewarm_lock = threading.Lock()
+        self._resolver = None  # DNS预解析线程池，首次预热时创建
+        self._stream_resolver = stream_resolver  # 播放列表/重定向解析器，未传入时首次使用时创建
+        self.current_station_id = None
+        self._now_playing: Dict[str, str] = {}  # stationuuid -> 正在播放的标题
+        self._metadata_hub = None  # 收藏电台标题轮询，首次设置监视列表时创建
+        self._meta_media = None  # 正在监听元数据的媒体
+        self.events = PlayerEventBus()  # VLC事件经由总线交给使用方的事件循环
+        self.supervisor = StreamSupervisor(self)  # 断流时自动重连和切换备用地址
+        self._start_lock = threading.Lock()  # 用户播放/停止与自动重连互斥
+
         if not VLC_AVAILABLE:
             self.instance = None
             self.player = None
             self.volume = 70
             self.current_url = None
-            self.state_callbacks = []
             self.load_config()
             return
 
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
         self.volume = 70  # 默认音量
         self.current_url = None
-        self.state_callbacks = []
-        self.load_config()  # 加载保存的音量设置
-        # 应用保存的音量
+        self.load_config()  # 加载保存的音量和缓冲设置
+        # VLC实例和播放器在第一次播放或预热时才创建，不拖慢启动
+        self.instance = None
+        self.player = None
+        self.event_manager = None
+
+    def _ensure_player(self):
+        """创建VLC播放器（使用进程内共享的VLC实例）"""
+        if self.player is not None:
+            return
+        self.instance = get_vlc_instance(self._instance_args())
+        self.player = self.instance.media_player_new()
+        # 应用保存的音量和输出设备
         self.player.audio_set_volume(self.volume)
+        if self.output_device:
+            self.player.audio_output_device_set(None, self.output_device)
 
         # 设置事件管理器
         self.event_manager = self.player.event_manager()
@@ -37,30 +409,28 @@ class RadioPlayer:
         self.event_manager.event_attach(vlc.EventType.MediaPlayerPlaying, self._on_playing)
         self.event_manager.event_attach(vlc.EventType.MediaPlayerPaused, self._on_paused)
         self.event_manager.event_attach(vlc.EventType.MediaPlayerStopped, self._on_stopped)
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._on_error)
+        self.event_manager.event_attach(vlc.EventType.MediaPlayerBuffering, self._on_buffering)
 
     def add_state_callback(self, callback: Callable[[str], None]):
-        """添加状态变化回调"""
+        """添加状态变化回调（在事件总线挂接的事件循环中调用）"""
         if not VLC_AVAILABLE:
             return
-        self.state_callbacks.append(callback)
+        self.events.subscribe(EVENT_STATE, callback)
 
     def remove_state_callback(self, callback: Callable[[str], None]):
         """移除状态变化回调"""
         if not VLC_AVAILABLE:
             return
-        if callback in self.state_callbacks:
-            self.state_callbacks.remove(callback)
+        self.events.unsubscribe(EVENT_STATE, callback)
 
     def _notify_state_change(self, state: str):
-        """通知状态变化"""
-        for callback in self.state_callbacks:
-            try:
-                callback(state)
-            except Exception:
-                pass
+        """通知状态变化（可能在VLC事件线程中调用，只入队不等待回调）"""
+        self.events.post(EVENT_STATE, state)
 
     def _on_playing(self, event):
         """播放事件处理"""
+        self.supervisor.on_playing()
         self._notify_state_change("playing")
 
     def _on_paused(self, event):
@@ -72,8 +442,91 @@ class RadioPlayer:
         self._notify_state_change("stopped")
 
     def _on_end_reached(self, event):
-        """播放结束事件处理"""
-        self._notify_state_change("ended")
+        """播放结束事件处理（直播流结束意味着断流）"""
+        self._on_supervised_failure("ended")
+
+    def _on_error(self, event):
+        """播放出错事件处理"""
+        self._on_supervised_failure("error")
+
+    def _on_buffering(self, event):
+        """缓冲事件处理"""
+        self.supervisor.on_buffering(event.u.new_cache)
+
+    def _on_supervised_failure(self, reason: str):
+        """断流、出错或卡顿：能重连时通知"reconnecting"，否则通知原状态"""
+        if self.supervisor.on_failure(reason):
+            self._notify_state_change("reconnecting")
+        else:
+            self._notify_state_change("error" if reason == "stalled" else reason)
+
+    def invalidate_resolved(self, station_id: str):
+        """丢弃电台缓存的最终流地址（地址失效时），下次播放时重新解析"""
+        if self._stream_resolver is not None:
+            self._stream_resolver.invalidate(station_id)
+
+    # ---- 正在播放的标题 ----
+
+    def add_metadata_callback(self, callback: Callable[[tuple], None]):
+        """添加标题变化回调，参数为(stationuuid, 标题)"""
+        self.events.subscribe(EVENT_METADATA, callback)
+
+    def remove_metadata_callback(self, callback: Callable[[tuple], None]):
+        """移除标题变化回调"""
+        self.events.unsubscribe(EVENT_METADATA, callback)
+
+    def publish_metadata(self, station_id: str, title: str):
+        """上报电台的当前标题（任意线程调用），标题有变化时通知订阅者"""
+        if not station_id or self._now_playing.get(station_id) == title:
+            return
+        self._now_playing[station_id] = title
+        self.events.post(EVENT_METADATA, (station_id, title), key=station_id)
+
+    def get_now_playing(self, station_id: Optional[str]) -> str:
+        """电台最近一次上报的标题，没有返回空字符串"""
+        return self._now_playing.get(station_id, "")
+
+    def watch_metadata(self, stations: Iterable[tuple]):
+        """设置需要在后台轮询标题的电台[(stationuuid, 流地址)]，通常是收藏的电台"""
+        stations = list(stations)
+        if self._metadata_hub is None:
+            if not stations:
+                return
+            from icy_metadata import MetadataHub  # 延迟导入，加快启动速度
+            self._metadata_hub = MetadataHub(self.publish_metadata)
+            if self.current_station_id:
+                self._metadata_hub.set_shared(self.current_station_id, True)
+        self._metadata_hub.set_watch_list(stations)
+
+    def set_metadata_shared(self, station_id: str, shared: bool):
+        """标记电台已有连接在读取并上报标题（如正在录制），后台轮询会跳过它"""
+        if self._metadata_hub is not None:
+            self._metadata_hub.set_shared(station_id, shared)
+
+    def _set_current_station(self, station_id: Optional[str]):
+        # 正在播放的电台由VLC上报标题，不需要后台再连接
+        if self.current_station_id and self.current_station_id != station_id:
+            self.set_metadata_shared(self.current_station_id, False)
+        self.current_station_id = station_id
+        if station_id:
+            self.set_metadata_shared(station_id, True)
+
+    def _attach_media_meta(self, media):
+        """监听媒体的元数据变化（VLC解析流中的ICY标题后触发）"""
+        self._meta_media = media
+        try:
+            media.event_manager().event_attach(vlc.EventType.MediaMetaChanged, self._on_meta_changed, media)
+        except Exception as e:
+            print(f"监听媒体元数据失败: {e}")
+
+    def _on_meta_changed(self, event, media):
+        """元数据变化事件处理（在VLC事件线程中调用）"""
+        # 切换电台后旧媒体的事件直接忽略
+        if media is not self._meta_media or self.current_station_id is None:
+            return
+        title = media.get_meta(vlc.Meta.NowPlaying)
+        if title:
+            self.publish_metadata(self.current_station_id, title)
 
     def set_volume(self, value):
         """设置音量（0 - 100）"""
@@ -88,53 +541,243 @@ class RadioPlayer:
             self.volume = int(float(value))
             # 确保音量在有效范围内
             self.volume = max(0, min(100, self.volume))
-            self.player.audio_set_volume(self.volume)
+            if self.player is not None:
+                self.player.audio_set_volume(self.volume)
             self.save_config()  # 保存音量到本地
         except Exception as e:
             print(f"设置音量失败: {e}")
 
     def load_config(self):
         """从本地加载配置（音量）"""
+        if self.config_path is None:
+            return
         try:
-            if os.path.exists("player_config.json"):
-                with open("player_config.json", "r") as f:
+            if os.path.exists(self.config_path):
+                with open(self.config_path, "r") as f:
                     config = json.load(f)
                     self.volume = config.get("volume", 70)
+                    self.network_caching = int(config.get("network_caching", DEFAULT_NETWORK_CACHING))
+                    self.live_caching = int(config.get("live_caching", DEFAULT_LIVE_CACHING))
         except Exception as e:
             print(f"加载配置失败: {e}")
             self.volume = 70
 
     def save_config(self):
-        """保存配置到本地"""
+        """保存配置到本地（拖动音量条时连续调用也只会在停下后写一次文件）"""
+        if self.config_path is None:
+            return
+        self.writer.write_json(self.config_path, {
+            "volume": self.volume,
+            "network_caching": self.network_caching,
+            "live_caching": self.live_caching,
+        }, on_error=lambda e: print(f"保存配置失败: {e}"))
+
+    def set_output_device(self, device: Optional[str]):
+        """设置音频输出设备（设备ID来自output_devices()），None为系统默认"""
+        self.output_device = device or None
+        if VLC_AVAILABLE and self.player is not None:
+            self.player.audio_output_device_set(None, self.output_device)
+
+    def output_devices(self) -> List[tuple]:
+        """当前音频输出模块的设备列表[(设备ID, 描述)]"""
+        if not VLC_AVAILABLE:
+            return []
+        self._ensure_player()
+        devices = []
+        head = self.player.audio_output_device_enum()
+        if head:
+            node = head
+            while node:
+                device = node.contents
+                devices.append((device.device.decode("utf-8", "replace"),
+                                device.description.decode("utf-8", "replace")))
+                node = device.next
+            vlc.libvlc_audio_output_device_list_release(head)
+        return devices
+
+    def release(self):
+        """停止播放并释放VLC播放器和预热的媒体（共享的VLC实例保留）"""
+        self.stop()
+        with self._prewarm_lock:
+            stale = [media for media, _ in self._prewarmed.values()]
+            self._prewarmed.clear()
+        for media in stale:
+            self._release_media(media)
+        if self._metadata_hub is not None:
+            self._metadata_hub.close()
+            self._metadata_hub = None
+        if self.player is not None:
+            self.player.release()
+            self.player = None
+            self.event_manager = None
+
+    def _instance_args(self) -> List[str]:
+        return [f"--network-caching={self.network_caching}", f"--live-caching={self.live_caching}"]
+
+    def set_caching(self, network_caching: Optional[int] = None, live_caching: Optional[int] = None):
+        """设置VLC缓冲时长（毫秒），对之后创建的媒体生效；值越小起播越快，但越容易卡顿"""
+        if network_caching is not None:
+            self.network_caching = max(0, int(network_caching))
+        if live_caching is not None:
+            self.live_caching = max(0, int(live_caching))
+        with self._prewarm_lock:
+            # 已预热的媒体带着旧的缓冲参数，丢弃
+            stale = [media for media, _ in self._prewarmed.values()]
+            self._prewarmed.clear()
+        for media in stale:
+            self._release_media(media)
+        self.save_config()
+
+    def _new_media(self, stream_url: str):
+        """创建带缓冲参数的媒体"""
+        media = self.instance.media_new(stream_url)
+        media.add_option(f":network-caching={self.network_caching}")
+        media.add_option(f":live-caching={self.live_caching}")
+        return media
+
+    # ---- 预热 ----
+
+    def prewarm(self, stream_urls: Iterable[str]):
+        """预热即将可能播放的电台：提前解析域名，并创建媒体在后台预解析（建立连接、识别格式）
+
+        预热是尽力而为的，失败不影响正常播放；play_stream会优先使用预热过的媒体。
+        """
+        if not VLC_AVAILABLE:
+            return
+        urls = [url for url in dict.fromkeys(stream_urls) if url and url != self.current_url]
+        if not urls:
+            return
+        if self._resolver is None:
+            self._resolver = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prewarm")
         try:
-            with open("player_config.json", "w") as f:
-                json.dump({"volume": self.volume}, f)
+            self._ensure_player()
         except Exception as e:
-            print(f"保存配置失败: {e}")
+            print(f"创建VLC播放器失败: {e}")
+            return
+        now = time.monotonic()
+        evicted = []
+        with self._prewarm_lock:
+            for url in urls:
+                entry = self._prewarmed.get(url)
+                if entry is not None and now - entry[1] < self.PREWARM_TTL:
+                    self._prewarmed.move_to_end(url)
+                    continue
+                self._resolver.submit(self._resolve_host, url)
+                try:
+                    media = self._new_media(url)
+                    self._start_parse(media)
+                except Exception as e:
+                    print(f"预热媒体失败: {e}")
+                    continue
+                if entry is not None:
+                    evicted.append(entry[0])
+                self._prewarmed[url] = (media, now)
+                self._prewarmed.move_to_end(url)
+            while len(self._prewarmed) > self.PREWARM_MAX_ENTRIES:
+                evicted.append(self._prewarmed.popitem(last=False)[1][0])
+        for media in evicted:
+            self._release_media(media)
+
+    def _start_parse(self, media):
+        """在VLC的后台线程中异步解析媒体（包括网络流）"""
+        if hasattr(media, "parse_with_options"):
+            media.parse_with_options(vlc.MediaParseFlag.network, self.PREWARM_PARSE_TIMEOUT_MS)
+        else:
+            media.parse_async()
+
+    @staticmethod
+    def _release_media(media):
+        """释放预热媒体，解析还在进行时先停止"""
+        try:
+            if hasattr(media, "parse_stop"):
+                media.parse_stop()
+            media.release()
+        except Exception as e:
+            print(f"释放媒体失败: {e}")
+
+    @staticmethod
+    def _resolve_host(stream_url: str):
+        """提前解析域名，让系统DNS缓存命中"""
+        parts = urlsplit(stream_url)
+        if not parts.hostname:
+            return
+        try:
+            socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+                               type=socket.SOCK_STREAM)
+        except OSError:
+            pass
+
+    def _take_prewarmed(self, stream_url: str):
+        """取出未过期的预热媒体，没有返回None"""
+        with self._prewarm_lock:
+            entry = self._prewarmed.pop(stream_url, None)
+        if entry is None:
+            return None
+        media, created = entry
+        if time.monotonic() - created >= self.PREWARM_TTL:
+            self._release_media(media)
+            return None
+        return media
+
+    def resolve_url(self, stream_url: str, station_id: Optional[str] = None) -> str:
+        """返回电台缓存的最终流地址（已展开播放列表和重定向），没有缓存时返回原地址
+
+        不会阻塞：缓存缺失或过旧时在后台解析，下次播放即可直接使用。
+        """
+        if not station_id or not stream_url:
+            return stream_url
+        if self._stream_resolver is None:
+            from stream_resolver import StreamResolver  # 延迟导入，加快启动速度
+            self._stream_resolver = StreamResolver()
+        return self._stream_resolver.cached(station_id, stream_url)
 
-    def play_stream(self, stream_url: str) -> int:
-        """播放流媒体url"""
+    def play_stream(self, stream_url: str, station_id: Optional[str] = None,
+                    fallback_urls: Iterable[str] = ()) -> int:
+        """播放流媒体url；提供station_id时优先使用缓存的最终流地址
+
+        fallback_urls是同一电台的备用地址（如电台的原始url），断流重连多次失败后依次尝试。
+        """
         if not VLC_AVAILABLE:
             print("VLC 不可用，无法播放")
             return -1
 
         try:
-            if self.current_url == stream_url and self.player.get_state() in [vlc.State.Playing, vlc.State.Paused]:
+            self._ensure_player()
+            resolved_url = self.resolve_url(stream_url, station_id)
+            if self.current_url == resolved_url and self.player.get_state() in [vlc.State.Playing, vlc.State.Paused]:
                 # 如果是同一个URL且正在播放或暂停，则恢复播放
                 if self.player.get_state() == vlc.State.Paused:
                     self.player.play()
                 return 0
+        except Exception as e:
+            print(f"播放失败: {e}")
+            self._notify_state_change("error")
+            return -1
+
+        with self._start_lock:
+            self.supervisor.begin(station_id, [resolved_url, stream_url, *fallback_urls])
+            started = self._start(resolved_url, station_id)
+            if not started:
+                self.supervisor.end()
+        if not started:
+            self._notify_state_change("error")
+            return -1
+        self._notify_state_change("playing")
+        return 0
 
+    def _start(self, stream_url: str, station_id: Optional[str]) -> bool:
+        """用新媒体开始播放（用户播放和自动重连共用）"""
+        try:
             self.current_url = stream_url
-            media = self.instance.media_new(stream_url)
+            # 优先使用预热过的媒体，省去重新创建和解析的时间
+            media = self._take_prewarmed(stream_url) or self._new_media(stream_url)
             self.player.set_media(media)
-            result = self.player.play()
-            self._notify_state_change("playing")
-            return result
+            self._attach_media_meta(media)
+            self._set_current_station(station_id)
+            return self.player.play() == 0
         except Exception as e:
             print(f"播放失败: {e}")
-            self._notify_state_change("error")
-            return -1
+            return False
 
     def is_playing(self) -> bool:
         """判断是否正在播放"""
@@ -191,6 +834,9 @@ class RadioPlayer:
         """停止播放"""
         if not VLC_AVAILABLE or not self.player:
             return
-        self.player.stop()
+        with self._start_lock:
+            self.supervisor.end()
+            self.player.stop()
         self._notify_state_change("stopped")
         self.current_url = None
+        self._set_current_station(None)
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from persistence import get_shared_writer
+from player import RadioPlayer
+
+ZONES_CONFIG = "zones.json"
+_REPLACEABLE_KINDS = ("play", "pause")  # 排队时可以被同类新操作取代的操作
+
+
+class PlayerPool:
+    """播放分区池：在一个进程中用同一个VLC实例驱动多个互相独立的播放分区
+
+    每个分区是一个RadioPlayer，有自己的音量、输出设备、播放状态和事件回调。
+    VLC的播放和停止会阻塞（停止网络流要等待连接线程退出），这些操作交给一个
+    有限大小的线程池执行：同一分区的操作按顺序执行，排在队尾的同类操作会被新操作取代
+    （连续切换电台只执行最后一次，暂停和继续互相取代），停止和释放不会被取代，
+    不同分区的操作并行执行。
+    """
+
+    def __init__(self, max_workers: int = 4, config_path: Optional[str] = ZONES_CONFIG, writer=None):
+        self.config_path = config_path
+        self.writer = writer or get_shared_writer()
+        self._zones: Dict[str, RadioPlayer] = {}
+        self._managed: Set[str] = set()  # 由分区池保存配置的分区
+        self._config: Dict[str, Dict[str, Any]] = self._load_config()
+        self._resolver = None  # 各分区共用的流地址解析器
+        self._loop = None
+        self._tk_root = None
+        self._lock = threading.Lock()
+        # 按播放器对象（而不是分区名）排队，移除分区后立即创建同名分区时，两者的操作互不取代
+        self._pending: Dict[RadioPlayer, List[Tuple[str, Callable[[], Any], Future]]] = {}  # 播放器 -> 排队中的(类别, 操作, Future)
+        self._running: Set[RadioPlayer] = set()  # 正在执行操作的播放器
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zone")
+
+    # ---- 分区管理 ----
+
+    def create_zone(self, name: str, volume: Optional[int] = None, output_device: Optional[str] = None) -> RadioPlayer:
+        """创建分区；未指定的音量和输出设备使用上次保存的设置，音量无效时抛出ValueError"""
+        if name in self._zones:
+            raise ValueError(f"分区已存在: {name}")
+        saved = self._config.get(name, {})
+        if volume is not None:
+            volume = self._parse_volume(volume)
+        elif "volume" in saved:
+            try:
+                volume = self._parse_volume(saved["volume"])
+            except ValueError:
+                pass  # 配置文件中的音量无效时使用默认音量
+        player = RadioPlayer(writer=self.writer, config_path=None, stream_resolver=self._shared_resolver())
+        if volume is not None:
+            player.volume = volume
+        player.output_device = output_device or saved.get("output_device")
+        self._managed.add(name)
+        self.add_zone(name, player)
+        self._save_config()
+        return player
+
+    @staticmethod
+    def _parse_volume(value) -> int:
+        """把音量解析为0-100的整数（与RadioPlayer.set_volume相同），无法解析或不是有限数时抛出ValueError"""
+        try:
+            return max(0, min(100, int(float(value))))
+        except (TypeError, OverflowError):
+            raise ValueError(f"无效的音量: {value!r}")
+
+    def add_zone(self, name: str, player: RadioPlayer):
+        """把已有的播放器加入分区池（其配置由播放器自己保存）"""
+        if name in self._zones:
+            raise ValueError(f"分区已存在: {name}")
+        self._zones[name] = player
+        if self._loop is not None:
+            player.events.attach_asyncio(self._loop)
+        elif self._tk_root is not None:
+            player.events.attach_tk(self._tk_root)
+
+    def remove_zone(self, name: str) -> Future:
+        """停止并移除分区（释放在后台执行）"""
+        player = self.zone(name)
+        del self._zones[name]
+        if name in self._managed:
+            self._managed.discard(name)
+            self._config.pop(name, None)
+            self._save_config()
+        return self._schedule(player, "release", player.release)
+
+    def zone(self, name: str) -> RadioPlayer:
+        """按名称获取分区，不存在时抛出KeyError"""
+        try:
+            return self._zones[name]
+        except KeyError:
+            raise KeyError(f"没有这个分区: {name}")
+
+    def zones(self) -> List[str]:
+        return list(self._zones)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._zones
+
+    def _shared_resolver(self):
+        if self._resolver is None:
+            from stream_resolver import StreamResolver  # 延迟导入，加快启动速度
+            self._resolver = StreamResolver()
+        return self._resolver
+
+    # ---- 事件 ----
+
+    def attach_asyncio(self, loop):
+        """所有分区（包括之后创建的）的事件都在asyncio事件循环中分发"""
+        self._loop, self._tk_root = loop, None
+        for player in self._zones.values():
+            player.events.attach_asyncio(loop)
+
+    def attach_tk(self, root):
+        """所有分区（包括之后创建的）的事件都在Tk主循环中分发"""
+        self._loop, self._tk_root = None, root
+        for player in self._zones.values():
+            player.events.attach_tk(root)
+
+    # ---- 播放控制（在线程池中执行，返回Future） ----
+
+    def play(self, name: str, stream_url: str, station_id: Optional[str] = None,
+             fallback_urls: Iterable[str] = ()) -> Future:
+        player = self.zone(name)
+        fallback_urls = list(fallback_urls)
+        return self._schedule(player, "play", lambda: player.play_stream(stream_url, station_id, fallback_urls))
+
+    def stop(self, name: str) -> Future:
+        player = self.zone(name)
+        return self._schedule(player, "stop", player.stop)
+
+    def pause(self, name: str) -> Future:
+        player = self.zone(name)
+        return self._schedule(player, "pause", player.pause)
+
+    def resume(self, name: str) -> Future:
+        player = self.zone(name)
+        return self._schedule(player, "pause", player.resume)
+
+    def play_many(self, targets: Dict[str, Tuple[str, Optional[str]]]) -> Dict[str, Future]:
+        """同时在多个分区开始播放：{分区: (流地址, stationuuid)}"""
+        return {name: self.play(name, url, station_id) for name, (url, station_id) in targets.items()}
+
+    def stop_all(self) -> Dict[str, Future]:
+        """停止所有分区"""
+        return {name: self.stop(name) for name in self._zones}
+
+    # ---- 设置（立即生效） ----
+
+    def set_volume(self, name: str, volume) -> int:
+        """设置分区音量（限制在0-100），音量无效（包括nan、inf）时抛出ValueError"""
+        player = self.zone(name)
+        player.set_volume(self._parse_volume(volume))
+        self._save_config()
+        return player.volume
+
+    def set_output_device(self, name: str, device: Optional[str]):
+        self.zone(name).set_output_device(device)
+        self._save_config()
+
+    def output_devices(self) -> List[tuple]:
+        """可用的音频输出设备[(设备ID, 描述)]"""
+        for player in self._zones.values():
+            return player.output_devices()
+        probe = RadioPlayer(writer=self.writer, config_path=None)
+        try:
+            return probe.output_devices()
+        finally:
+            probe.release()
+
+    def status(self, name: str) -> Dict[str, Any]:
+        player = self.zone(name)
+        with self._lock:
+            busy = player in self._running or player in self._pending
+        return {
+            "name": name,
+            "state": player.get_state(),
+            "station_id": player.current_station_id,
+            "url": player.current_url,
+            "volume": player.volume,
+            "output_device": player.output_device,
+            "busy": busy,
+            "reconnect": player.supervisor.state,
+        }
+
+    def close(self):
+        """停止并释放所有分区"""
+        for name in list(self._zones):
+            player = self._zones.pop(name)
+            self._schedule(player, "release", player.release)
+        self._executor.shutdown(wait=True)
+
+    # ---- 调度 ----
+
+    def _schedule(self, player: RadioPlayer, kind: str, func: Callable[[], Any]) -> Future:
+        """安排分区的操作，同一分区同时只执行一个操作
+
+        kind相同的play或pause（暂停和继续）操作排在队尾时，旧操作被取代（其Future被取消）；
+        stop和release总会执行。
+        """
+        future: Future = Future()
+        superseded = None
+        with self._lock:
+            queue = self._pending.setdefault(player, [])
+            if queue and queue[-1][0] == kind and kind in _REPLACEABLE_KINDS:
+                superseded = queue.pop()
+            queue.append((kind, func, future))
+            start = player not in self._running
+            if start:
+                self._running.add(player)
+        if superseded is not None:
+            superseded[2].cancel()
+        if start:
+            self._executor.submit(self._drain, player)
+        return future
+
+    def _drain(self, player: RadioPlayer):
+        while True:
+            with self._lock:
+                queue = self._pending.get(player)
+                if not queue:
+                    self._pending.pop(player, None)
+                    self._running.discard(player)
+                    return
+                _, func, future = queue.pop(0)
+                if not queue:
+                    del self._pending[player]
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except Exception as e:
+                print(f"分区操作失败: {e}")
+                future.set_exception(e)
+
+    # ---- 配置 ----
+
+    def _load_config(self) -> Dict[str, Dict[str, Any]]:
+        if self.config_path is None or not os.path.exists(self.config_path):
+            return {}
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            return config if isinstance(config, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"加载分区配置失败: {e}")
+            return {}
+
+    def _save_config(self):
+        for name in self._managed:
+            player = self._zones[name]
+            self._config[name] = {"volume": player.volume, "output_device": player.output_device}
+        if self.config_path is not None:
+            self.writer.write_json(self.config_path, dict(self._config), ensure_ascii=False)
@@ -1,82 +1,89 @@
-import requests
-import time
-import json
+import asyncio
 import os
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List, Dict, Optional
+from http_client import RadioHTTPClient, get_shared_client
+from rate_limiter import TokenBucket
+from response_cache import ResponseCache, make_cache_key
+from station_store import StationStore
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_limiter: Optional[TokenBucket] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> ResponseCache:
+    """获取进程内共享的响应缓存（多个RadioAPI实例复用同一内存层）"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
+
+
+def get_shared_limiter() -> TokenBucket:
+    """获取进程内共享的限速器（每秒1个请求，允许3个突发请求）
+
+    设置环境变量RADIO_API_LOCK_FILE后，多个进程通过该锁文件共享同一个令牌桶。
+    """
+    global _shared_limiter
+    with _shared_cache_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucket(rate=1, burst=3, lock_file=os.environ.get("RADIO_API_LOCK_FILE"))
+        return _shared_limiter
 
 
 class RadioAPI:
-    def __init__(self):
-        self.base_url = "https://de1.api.radio-browser.info/json/stations"
-        # 添加用户代理，避免被API拒绝
-        self.headers = {
-            "User-Agent": "GlobalRadioPlayer/1.0"
-        }
-        # 添加请求间隔，避免触发API限制
-        self.last_request_time = 0
-        self.request_interval = 1  # 1秒间隔
-        self.cache_file = "radio_cache.json"
+    def __init__(self, cache: Optional[ResponseCache] = None, store: Optional[StationStore] = None,
+                 http: Optional[RadioHTTPClient] = None, limiter: Optional[TokenBucket] = None):
+        # 镜像由共享客户端自动发现和切换，这里只保存接口路径
+        self.base_path = "/json/stations"
+        # 共享连接池的HTTP客户端（自带用户代理，避免被API拒绝）
+        self.http = http if http is not None else get_shared_client()
+        # 所有实例和线程共享同一个令牌桶，避免触发API限制
+        self.limiter = limiter if limiter is not None else get_shared_limiter()
         self.cache_duration = 3600  # 1小时缓存
+        self.cache = cache if cache is not None else get_shared_cache()
+        # 可选的本地电台库，网络请求得到的电台会增量写入其中
+        self.store = store
 
     def _wait_for_rate_limit(self):
-        """确保请求间隔，避免触发API限制"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        if elapsed < self.request_interval:
-            time.sleep(self.request_interval - elapsed)
-        self.last_request_time = time.time()
-
-    def _load_cache(self) -> Optional[List[Dict]]:
-        """从缓存加载数据"""
-        try:
-            if os.path.exists(self.cache_file):
-                # 检查缓存是否过期
-                file_time = os.path.getmtime(self.cache_file)
-                if time.time() - file_time < self.cache_duration:
-                    with open(self.cache_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-        except Exception:
-            pass
-        return None
-
-    def _save_cache(self, data: List[Dict]):
-        """保存数据到缓存"""
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        """从共享令牌桶获取令牌，避免触发API限制"""
+        self.limiter.acquire()
 
-    def _fetch(self, params: Dict) -> List[Dict]:
-        """内部方法：发送请求并返回数据，增加错误处理"""
-        # 首先尝试从缓存加载
-        cached_data = self._load_cache()
-        if cached_data is not None:
-            return cached_data
-
-        try:
-            # 遵守请求间隔
-            self._wait_for_rate_limit()
+    def _request(self, params: Dict, endpoint: str = "") -> List[Dict]:
+        """内部方法：发送请求并返回电台列表，出错时抛出异常"""
+        # 遵守请求间隔
+        self._wait_for_rate_limit()
 
-            response = requests.get(
-                self.base_url,
-                params=params,
-                headers=self.headers,
-                timeout=15
-            )
+        # 发送请求（连接错误和5xx会自动换镜像重试，4xx直接抛出）
+        path = f"{self.base_path}/{endpoint}" if endpoint else self.base_path
+        data = self.http.get_json(path, params)
 
-            # 检查HTTP状态码
-            response.raise_for_status()
+        # 检查返回数据是否有效
+        if not isinstance(data, list):
+            raise ValueError("API返回的数据格式不正确")
+        return data
 
-            # 解析JSON
-            data = response.json()
+    def _fetch(self, params: Dict, endpoint: str = "", use_cache: bool = True) -> List[Dict]:
+        """内部方法：发送请求并返回数据，增加错误处理"""
+        # 首先尝试从缓存加载（按接口路径和参数区分缓存项）
+        cache_key = make_cache_key(f"stations/{endpoint}", params)
+        if use_cache:
+            cached_data = self.cache.get(cache_key)
+            if cached_data is not None:
+                return cached_data
 
-            # 检查返回数据是否有效
-            if not isinstance(data, list):
-                raise ValueError("API返回的数据格式不正确")
+        try:
+            data = self._request(params, endpoint)
 
             # 缓存数据
-            self._save_cache(data)
+            self.cache.set(cache_key, data, ttl=self.cache_duration)
+            if self.store is not None:
+                self.store.upsert_many(data)
             return data
 
         except requests.exceptions.RequestException as e:
@@ -104,7 +111,7 @@ class RadioAPI:
             "limit": limit,
             "name": query
         }
-        return self._fetch(params)
+        return self._fetch(params, endpoint="search")
 
     def get_radios_by_country(self, country: str, limit: int = 100) -> List[Dict]:
         """按国家获取电台"""
@@ -112,7 +119,7 @@ class RadioAPI:
             "limit": limit,
             "country": country
         }
-        return self._fetch(params)
+        return self._fetch(params, endpoint="search")
 
     def get_radios_by_language(self, language: str, limit: int = 100) -> List[Dict]:
         """按语言获取电台"""
@@ -120,7 +127,7 @@ class RadioAPI:
             "limit": limit,
             "language": language
         }
-        return self._fetch(params)
+        return self._fetch(params, endpoint="search")
 
     def get_radios_by_tag(self, tag: str, limit: int = 100) -> List[Dict]:
         """按标签获取电台"""
@@ -128,4 +135,73 @@ class RadioAPI:
             "limit": limit,
             "tag": tag
         }
-        return self._fetch(params)
+        return self._fetch(params, endpoint="search")
+
+    def get_stations_page(self, offset: int, limit: int = 1000, order: str = "changetimestamp",
+                          reverse: bool = False) -> List[Dict]:
+        """分页获取全部电台（用于全量同步，不走缓存，出错时抛出异常）"""
+        params = {
+            "offset": offset,
+            "limit": limit,
+            "order": order,
+            "reverse": "true" if reverse else "false",
+            "hidebroken": "false"
+        }
+        return self._request(params, endpoint="search")
+
+    def query_stations(self, **filters) -> List[Dict]:
+        """在本地电台库中筛选电台（不发起网络请求），参数同StationStore.query"""
+        if self.store is None:
+            return []
+        return self.store.query(**filters)
+
+
+class AsyncRadioAPI:
+    """RadioAPI的asyncio版本，与同步版本共用连接池、缓存和本地电台库，并限制并发请求数"""
+
+    def __init__(self, api: Optional[RadioAPI] = None, max_concurrency: int = 4):
+        self.api = api if api is not None else RadioAPI()
+        self.max_concurrency = max_concurrency
+        # 信号量在首次使用时创建，绑定到实际运行的事件循环
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="radio-api")
+
+    async def _run(self, func, *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def get_popular_radios(self, limit: int = 200) -> List[Dict]:
+        """获取热门电台"""
+        return await self._run(self.api.get_popular_radios, limit)
+
+    async def search_radios(self, query: str, limit: int = 100) -> List[Dict]:
+        """搜索电台"""
+        return await self._run(self.api.search_radios, query, limit)
+
+    async def get_radios_by_country(self, country: str, limit: int = 100) -> List[Dict]:
+        """按国家获取电台"""
+        return await self._run(self.api.get_radios_by_country, country, limit)
+
+    async def get_radios_by_language(self, language: str, limit: int = 100) -> List[Dict]:
+        """按语言获取电台"""
+        return await self._run(self.api.get_radios_by_language, language, limit)
+
+    async def get_radios_by_tag(self, tag: str, limit: int = 100) -> List[Dict]:
+        """按标签获取电台"""
+        return await self._run(self.api.get_radios_by_tag, tag, limit)
+
+    async def get_stations_page(self, offset: int, limit: int = 1000, order: str = "changetimestamp",
+                                reverse: bool = False) -> List[Dict]:
+        """分页获取全部电台（出错时抛出异常）"""
+        return await self._run(self.api.get_stations_page, offset, limit, order, reverse)
+
+    async def query_stations(self, **filters) -> List[Dict]:
+        """在本地电台库中筛选电台"""
+        return await self._run(self.api.query_stations, **filters)
+
+    def close(self):
+        """关闭内部线程池"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _FileLock:
+    """基于锁文件的跨进程互斥锁"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> int:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            # msvcrt只能锁定字节区间，这里固定锁住第一个字节
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        return self._fd
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TokenBucket:
+    """令牌桶限速器，可在线程、asyncio任务以及（指定锁文件时）多个进程之间共享
+
+    每次获取令牌时在锁内预约下一个可用时间点，调用方只需睡眠一次，
+    先到的请求先拿到令牌，不会忙等也不会互相抢占。
+    """
+
+    def __init__(self, rate: float, burst: int = 1, lock_file: Optional[str] = None):
+        if rate <= 0:
+            raise ValueError("rate必须大于0")
+        self.rate = rate  # 每秒补充的令牌数
+        self.burst = max(1, burst)  # 桶容量，即允许的突发请求数
+        self.lock_file = lock_file
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens: float, last: float, now: float) -> float:
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def _reserve_local(self, tokens: float, now: float) -> float:
+        self._tokens = self._refill(self._tokens, self._last, now) - tokens
+        self._last = now
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _reserve_shared(self, tokens: float, now: float) -> float:
+        # 令牌状态保存在锁文件中："剩余令牌 时间戳"
+        with _FileLock(self.lock_file) as fd:
+            os.lseek(fd, 0, os.SEEK_SET)
+            raw = os.read(fd, 64).decode("ascii", "ignore").split()
+            try:
+                current, last = float(raw[0]), float(raw[1])
+            except (IndexError, ValueError):
+                current, last = float(self.burst), now
+            current = self._refill(current, last, now) - tokens
+            # 固定宽度写回，避免残留旧内容
+            state = f"{current:.6f} {now:.6f}".ljust(63).encode("ascii")
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, state)
+        return 0.0 if current >= 0 else -current / self.rate
+
+    def reserve(self, tokens: float = 1) -> float:
+        """预约令牌并返回需要等待的秒数（令牌已扣除，调用方必须等待这么久再发请求）"""
+        with self._lock:
+            if self.lock_file:
+                # 跨进程时只能使用墙上时间
+                return self._reserve_shared(tokens, time.time())
+            return self._reserve_local(tokens, time.monotonic())
+
+    def refund(self, tokens: float = 1):
+        """退还预约但未使用的令牌（如等待被取消）"""
+        with self._lock:
+            if self.lock_file:
+                self._reserve_shared(-tokens, time.time())
+            else:
+                self._tokens = min(self.burst, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """阻塞直到获得令牌；等待时间会超过timeout时不等待并返回False"""
+        delay = self.reserve(tokens)
+        if timeout is not None and delay > timeout:
+            self.refund(tokens)
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    async def acquire_async(self, tokens: float = 1):
+        """asyncio版本的acquire，等待期间不阻塞事件循环，被取消时退还令牌"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund(tokens)
+                raise
@@ -0,0 +1,396 @@
+import os
+import re
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+from icy_metadata import IcyParser, metaint_of
+from stream_prober import ProbeError, open_stream
+
+# 按Content-Type确定录音文件扩展名
+CONTENT_TYPE_EXTENSIONS = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/aac": "aac",
+    "audio/aacp": "aac",
+    "audio/x-aac": "aac",
+    "audio/ogg": "ogg",
+    "application/ogg": "ogg",
+    "audio/opus": "opus",
+    "audio/flac": "flac",
+}
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+class RingBuffer:
+    """固定容量的字节环形缓冲区：一个线程写入、一个线程取出
+
+    写满时丢弃新数据并计数，内存占用始终等于容量。取出时直接返回缓冲区内部的
+    memoryview（最多两段），写盘后再调用consume()释放空间，中间没有额外复制。
+    """
+
+    def __init__(self, capacity: int):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self.capacity = capacity
+        self._start = 0   # 第一个未取出字节的位置
+        self._size = 0    # 未取出的字节数
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data) -> int:
+        """写入数据，返回实际写入的字节数（放不下的部分被丢弃）"""
+        with self._lock:
+            end = (self._start + self._size) % self.capacity
+            free = self.capacity - self._size
+        count = min(len(data), free)
+        if count < len(data):
+            self.dropped += len(data) - count
+        if count:
+            # 写入的区域只属于空闲空间，复制时不需要持有锁
+            first = min(count, self.capacity - end)
+            self._view[end:end + first] = data[:first]
+            if count > first:
+                self._view[:count - first] = data[first:count]
+            with self._lock:
+                self._size += count
+        return count
+
+    def peek(self) -> List[memoryview]:
+        """返回当前全部未取出的数据（最多两段，首尾相接处分开）"""
+        with self._lock:
+            start, size = self._start, self._size
+        first = min(size, self.capacity - start)
+        chunks = [self._view[start:start + first]]
+        if size > first:
+            chunks.append(self._view[:size - first])
+        return chunks
+
+    def consume(self, count: int):
+        """释放已写盘的count个字节"""
+        with self._lock:
+            count = min(count, self._size)
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+
+
+class StreamRecording:
+    """单个电台的录音：读取线程把音频写入环形缓冲区，由共享的写盘线程批量写入文件"""
+
+    def __init__(self, station_id: str, url: str, name: str, output_dir: str,
+                 buffer_size: int, max_file_bytes: int, max_file_seconds: float,
+                 connect_timeout: float, read_timeout: float,
+                 on_metadata: Optional[Callable[[str, str], None]] = None):
+        self.station_id = station_id
+        self.url = url
+        self.name = name or station_id
+        self.output_dir = output_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ring = RingBuffer(buffer_size)
+        self.on_metadata = on_metadata
+        self.title = ""
+        self._parser: Optional[IcyParser] = None
+
+        self.state = "connecting"
+        self.error = ""
+        self.extension = "mp3"
+        self.bytes_received = 0
+        self.bytes_written = 0
+        self.reconnects = 0
+        self.files: List[str] = []
+        self.started = time.time()
+
+        self._throughput = 0.0       # 接收速率（字节/秒），指数滑动平均
+        self._rate_bytes = 0
+        self._rate_time = time.monotonic()
+        self._file = None
+        self._file_bytes = 0
+        self._file_opened = 0.0
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = threading.Thread(target=self._read_loop, daemon=True,
+                                        name=f"record-{station_id[:8]}")
+
+    # ---- 读取 ----
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """停止读取；剩余数据由写盘线程写完后关闭文件"""
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            # 让阻塞在recv上的读取线程立即返回
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def _connect(self):
+        url = self.url
+        for _ in range(5):
+            # 需要标题时让服务器在流中夹带ICY元数据，读取时再拆分出来
+            sock, status, headers, body, _, _ = open_stream(
+                url, self.connect_timeout, self.read_timeout, icy_metadata=self.on_metadata is not None)
+            if status in _REDIRECT_STATUSES and headers.get("location"):
+                sock.close()
+                url = urljoin(url, headers["location"])
+                continue
+            if not 200 <= status < 300:
+                sock.close()
+                raise ProbeError(f"HTTP {status}", "response")
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            self.extension = CONTENT_TYPE_EXTENSIONS.get(content_type, self.extension)
+            metaint = metaint_of(headers)
+            self._parser = IcyParser(metaint) if metaint else None
+            return sock, body
+        raise ProbeError("重定向次数过多", "response")
+
+    def _read_loop(self):
+        # 预先分配接收缓冲区，循环中不再分配内存
+        chunk = bytearray(64 * 1024)
+        view = memoryview(chunk)
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                sock, body = self._connect()
+            except ProbeError as e:
+                self._set_failed(str(e))
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            self._sock = sock
+            self.state, self.error = "recording", ""
+            backoff = 1.0
+            try:
+                if body:
+                    self._feed(body)
+                while not self._stop.is_set():
+                    count = sock.recv_into(view)
+                    if not count:
+                        raise OSError("服务器关闭了连接")
+                    self._feed(view[:count])
+            except OSError as e:
+                if not self._stop.is_set():
+                    self._set_failed(str(e))
+                    self._stop.wait(backoff)
+            finally:
+                self._sock = None
+                sock.close()
+        self.state = "stopped"
+
+    def _set_failed(self, error: str):
+        self.state, self.error = "reconnecting", error
+        self.reconnects += 1
+
+    def _feed(self, data):
+        """拆分出元数据后把音频写入缓冲区（音频片段是原数据的切片，不复制）"""
+        if self._parser is None:
+            self._received(data)
+            return
+        audio, titles = self._parser.feed(data)
+        for piece in audio:
+            self._received(piece)
+        if titles and titles[-1] != self.title:
+            self.title = titles[-1]
+            try:
+                self.on_metadata(self.station_id, self.title)
+            except Exception as e:
+                print(f"录音标题回调失败: {e}")
+
+    def _received(self, data):
+        self.ring.write(data)
+        self.bytes_received += len(data)
+        self._rate_bytes += len(data)
+        now = time.monotonic()
+        elapsed = now - self._rate_time
+        if elapsed >= 1.0:
+            self._throughput = self._throughput * 0.5 + (self._rate_bytes / elapsed) * 0.5
+            self._rate_bytes, self._rate_time = 0, now
+
+    # ---- 写盘（在写盘线程中调用） ----
+
+    def flush(self, force: bool = False, min_bytes: int = 256 * 1024) -> int:
+        """把缓冲区中的数据写入文件，不足min_bytes且不强制时跳过，返回写入的字节数"""
+        pending = len(self.ring)
+        if not pending or (pending < min_bytes and not force):
+            return 0
+        if self._file is None or self._should_rotate():
+            self._open_file()
+        written = 0
+        for chunk in self.ring.peek():
+            # 无缓冲的文件对象可能只写入一部分
+            while chunk:
+                count = self._file.write(chunk)
+                chunk = chunk[count:]
+                written += count
+        self.ring.consume(written)
+        self.bytes_written += written
+        self._file_bytes += written
+        return written
+
+    def _should_rotate(self) -> bool:
+        if self.max_file_bytes and self._file_bytes >= self.max_file_bytes:
+            return True
+        return bool(self.max_file_seconds) and time.time() - self._file_opened >= self.max_file_seconds
+
+    def _open_file(self):
+        self.close_file()
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_name = _UNSAFE_CHARS.sub("_", self.name).strip("_")[:60] or self.station_id
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{safe_name}_{stamp}.{self.extension}")
+        if os.path.exists(path):
+            path = os.path.join(self.output_dir, f"{safe_name}_{stamp}_{len(self.files)}.{self.extension}")
+        # 不使用Python的写缓冲，每次都是整块的顺序写
+        self._file = open(path, "wb", buffering=0)
+        self._file_bytes = 0
+        self._file_opened = time.time()
+        self.files.append(path)
+
+    def close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict:
+        """录音统计信息"""
+        return {
+            "station_id": self.station_id,
+            "name": self.name,
+            "state": self.state,
+            "error": self.error,
+            "throughput": self._throughput,
+            "bytes_received": self.bytes_received,
+            "bytes_written": self.bytes_written,
+            "buffered": len(self.ring),
+            "dropped": self.ring.dropped,
+            "reconnects": self.reconnects,
+            "title": self.title,
+            "file": self.files[-1] if self.files else "",
+            "files": len(self.files),
+            "duration": time.time() - self.started,
+        }
+
+
+class Recorder:
+    """多电台录音：每个电台一个读取线程和一个固定大小的环形缓冲区，所有电台共用一个写盘线程
+
+    不依赖VLC，直接通过HTTP读取Icecast/SHOUTcast音频流并原样写入文件；
+    内存占用为 电台数 x (buffer_size + 64KB)，与录音时长无关。
+    """
+
+    def __init__(self, output_dir: str = "recordings", buffer_size: int = 1024 * 1024,
+                 max_file_bytes: int = 256 * 1024 * 1024, max_file_seconds: float = 3600,
+                 max_streams: int = 64, write_chunk: int = 256 * 1024, flush_interval: float = 2.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 15.0,
+                 on_metadata: Optional[Callable[[str, str], None]] = None):
+        self.output_dir = output_dir
+        self.on_metadata = on_metadata  # on_metadata(stationuuid, 标题)，在读取线程中调用
+        self.buffer_size = buffer_size
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        self.max_streams = max_streams
+        self.write_chunk = write_chunk
+        self.flush_interval = flush_interval
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._recordings: Dict[str, StreamRecording] = {}  # stationuuid -> 最近一次录音
+        self._active: List[StreamRecording] = []  # 写盘线程负责的录音（包括已停止但还没写完的）
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self, station_id: str, url: str, name: str = "") -> StreamRecording:
+        """开始录制一个电台（已在录制时直接返回）"""
+        with self._lock:
+            recording = self._recordings.get(station_id)
+            if recording is not None and not recording.stopped:
+                return recording
+            active = sum(1 for r in self._active if not r.stopped)
+            if active >= self.max_streams:
+                raise RuntimeError(f"同时录制的电台不能超过{self.max_streams}个")
+            recording = StreamRecording(
+                station_id, url, name, self.output_dir, self.buffer_size, self.max_file_bytes,
+                self.max_file_seconds, self.connect_timeout, self.read_timeout, self.on_metadata)
+            self._recordings[station_id] = recording
+            self._active.append(recording)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="record-writer")
+                self._writer.start()
+        recording.start()
+        return recording
+
+    def stop(self, station_id: str):
+        """停止录制一个电台"""
+        with self._lock:
+            recording = self._recordings.get(station_id)
+        if recording is not None:
+            recording.stop()
+            self._wakeup.set()
+
+    def stop_all(self):
+        """停止全部录制，并等待写盘线程写完剩余数据"""
+        with self._lock:
+            recordings = list(self._active)
+            writer = self._writer
+        for recording in recordings:
+            recording.stop()
+        self._wakeup.set()
+        if writer is not None:
+            writer.join(timeout=5)
+
+    def is_recording(self, station_id: str) -> bool:
+        recording = self._recordings.get(station_id)
+        return recording is not None and not recording.stopped
+
+    def stats(self) -> List[Dict]:
+        """各电台的录音统计（吞吐量、已写入和丢弃的字节数等）"""
+        with self._lock:
+            recordings = list(self._active)
+        return [recording.stats() for recording in recordings]
+
+    def _write_loop(self):
+        last_full_flush = time.monotonic()
+        while True:
+            self._wakeup.wait(0.2)
+            self._wakeup.clear()
+            now = time.monotonic()
+            # 平时只写攒够一整块的数据，定期把零头也写出去
+            force = now - last_full_flush >= self.flush_interval
+            if force:
+                last_full_flush = now
+            with self._lock:
+                recordings = list(self._active)
+            for recording in recordings:
+                finished = recording.stopped and recording.state == "stopped"
+                try:
+                    recording.flush(force=force or finished, min_bytes=self.write_chunk)
+                except OSError as e:
+                    recording.error = f"写入文件失败：{e}"
+                    recording.stop()
+                    finished = True
+                if finished:
+                    recording.close_file()
+                    with self._lock:
+                        self._active.remove(recording)
+                        if self._recordings.get(recording.station_id) is recording:
+                            del self._recordings[recording.station_id]
+            with self._lock:
+                if not self._active:
+                    self._writer = None
+                    return
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def make_cache_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """根据接口路径和规范化后的参数生成缓存键"""
+    normalized = []
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        normalized.append((str(key).strip().lower(), str(value).strip().lower()))
+    normalized.sort()
+    query = "&".join(f"{k}={v}" for k, v in normalized)
+    return f"{endpoint.strip('/')}?{query}"
+
+
+class ResponseCache:
+    """两级响应缓存：进程内LRU（带单条TTL）+ 磁盘持久层"""
+
+    def __init__(self, max_entries: int = 256, max_memory_bytes: int = 8 * 1024 * 1024,
+                 default_ttl: float = 3600, disk_dir: Optional[str] = "radio_cache",
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.default_ttl = default_ttl
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        # key -> (过期时间, 字节数, 数据)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        # 磁盘文件名 -> (修改时间, 字节数)，首次使用时扫描目录建立
+        self._disk_index: Optional[Dict[str, tuple]] = None
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+        # 统计计数
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, size, data = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return data
+                self._drop_memory(key)
+                self.expirations += 1
+
+            data = self._read_disk(key, now)
+            if data is not None:
+                expires_at, payload, size = data
+                self.disk_hits += 1
+                self._put_memory(key, payload, expires_at, size)
+                return payload
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, data: Any, ttl: Optional[float] = None):
+        """写入缓存（同时写入内存层和磁盘层）"""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        serialized = json.dumps(
+            {"key": key, "expires": expires_at, "data": data},
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        with self._lock:
+            self._put_memory(key, data, expires_at, len(serialized))
+            self._write_disk(key, serialized)
+
+    def invalidate(self, key: str):
+        """删除指定缓存项"""
+        with self._lock:
+            self._drop_memory(key)
+            self._remove_disk_file(self._disk_name(key))
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for name in list(self._ensure_disk_index()):
+                self._remove_disk_file(name)
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中/未命中/淘汰等统计信息"""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hits": self.memory_hits + self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index or {}),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # ---- 内存层 ----
+
+    def _put_memory(self, key: str, data: Any, expires_at: float, size: int):
+        if size > self.max_memory_bytes:
+            # 单条数据超过内存层上限时只保留在磁盘层
+            self._drop_memory(key)
+            return
+        self._drop_memory(key)
+        self._memory[key] = (expires_at, size, data)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_entries
+                                or self._memory_bytes > self.max_memory_bytes):
+            _, (_, old_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+            self.evictions += 1
+
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+
+    # ---- 磁盘层 ----
+
+    @staticmethod
+    def _disk_name(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+
+    def _ensure_disk_index(self) -> Dict[str, tuple]:
+        if self._disk_index is None:
+            self._disk_index = {}
+            self._disk_bytes = 0
+            if self.disk_dir and os.path.isdir(self.disk_dir):
+                for name in os.listdir(self.disk_dir):
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        continue
+                    self._disk_index[name] = (st.st_mtime, st.st_size)
+                    self._disk_bytes += st.st_size
+        return self._disk_index
+
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        name = self._disk_name(key)
+        if name not in self._ensure_disk_index():
+            return None
+        try:
+            with open(os.path.join(self.disk_dir, name), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            self._remove_disk_file(name)
+            return None
+        # 防止哈希冲突导致返回错误的结果集
+        if record.get("key") != key:
+            return None
+        if record.get("expires", 0) <= now:
+            self._remove_disk_file(name)
+            self.expirations += 1
+            return None
+        return record["expires"], record.get("data"), self._disk_index[name][1]
+
+    def _write_disk(self, key: str, serialized: bytes):
+        if not self.disk_dir:
+            return
+        if len(serialized) > self.max_disk_bytes:
+            return
+        index = self._ensure_disk_index()
+        name = self._disk_name(key)
+        path = os.path.join(self.disk_dir, name)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(serialized)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        old = index.pop(name, None)
+        if old is not None:
+            self._disk_bytes -= old[1]
+        index[name] = (time.time(), len(serialized))
+        self._disk_bytes += len(serialized)
+
+        # 超出磁盘上限时按写入时间从旧到新淘汰
+        if self._disk_bytes > self.max_disk_bytes:
+            for old_name, _ in sorted(index.items(), key=lambda item: item[1][0]):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                if old_name == name:
+                    continue
+                self._remove_disk_file(old_name)
+                self.evictions += 1
+
+    def _remove_disk_file(self, name: str):
+        index = self._ensure_disk_index()
+        entry = index.pop(name, None)
+        if entry is not None:
+            self._disk_bytes -= entry[1]
+        try:
+            os.remove(os.path.join(self.disk_dir, name))
+        except OSError:
+            pass
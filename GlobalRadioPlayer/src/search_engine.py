@@ -0,0 +1,198 @@
+import heapq
+import math
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from station_index import StationIndex, SEARCH_FIELDS, tokenize
+
+# 各字段的词频权重，名称命中比标签命中更重要
+FIELD_WEIGHTS = {"name": 3.0, "tags": 1.5, "country": 1.0, "language": 1.0}
+# 查询词扩展时各匹配方式的相似度
+EXACT_SIMILARITY = 1.0
+PREFIX_SIMILARITY = 0.9
+SUBSTRING_SIMILARITY = 0.75
+
+
+def _trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchEngine(StationIndex):
+    """支持拼写容错的电台搜索引擎
+
+    在StationIndex的倒排索引基础上：查询词先扩展为词表中的精确、前缀、子串和
+    三元组相似词，再按BM25（字段加权词频）打分，与点击量、投票数和点击趋势
+    综合排序，最后用堆取前k个结果。
+    """
+
+    def __init__(self, stations: Iterable[Dict] = (), k1: float = 1.2, b: float = 0.75,
+                 popularity_weight: float = 0.5, min_similarity: float = 0.45):
+        self.k1 = k1
+        self.b = b
+        self.popularity_weight = popularity_weight
+        self.min_similarity = min_similarity
+        self._term_freqs: Dict[int, Dict[str, float]] = {}  # 文档ID -> {词条: 加权词频}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._popularity: Dict[int, float] = {}
+        self._max_popularity = 0.0
+        self._norms: Optional[Dict[int, float]] = None  # BM25长度归一化项，索引变化后重算
+        super().__init__(stations)
+
+    # ---- 索引维护 ----
+
+    def add(self, station: Dict):
+        """添加或更新一个电台，同时记录BM25所需的词频和文档长度"""
+        super().add(station)
+        doc_id = self._doc_ids.get(station.get("stationuuid"))
+        if doc_id is None:
+            return
+        freqs: Dict[str, float] = {}
+        for field in SEARCH_FIELDS:
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(station.get(field)):
+                freqs[token] = freqs.get(token, 0.0) + weight
+        length = sum(freqs.values())
+        self._term_freqs[doc_id] = freqs
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        self._norms = None
+
+        popularity = self._popularity_of(station)
+        self._popularity[doc_id] = popularity
+        if popularity > self._max_popularity:
+            self._max_popularity = popularity
+
+    def remove(self, station_id: str):
+        """删除一个电台"""
+        doc_id = self._doc_ids.get(station_id)
+        super().remove(station_id)
+        if doc_id is None:
+            return
+        self._term_freqs.pop(doc_id, None)
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        self._popularity.pop(doc_id, None)
+        self._norms = None
+
+    @staticmethod
+    def _popularity_of(station: Dict) -> float:
+        """热度分：点击量、投票数取对数压缩，点击趋势作为小幅修正"""
+        clicks = max(0, int(station.get("clickcount") or 0))
+        votes = max(0, int(station.get("votes") or 0))
+        trend = int(station.get("clicktrend") or 0)
+        trend_score = math.copysign(math.log1p(abs(trend)), trend)
+        return max(0.0, 0.6 * math.log1p(clicks) + 0.3 * math.log1p(votes) + 0.1 * trend_score)
+
+    # ---- 查询词扩展 ----
+
+    def expand_term(self, term: str) -> Dict[str, float]:
+        """把查询词扩展为词表中的候选词及其相似度"""
+        expansions: Dict[str, float] = {}
+        if term in self._postings:
+            expansions[term] = EXACT_SIMILARITY
+        for token in self._prefix_tokens(term):
+            expansions.setdefault(token, PREFIX_SIMILARITY)
+        if len(term) < 3:
+            return expansions
+
+        for token in self._substring_tokens(term):
+            expansions.setdefault(token, SUBSTRING_SIMILARITY)
+        if term in self._postings:
+            # 词表中存在该词时认为没有拼写错误，跳过代价较高的模糊匹配
+            return expansions
+
+        # 三元组相似度（Dice系数）匹配拼写错误
+        query_grams = _trigrams(term)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] += 1
+        threshold = max(1, int(len(query_grams) * self.min_similarity))
+        for token, count in shared.items():
+            if count < threshold or token in expansions:
+                continue
+            similarity = 2.0 * count / (len(query_grams) + max(1, len(token) - 2))
+            if similarity >= self.min_similarity:
+                expansions[token] = similarity * SUBSTRING_SIMILARITY
+        return expansions
+
+    # ---- 打分 ----
+
+    def _get_norms(self) -> Dict[int, float]:
+        if self._norms is None:
+            total_docs = len(self._docs)
+            avg_length = (self._total_length / total_docs) if total_docs else 1.0
+            k1, b = self.k1, self.b
+            self._norms = {doc_id: k1 * (1.0 - b + b * length / avg_length)
+                           for doc_id, length in self._doc_lengths.items()}
+        return self._norms
+
+    def _score_term(self, expansions: Dict[str, float],
+                    should_stop: Optional[Callable[[], bool]] = None) -> Dict[int, float]:
+        """计算单个查询词在各文档上的BM25得分（多个扩展词取最大值）"""
+        total_docs = len(self._docs)
+        k1 = self.k1
+        term_freqs, norms = self._term_freqs, self._get_norms()
+        scores: Dict[int, float] = {}
+        for token, similarity in expansions.items():
+            if should_stop is not None and should_stop():
+                return {}
+            posting = self._postings.get(token)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (total_docs - df + 0.5) / (df + 0.5))
+            weight = similarity * idf
+            for doc_id in posting:
+                tf = term_freqs[doc_id][token]
+                score = weight * tf * (k1 + 1.0) / (tf + norms[doc_id])
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search_scored(self, query: str, limit: int = 100, within: Optional[Set[str]] = None,
+                      should_stop: Optional[Callable[[], bool]] = None) -> List[Tuple[float, Dict]]:
+        """搜索并返回(得分, 电台)列表，要求每个查询词都有匹配（允许拼写误差）
+
+        should_stop返回True时提前结束并返回空列表（用于取消过期的查询）。
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        combined: Optional[Dict[int, float]] = None
+        for term in terms:
+            scores = self._score_term(self.expand_term(term), should_stop)
+            if combined is None:
+                combined = scores
+            else:
+                combined = {doc_id: total + scores[doc_id]
+                            for doc_id, total in combined.items() if doc_id in scores}
+            if not combined:
+                return []
+
+        if within is not None:
+            allowed = {self._doc_ids[sid] for sid in within if sid in self._doc_ids}
+            combined = {doc_id: score for doc_id, score in combined.items() if doc_id in allowed}
+
+        max_popularity = self._max_popularity or 1.0
+        popularity = self._popularity
+        boost = self.popularity_weight / max_popularity
+        top = heapq.nlargest(
+            limit,
+            ((score * (1.0 + boost * popularity[doc_id]), doc_id) for doc_id, score in combined.items())
+        )
+        return [(score, self._docs[doc_id]) for score, doc_id in top]
+
+    def search(self, query: str, mode: str = "fuzzy", limit: Optional[int] = 100,
+               within: Optional[Set[str]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """搜索电台；mode为fuzzy时按相关度排序，其余模式沿用StationIndex的精确匹配"""
+        if mode != "fuzzy":
+            return super().search(query, mode=mode, limit=limit, within=within)
+        terms = tokenize(query)
+        if all(len(term) < 3 for term in terms):
+            # 空查询或很短的查询只做前缀过滤，按热度排序即可
+            return super().search(query, mode="prefix", limit=limit, within=within)
+        scored = self.search_scored(query, limit or len(self._docs), within, should_stop)
+        return [station for _, station in scored]
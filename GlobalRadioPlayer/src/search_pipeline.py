@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class CancelToken:
+    """取消标记：新的查询到来时旧查询的标记被置位，搜索函数可据此提前结束"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class SearchPipeline:
+    """防抖的后台搜索管道
+
+    输入变化时先等待一个防抖间隔，间隔内的新输入会覆盖旧输入；
+    查询在后台线程执行，新查询开始时取消仍在运行的旧查询，
+    结果通过root.after交回Tk主线程，且只交付最新一次查询的结果。
+    """
+
+    def __init__(self, root, search_func: Callable[..., Any], on_result: Callable[[str, Any], None],
+                 delay_ms: int = 150):
+        self.root = root
+        self.search_func = search_func  # search_func(query, should_stop, **kwargs)
+        self.on_result = on_result
+        self.delay_ms = delay_ms
+        self._after_id: Optional[str] = None
+        self._generation = 0
+        self._token: Optional[CancelToken] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+
+    def submit(self, query: str, **kwargs):
+        """提交查询（在Tk主线程调用），kwargs会原样传给搜索函数"""
+        self._cancel_pending()
+        self._after_id = self.root.after(self.delay_ms, self._start, query, kwargs)
+
+    def cancel(self):
+        """取消等待中和正在执行的查询"""
+        self._cancel_pending()
+        self._generation += 1
+        if self._token is not None:
+            self._token.cancel()
+            self._token = None
+
+    def shutdown(self):
+        """取消所有查询并关闭后台线程"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _cancel_pending(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _start(self, query: str, kwargs: dict):
+        self._after_id = None
+        self.cancel()
+        token = CancelToken()
+        self._token = token
+        self._executor.submit(self._run, self._generation, query, token, kwargs)
+
+    def _run(self, generation: int, query: str, token: CancelToken, kwargs: dict):
+        # 排队期间已有更新的查询时直接跳过
+        if token.is_cancelled():
+            return
+        try:
+            result = self.search_func(query, token.is_cancelled, **kwargs)
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            return
+        if token.is_cancelled():
+            return
+        self.root.after(0, self._deliver, generation, query, result)
+
+    def _deliver(self, generation: int, query: str, result: Any):
+        if generation == self._generation:
+            self._token = None
+            self.on_result(query, result)
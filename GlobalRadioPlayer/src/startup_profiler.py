@@ -0,0 +1,51 @@
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class StartupProfiler:
+    """记录启动各阶段的耗时
+
+    mark()记录从上一个阶段结束到现在的耗时；启用时finish()输出报告（一行JSON，
+    便于脚本比较不同版本的启动时间）。未启用时只记录不输出，开销可以忽略。
+    """
+
+    def __init__(self, enabled: bool = False, start: Optional[float] = None,
+                 on_finish: Optional[Callable[[], None]] = None):
+        self.enabled = enabled
+        self.start = time.perf_counter() if start is None else start
+        self.on_finish = on_finish  # 输出报告后调用（例如退出程序）
+        self.phases: List[Dict] = []
+        self._last = self.start
+        self._finished = False
+
+    def mark(self, phase: str):
+        """记录一个阶段结束"""
+        if self._finished:
+            return
+        now = time.perf_counter()
+        self.phases.append({
+            "phase": phase,
+            "ms": round((now - self._last) * 1000, 1),
+            "at_ms": round((now - self.start) * 1000, 1),
+        })
+        self._last = now
+
+    def report(self) -> str:
+        """各阶段耗时的文本报告"""
+        lines = [f"{p['phase']:<16}{p['ms']:>9.1f} ms  (累计 {p['at_ms']:.1f} ms)" for p in self.phases]
+        return "\n".join(lines)
+
+    def finish(self, phase: Optional[str] = None):
+        """启动完成：记录最后一个阶段，启用时输出报告"""
+        if self._finished:
+            return
+        if phase:
+            self.mark(phase)
+        self._finished = True
+        if not self.enabled:
+            return
+        print(self.report())
+        print(json.dumps({"startup": self.phases}, ensure_ascii=False))
+        if self.on_finish is not None:
+            self.on_finish()
@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import zlib
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# 界面用到的字段；完整记录（含其余API字段）按需从本地电台库读取
+STATION_FIELDS = (
+    "stationuuid", "name", "url", "url_resolved", "favicon", "tags", "country",
+    "countrycode", "language", "codec", "bitrate", "votes", "clickcount", "clicktrend"
+)
+INTEGER_FIELDS = frozenset({"bitrate", "votes", "clickcount", "clicktrend"})
+# 取值种类很少、在电台间大量重复的字段，驻留后所有电台共享同一个字符串对象
+INTERNED_FIELDS = frozenset({"tags", "country", "countrycode", "language", "codec"})
+_FIELD_SET = frozenset(STATION_FIELDS)
+# 目录快照的格式版本，字段变化时递增，旧快照会被忽略
+SNAPSHOT_VERSION = 1
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Station:
+    """紧凑的电台记录
+
+    只保存界面用到的字段（__slots__，没有每个对象的字典），国家、语言、编码等
+    重复的字符串被驻留共享。提供get()和下标访问，可以直接替代原来的电台字典。
+    """
+
+    __slots__ = STATION_FIELDS
+
+    def __init__(self, values: Iterable = ()):
+        """values按STATION_FIELDS的顺序给出（如数据库查询的一行），缺少的字段为空"""
+        values = list(values)
+        values += [None] * (len(STATION_FIELDS) - len(values))
+        intern = sys.intern
+        for field, value in zip(STATION_FIELDS, values):
+            if field in INTEGER_FIELDS:
+                value = _to_int(value)
+            else:
+                value = "" if value is None else str(value)
+                if field in INTERNED_FIELDS:
+                    value = intern(value)
+            setattr(self, field, value)
+        # 大多数电台的解析地址与原地址相同，共用一个字符串
+        if self.url_resolved == self.url:
+            self.url_resolved = self.url
+
+    @classmethod
+    def _from_clean(cls, values: Iterable) -> "Station":
+        """从已经规范化过的值创建（快照加载用，跳过类型转换）"""
+        station = cls.__new__(cls)
+        for field, value in zip(STATION_FIELDS, values):
+            setattr(station, field, value)
+        return station
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> "Station":
+        """从API返回的或保存的电台字典创建"""
+        return cls(record.get(field) for field in STATION_FIELDS)
+
+    # ---- 兼容字典的访问方式 ----
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def __getitem__(self, key: str):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELD_SET
+
+    def keys(self):
+        return STATION_FIELDS
+
+    def to_dict(self) -> Dict:
+        """转为普通字典（用于保存和序列化）"""
+        return {field: getattr(self, field) for field in STATION_FIELDS}
+
+    def full(self, store=None) -> Dict:
+        """完整的电台记录：从本地电台库读取，库中没有时只有界面字段"""
+        if store is not None:
+            record = store.get_full(self.stationuuid)
+            if record is not None:
+                return record
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Station({self.stationuuid!r}, {self.name!r})"
+
+
+def as_station(record) -> Station:
+    """把电台字典转为Station，已经是Station的原样返回"""
+    return record if isinstance(record, Station) else Station.from_dict(record)
+
+
+class StationView(Sequence):
+    """电台列表的视图：只保存下标数组（每个电台4字节），不复制电台引用列表"""
+
+    __slots__ = ("_stations", "_indexes")
+
+    def __init__(self, stations: Sequence, indexes: Optional[Iterable[int]] = None):
+        self._stations = stations
+        if indexes is None:
+            indexes = range(len(stations))
+        self._indexes = indexes if isinstance(indexes, array) else array("I", indexes)
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return StationView(self._stations, self._indexes[index])
+        return self._stations[self._indexes[index]]
+
+    def __iter__(self) -> Iterator:
+        stations = self._stations
+        for index in self._indexes:
+            yield stations[index]
+
+
+def save_snapshot(stations: Iterable[Station], path: str):
+    """把电台目录按列保存为压缩的快照文件（先写临时文件再替换，不会留下写了一半的快照）"""
+    stations = list(stations)
+    columns = [[getattr(station, field) for station in stations] for field in STATION_FIELDS]
+    data = json.dumps({"version": SNAPSHOT_VERSION, "fields": STATION_FIELDS, "columns": columns},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(zlib.compress(data, 1))
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path: str) -> Optional[List[Station]]:
+    """读取目录快照，文件不存在或格式不符时返回None"""
+    try:
+        with open(path, "rb") as f:
+            snapshot = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+    except (OSError, zlib.error, ValueError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION or tuple(snapshot.get("fields", ())) != STATION_FIELDS:
+        return None
+    columns = snapshot["columns"]
+    intern = sys.intern
+    for position, field in enumerate(STATION_FIELDS):
+        if field in INTERNED_FIELDS:
+            columns[position] = [intern(value) for value in columns[position]]
+    return [Station._from_clean(values) for values in zip(*columns)]
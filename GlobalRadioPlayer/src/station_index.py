@@ -0,0 +1,196 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+# 参与搜索的字段
+SEARCH_FIELDS = ("name", "country", "tags", "language")
+# 词表上建立的n-gram长度，用于子串匹配
+NGRAM_SIZES = (2, 3)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_text(text: str) -> str:
+    """Unicode折叠：去掉变音符号并统一大小写（"Música" -> "musica"）"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """把文本折叠后切分为词条"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(fold_text(str(text)))
+
+
+def _ngrams(token: str, size: int) -> Set[str]:
+    return {token[i:i + size] for i in range(len(token) - size + 1)}
+
+
+def _rank_key(station: Dict) -> int:
+    """把点击量和投票数合成一个整数排序键（越小越靠前），整数比较比元组快得多"""
+    clicks = max(0, int(station.get("clickcount") or 0))
+    votes = min(max(0, int(station.get("votes") or 0)), 0xFFFFFFFF)
+    return -((clicks << 32) | votes)
+
+
+class StationIndex:
+    """电台倒排索引：按名称、国家、标签和语言建立词条索引和n-gram索引
+
+    词条 -> 电台 的倒排表用于精确和前缀匹配，n-gram -> 词条 的索引建立在词表上，
+    子串查询先定位候选词条再合并它们的倒排表，不需要扫描全部电台。
+    """
+
+    def __init__(self, stations: Iterable[Dict] = ()):
+        self._docs: Dict[int, Dict] = {}            # 文档ID -> 电台
+        self._doc_ids: Dict[str, int] = {}          # stationuuid -> 文档ID
+        self._doc_tokens: Dict[int, Set[str]] = {}  # 文档ID -> 词条集合（删除时使用）
+        self._rank_keys: Dict[int, int] = {}        # 文档ID -> 排序键（热度高的在前）
+        self._postings: Dict[str, Set[int]] = {}    # 词条 -> 文档ID集合
+        self._grams: Dict[str, Set[str]] = {}       # n-gram -> 词条集合
+        self._sorted_vocab: List[str] = []
+        self._vocab_dirty = False
+        self._next_id = 0
+        self.add_many(stations)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, station_id: str) -> bool:
+        return station_id in self._doc_ids
+
+    # ---- 增量维护 ----
+
+    def add(self, station: Dict):
+        """添加或更新一个电台"""
+        station_id = station.get("stationuuid")
+        if not station_id:
+            return
+        if station_id in self._doc_ids:
+            self.remove(station_id)
+
+        doc_id = self._next_id
+        self._next_id += 1
+        tokens: Set[str] = set()
+        for field in SEARCH_FIELDS:
+            tokens.update(tokenize(station.get(field)))
+
+        self._docs[doc_id] = station
+        self._doc_ids[station_id] = doc_id
+        self._doc_tokens[doc_id] = tokens
+        self._rank_keys[doc_id] = _rank_key(station)
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                self._postings[token] = {doc_id}
+                self._add_token_grams(token)
+            else:
+                posting.add(doc_id)
+
+    def add_many(self, stations: Iterable[Dict]):
+        """批量添加电台"""
+        for station in stations:
+            self.add(station)
+
+    def remove(self, station_id: str):
+        """删除一个电台"""
+        doc_id = self._doc_ids.pop(station_id, None)
+        if doc_id is None:
+            return
+        del self._docs[doc_id]
+        del self._rank_keys[doc_id]
+        for token in self._doc_tokens.pop(doc_id):
+            posting = self._postings[token]
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[token]
+                self._remove_token_grams(token)
+
+    def _add_token_grams(self, token: str):
+        self._vocab_dirty = True
+        for size in NGRAM_SIZES:
+            for gram in _ngrams(token, size):
+                self._grams.setdefault(gram, set()).add(token)
+
+    def _remove_token_grams(self, token: str):
+        self._vocab_dirty = True
+        for size in NGRAM_SIZES:
+            for gram in _ngrams(token, size):
+                tokens = self._grams.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._grams[gram]
+
+    # ---- 查询 ----
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        if self._vocab_dirty:
+            self._sorted_vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        vocab = self._sorted_vocab
+        start = bisect.bisect_left(vocab, prefix)
+        end = bisect.bisect_left(vocab, prefix + "\uffff")
+        return vocab[start:end]
+
+    def _substring_tokens(self, term: str) -> Iterable[str]:
+        if len(term) < min(NGRAM_SIZES):
+            # 单个字符只做前缀匹配，避免匹配到几乎所有电台
+            return self._prefix_tokens(term)
+        size = max(s for s in NGRAM_SIZES if s <= len(term))
+        candidates: Optional[Set[str]] = None
+        for gram in sorted(_ngrams(term, size), key=lambda g: len(self._grams.get(g, ()))):
+            tokens = self._grams.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return []
+        return [token for token in candidates if term in token]
+
+    def _match_term(self, term: str, mode: str) -> Set[int]:
+        if mode == "exact":
+            tokens = [term] if term in self._postings else []
+        elif mode == "prefix":
+            tokens = self._prefix_tokens(term)
+        else:
+            tokens = self._substring_tokens(term)
+        result: Set[int] = set()
+        for token in tokens:
+            result |= self._postings[token]
+        return result
+
+    def search_ids(self, query: str, mode: str = "substring") -> Set[int]:
+        """返回同时匹配所有查询词的文档ID集合（mode: exact / prefix / substring）"""
+        terms = tokenize(query)
+        if not terms:
+            return set(self._docs)
+        # 先匹配较长的词，结果集通常更小，交集更快
+        result: Optional[Set[int]] = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            matched = self._match_term(term, mode)
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return result
+
+    def search(self, query: str, mode: str = "substring", limit: Optional[int] = None,
+               within: Optional[Set[str]] = None) -> List[Dict]:
+        """搜索电台，结果按点击量、投票数降序排列
+
+        within指定时只在这些stationuuid范围内搜索（如收藏列表）。
+        """
+        doc_ids = self.search_ids(query, mode)
+        if within is not None:
+            doc_ids = {self._doc_ids[sid] for sid in within if sid in self._doc_ids} & doc_ids
+        key = self._rank_keys.__getitem__
+        if limit is not None and limit < len(doc_ids):
+            ordered = heapq.nsmallest(limit, doc_ids, key=key)
+        else:
+            ordered = sorted(doc_ids, key=key)
+        docs = self._docs
+        return [docs[doc_id] for doc_id in ordered]
@@ -0,0 +1,133 @@
+from typing import AbstractSet, Any, Callable, Dict, Iterable, List, Optional
+
+from station import Station, as_station
+
+# 模型事件
+EVENT_RESET = "reset"            # 整个目录被替换，payload为None
+EVENT_UPDATED = "updated"        # 电台新增或更新，payload为stationuuid列表
+EVENT_REMOVED = "removed"        # 电台被删除，payload为stationuuid列表
+EVENT_FAVORITE = "favorite"      # 收藏状态变化，payload为(stationuuid, 是否收藏)
+
+
+class StationModel:
+    """以stationuuid为键的电台模型，集中保存电台目录和收藏
+
+    所有查询都是按ID的O(1)字典查找；数据变化时通过事件通知视图，
+    视图只需修补受影响的行。模型只应在Tk主线程中修改。
+    """
+
+    def __init__(self):
+        self._stations: Dict[str, Dict] = {}   # stationuuid -> 电台（保持目录顺序）
+        self._station_list: Optional[List[Dict]] = None  # stations()的缓存
+        self._favorites: Dict[str, Dict] = {}  # stationuuid -> 收藏时保存的电台记录（保持收藏顺序）
+        self._listeners: List[Callable[[str, Any], None]] = []
+
+    # ---- 事件 ----
+
+    def subscribe(self, listener: Callable[[str, Any], None]):
+        """注册事件监听器，listener(event, payload)"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, Any], None]):
+        """移除事件监听器"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, event: str, payload: Any = None):
+        for listener in list(self._listeners):
+            try:
+                listener(event, payload)
+            except Exception as e:
+                print(f"电台模型事件处理失败: {e}")
+
+    # ---- 电台目录 ----
+
+    def load(self, stations: Iterable[Dict]):
+        """替换整个电台目录"""
+        self._stations = {s["stationuuid"]: s for s in stations if s.get("stationuuid")}
+        self._station_list = None
+        self._emit(EVENT_RESET)
+
+    def upsert(self, stations: Iterable[Dict]):
+        """新增或更新电台"""
+        changed = []
+        for station in stations:
+            station_id = station.get("stationuuid")
+            if station_id:
+                self._stations[station_id] = station
+                changed.append(station_id)
+        if changed:
+            self._station_list = None
+            self._emit(EVENT_UPDATED, changed)
+
+    def remove(self, station_ids: Iterable[str]):
+        """删除电台（收藏记录保留）"""
+        removed = [sid for sid in station_ids if self._stations.pop(sid, None) is not None]
+        if removed:
+            self._station_list = None
+            self._emit(EVENT_REMOVED, removed)
+
+    def get(self, station_id: Optional[str]) -> Optional[Dict]:
+        """按ID获取电台；目录中没有时返回收藏时保存的记录"""
+        if station_id is None:
+            return None
+        station = self._stations.get(station_id)
+        if station is None:
+            station = self._favorites.get(station_id)
+        return station
+
+    def stations(self) -> List[Dict]:
+        """目录中的全部电台（按目录顺序，返回共享的缓存列表，不要修改）"""
+        if self._station_list is None:
+            self._station_list = list(self._stations.values())
+        return self._station_list
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def __contains__(self, station_id: str) -> bool:
+        return station_id in self._stations
+
+    # ---- 收藏 ----
+
+    @property
+    def favorite_ids(self) -> AbstractSet[str]:
+        """收藏的电台ID集合（只读视图，不要直接修改）"""
+        return self._favorites.keys()
+
+    def is_favorite(self, station_id: Optional[str]) -> bool:
+        return station_id in self._favorites
+
+    def set_favorite(self, station_id: str, favorite: bool) -> bool:
+        """设置收藏状态，状态有变化时返回True"""
+        if favorite == (station_id in self._favorites):
+            return False
+        if favorite:
+            station = self.get(station_id)
+            if station is None:
+                return False
+            self._favorites[station_id] = station
+        else:
+            del self._favorites[station_id]
+        self._emit(EVENT_FAVORITE, (station_id, favorite))
+        return True
+
+    def toggle_favorite(self, station_id: str) -> bool:
+        """切换收藏状态，返回切换后是否为收藏"""
+        favorite = station_id not in self._favorites
+        self.set_favorite(station_id, favorite)
+        return favorite
+
+    def favorites(self) -> List[Dict]:
+        """收藏的电台（按收藏顺序，优先使用目录中的最新数据）"""
+        stations = self._stations
+        return [stations.get(sid, record) for sid, record in self._favorites.items()]
+
+    def load_favorites(self, records: Iterable[Dict]):
+        """从保存的记录加载收藏（转为紧凑的Station记录）"""
+        self._favorites = {r["stationuuid"]: as_station(r) for r in records if r.get("stationuuid")}
+        self._emit(EVENT_RESET)
+
+    def favorite_records(self) -> List[Dict]:
+        """用于持久化的收藏记录（普通字典）"""
+        return [s.to_dict() if isinstance(s, Station) else dict(s) for s in self.favorites()]
@@ -0,0 +1,285 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+from station import STATION_FIELDS, Station
+
+# 界面和筛选会用到的字段，单独成列并建立索引
+STATION_COLUMNS = (
+    "stationuuid", "changeuuid", "name", "url", "url_resolved", "homepage",
+    "favicon", "tags", "country", "countrycode", "language", "languagecodes",
+    "codec", "bitrate", "hls", "lastcheckok", "votes", "clickcount",
+    "clicktrend", "lastchangetime"
+)
+INTEGER_COLUMNS = {"bitrate", "hls", "lastcheckok", "votes", "clickcount", "clicktrend"}
+# 允许排序的字段（防止拼接任意SQL）
+ORDER_COLUMNS = {"clickcount", "votes", "clicktrend", "name", "bitrate", "country", "language"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    stationuuid TEXT PRIMARY KEY,
+    changeuuid TEXT,
+    name TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    url_resolved TEXT NOT NULL DEFAULT '',
+    homepage TEXT NOT NULL DEFAULT '',
+    favicon TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '',
+    country TEXT NOT NULL DEFAULT '',
+    countrycode TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL DEFAULT '',
+    languagecodes TEXT NOT NULL DEFAULT '',
+    codec TEXT NOT NULL DEFAULT '',
+    bitrate INTEGER NOT NULL DEFAULT 0,
+    hls INTEGER NOT NULL DEFAULT 0,
+    lastcheckok INTEGER NOT NULL DEFAULT 0,
+    votes INTEGER NOT NULL DEFAULT 0,
+    clickcount INTEGER NOT NULL DEFAULT 0,
+    clicktrend INTEGER NOT NULL DEFAULT 0,
+    lastchangetime TEXT NOT NULL DEFAULT '',
+    extra BLOB
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stations_country ON stations(country COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_stations_countrycode ON stations(countrycode);
+CREATE INDEX IF NOT EXISTS idx_stations_language ON stations(language COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_stations_clickcount ON stations(clickcount DESC);
+CREATE TABLE IF NOT EXISTS station_tags (
+    tag TEXT NOT NULL,
+    stationuuid TEXT NOT NULL,
+    PRIMARY KEY (tag, stationuuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_station_tags_station ON station_tags(stationuuid);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """把逗号分隔的标签字符串拆分为去重后的小写标签列表"""
+    result = []
+    for tag in (tags or "").split(","):
+        tag = tag.strip().lower()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+class StationStore:
+    """基于SQLite的电台持久化存储，支持增量更新和带索引的筛选查询"""
+
+    def __init__(self, db_path: str = "radio_store.db"):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def _to_row(station: Dict) -> tuple:
+        """把API返回的电台字典拆分为索引列和压缩后的其余字段"""
+        values = []
+        for column in STATION_COLUMNS:
+            value = station.get(column)
+            if column in INTEGER_COLUMNS:
+                try:
+                    value = int(value or 0)
+                except (TypeError, ValueError):
+                    value = 0
+            else:
+                value = "" if value is None else str(value)
+            values.append(value)
+        extra = {k: v for k, v in station.items() if k not in STATION_COLUMNS}
+        blob = zlib.compress(json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        values.append(blob)
+        return tuple(values)
+
+    def upsert_many(self, stations: Iterable[Dict]) -> int:
+        """按stationuuid批量增量写入，changeuuid未变化的电台会被跳过，返回实际写入数量"""
+        batch = {}
+        for station in stations:
+            station_id = station.get("stationuuid")
+            if station_id:
+                batch[station_id] = station
+        if not batch:
+            return 0
+
+        with self._lock:
+            # 查询已有记录的changeuuid，只写入有变化的电台
+            existing = {}
+            ids = list(batch)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                        f"SELECT stationuuid, changeuuid FROM stations WHERE stationuuid IN ({placeholders})",
+                        chunk):
+                    existing[row[0]] = row[1]
+
+            changed = [
+                station for station_id, station in batch.items()
+                if station_id not in existing
+                or not station.get("changeuuid")
+                or existing[station_id] != station.get("changeuuid")
+            ]
+            if not changed:
+                return 0
+
+            columns = STATION_COLUMNS + ("extra",)
+            placeholders = ",".join("?" * len(columns))
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO stations ({','.join(columns)}) VALUES ({placeholders})",
+                    [self._to_row(station) for station in changed]
+                )
+                changed_ids = [(station["stationuuid"],) for station in changed]
+                self._conn.executemany("DELETE FROM station_tags WHERE stationuuid = ?", changed_ids)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO station_tags (tag, stationuuid) VALUES (?, ?)",
+                    [(tag, station["stationuuid"]) for station in changed for tag in split_tags(station.get("tags"))]
+                )
+            return len(changed)
+
+    def delete_many(self, station_ids: Iterable[str]) -> int:
+        """删除指定电台，返回删除数量"""
+        rows = [(station_id,) for station_id in station_ids if station_id]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("DELETE FROM stations WHERE stationuuid = ?", rows)
+            deleted = self._conn.total_changes - before
+            self._conn.executemany("DELETE FROM station_tags WHERE stationuuid = ?", rows)
+            return deleted
+
+    def import_json_file(self, path: str) -> int:
+        """从旧版radio_cache.json导入电台（用于迁移），返回写入数量"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(data, list):
+            return 0
+        return self.upsert_many(data)
+
+    # ---- 查询 ----
+
+    def count(self) -> int:
+        """电台总数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM stations").fetchone()[0]
+
+    def station_ids(self) -> Set[str]:
+        """全部电台的stationuuid"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT stationuuid FROM stations")}
+
+    def latest_change_time(self) -> str:
+        """本地电台中最大的lastchangetime，没有电台时为空字符串"""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(lastchangetime) FROM stations").fetchone()[0] or ""
+
+    def query(self, name: Optional[str] = None, country: Optional[str] = None,
+              countrycode: Optional[str] = None, language: Optional[str] = None,
+              tag: Optional[str] = None, codec: Optional[str] = None,
+              playable_only: bool = False, order: str = "clickcount", reverse: bool = True,
+              limit: Optional[int] = None, offset: int = 0, compact: bool = False) -> List[Dict]:
+        """按条件筛选电台，只返回界面使用的字段；compact为True时返回紧凑的Station记录"""
+        clauses = []
+        params: List = []
+        if name:
+            clauses.append("name LIKE ?")
+            params.append(f"%{name}%")
+        if country:
+            clauses.append("country = ? COLLATE NOCASE")
+            params.append(country)
+        if countrycode:
+            clauses.append("countrycode = ?")
+            params.append(countrycode.upper())
+        if language:
+            clauses.append("language = ? COLLATE NOCASE")
+            params.append(language)
+        if codec:
+            clauses.append("codec = ? COLLATE NOCASE")
+            params.append(codec)
+        if tag:
+            clauses.append("stationuuid IN (SELECT stationuuid FROM station_tags WHERE tag = ?)")
+            params.append(tag.strip().lower())
+        if playable_only:
+            clauses.append("url_resolved != '' AND name != ''")
+
+        if order not in ORDER_COLUMNS:
+            order = "clickcount"
+        columns = STATION_FIELDS if compact else STATION_COLUMNS
+        sql = f"SELECT {','.join(columns)} FROM stations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} {'DESC' if reverse else 'ASC'}, stationuuid"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([int(limit), int(offset)])
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if compact:
+            return [Station(row) for row in rows]
+        return [dict(row) for row in rows]
+
+    def get(self, station_id: str) -> Optional[Dict]:
+        """获取单个电台的界面字段"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {','.join(STATION_COLUMNS)} FROM stations WHERE stationuuid = ?",
+                (station_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_full(self, station_id: str) -> Optional[Dict]:
+        """获取单个电台的完整记录（包含压缩存储的其余字段）"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {','.join(STATION_COLUMNS)}, extra FROM stations WHERE stationuuid = ?",
+                (station_id,)
+            ).fetchone()
+        if not row:
+            return None
+        station = {column: row[column] for column in STATION_COLUMNS}
+        if row["extra"]:
+            try:
+                station.update(json.loads(zlib.decompress(row["extra"]).decode("utf-8")))
+            except (zlib.error, ValueError):
+                pass
+        return station
+
+    # ---- 元数据 ----
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取元数据（如同步进度）"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: Optional[str]):
+        """写入元数据，value为None时删除"""
+        with self._lock, self._conn:
+            if value is None:
+                self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
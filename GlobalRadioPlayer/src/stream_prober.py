@@ -0,0 +1,343 @@
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = "GlobalRadioPlayer/1.0"
+# 响应头最大长度，超过认为不是正常的流媒体服务器
+MAX_HEADER_BYTES = 16 * 1024
+# 首个音频字节在这个时间内到达的电台排在前面，超过SLOW_THRESHOLD的排在后面
+FAST_THRESHOLD = 1.0
+SLOW_THRESHOLD = 3.0
+# 按Content-Type识别编码
+CONTENT_TYPE_CODECS = {
+    "audio/mpeg": "MP3",
+    "audio/mp3": "MP3",
+    "audio/aac": "AAC",
+    "audio/aacp": "AAC+",
+    "audio/x-aac": "AAC",
+    "audio/ogg": "OGG",
+    "application/ogg": "OGG",
+    "audio/opus": "OPUS",
+    "audio/flac": "FLAC",
+    "audio/x-scpls": "PLS",
+    "audio/x-mpegurl": "M3U",
+    "audio/mpegurl": "M3U",
+    "application/vnd.apple.mpegurl": "HLS",
+    "application/x-mpegurl": "HLS",
+}
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class ProbeError(Exception):
+    """探测失败；stage表示失败发生的阶段（dns / connect / response）"""
+
+    def __init__(self, message: str, stage: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+def _parse_bitrate(headers: Dict[str, str]) -> int:
+    """从icy-br或ice-audio-info中取比特率（kbps），取不到返回0"""
+    value = headers.get("icy-br", "")
+    if not value:
+        for part in headers.get("ice-audio-info", "").split(";"):
+            name, _, raw = part.partition("=")
+            if name.strip().lower() in ("bitrate", "ice-bitrate"):
+                value = raw
+                break
+    # 部分服务器返回"128,128"之类的重复值
+    value = value.split(",")[0].strip()
+    return int(value) if value.isdigit() else 0
+
+
+def _parse_head(head: bytes) -> Tuple[int, Dict[str, str]]:
+    """解析状态行和响应头，兼容SHOUTcast的"ICY 200 OK"状态行"""
+    lines = head.decode("latin-1").split("\r\n")
+    fields = lines[0].split(None, 2)
+    if len(fields) < 2 or not fields[1].isdigit():
+        raise ValueError(f"无法识别的状态行：{lines[0][:80]}")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return int(fields[1]), headers
+
+
+def open_stream(url: str, connect_timeout: float, read_timeout: float,
+                ssl_context: Optional[ssl.SSLContext] = None, icy_metadata: bool = True):
+    """连接流地址并读取响应头（不跟随重定向）
+
+    返回(socket, 状态码, 响应头, 响应头之后已读到的数据, 连接耗时, 请求发出时刻)，
+    调用方负责关闭socket；失败时抛出ProbeError。
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ProbeError(f"不支持的地址：{url}", "connect")
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    try:
+        addr = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)[0][4]
+    except OSError as e:
+        raise ProbeError(f"域名解析失败：{e}", "dns")
+
+    start = time.perf_counter()
+    try:
+        sock = socket.create_connection(addr[:2], timeout=connect_timeout)
+    except OSError as e:
+        raise ProbeError(f"连接失败：{e}", "connect")
+    try:
+        if secure:
+            sock = (ssl_context or ssl.create_default_context()).wrap_socket(sock, server_hostname=parts.hostname)
+        connect_time = time.perf_counter() - start
+
+        sock.settimeout(read_timeout)
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        request = (
+            f"GET {path} HTTP/1.0\r\n"
+            f"Host: {host}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            f"Icy-MetaData: {1 if icy_metadata else 0}\r\n"
+            "Accept: */*\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        sent = time.perf_counter()
+        sock.sendall(request.encode("latin-1"))
+
+        buffer = b""
+        while b"\r\n\r\n" not in buffer:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ProbeError("服务器关闭了连接", "response")
+            buffer += chunk
+            if len(buffer) > MAX_HEADER_BYTES:
+                raise ProbeError("响应头过长", "response")
+        head, _, body = buffer.partition(b"\r\n\r\n")
+        status, headers = _parse_head(head)
+        return sock, status, headers, body, connect_time, sent
+    except ProbeError:
+        sock.close()
+        raise
+    except (OSError, ValueError) as e:
+        sock.close()
+        raise ProbeError(f"读取响应失败：{e}", "response")
+
+
+class StreamProber:
+    """并发探测电台流地址的可用性和起播速度
+
+    对每个地址建立连接并发送GET请求，记录连接耗时、首个音频字节到达耗时，
+    以及ICY响应头中的实际编码和比特率。结果按stationuuid缓存，过期前不会重复探测；
+    探测结果用于隐藏失效电台，并让起播快的电台排在前面。
+    """
+
+    def __init__(self, max_concurrency: int = 16, connect_timeout: float = 3.0,
+                 read_timeout: float = 5.0, ttl: float = 1800, failure_ttl: float = 600,
+                 max_redirects: int = 5):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_redirects = max_redirects
+        self._results: Dict[str, Dict] = {}   # stationuuid -> 探测结果
+        self._in_flight = set()
+        self._version = 0   # 探测结果每次更新时加一，用于判断排序结果是否还有效
+        # 上次order()的(结果版本, 传入的列表, 排序结果, 失效时间)，结果和列表都没变时直接复用
+        self._order_cache: Optional[Tuple[int, Sequence[Dict], Sequence[Dict], float]] = None
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="probe")
+
+    # ---- 单个地址 ----
+
+    def probe_url(self, url: str) -> Dict:
+        """探测单个流地址，返回探测结果（不抛出异常）"""
+        result = {
+            "ok": False,
+            "url": url,
+            "status": 0,
+            "connect_time": None,
+            "ttfb": None,
+            "codec": "",
+            "bitrate": 0,
+            "content_type": "",
+            "icy_name": "",
+            "error": "",
+            "error_stage": "",
+            "checked": time.time(),
+        }
+        try:
+            for _ in range(self.max_redirects + 1):
+                status, headers, connect_time, ttfb = self._request(url)
+                if status in _REDIRECT_STATUSES and headers.get("location"):
+                    url = urljoin(url, headers["location"])
+                    continue
+                break
+            else:
+                raise ProbeError("重定向次数过多", "response")
+        except ProbeError as e:
+            result["error"], result["error_stage"] = str(e), e.stage
+            return result
+
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        result.update(
+            url=url,
+            status=status,
+            connect_time=connect_time,
+            ttfb=ttfb,
+            content_type=content_type,
+            codec=CONTENT_TYPE_CODECS.get(content_type, ""),
+            bitrate=_parse_bitrate(headers),
+            icy_name=headers.get("icy-name", ""),
+        )
+        if 200 <= status < 300 and ttfb is not None:
+            result["ok"] = True
+        else:
+            result["error"], result["error_stage"] = f"HTTP {status}", "response"
+        return result
+
+    def _request(self, url: str) -> Tuple[int, Dict[str, str], float, Optional[float]]:
+        """发送一次GET请求，返回(状态码, 响应头, 连接耗时, 首字节耗时)"""
+        sock, status, headers, body, connect_time, sent = open_stream(
+            url, self.connect_timeout, self.read_timeout, self._ssl_context)
+        try:
+            # 首个音频字节：响应头后面已带数据时即为当前时刻，否则再等一次
+            ttfb = None
+            if 200 <= status < 300:
+                if not body:
+                    body = sock.recv(1)
+                if body:
+                    ttfb = time.perf_counter() - sent
+            return status, headers, connect_time, ttfb
+        except OSError as e:
+            raise ProbeError(f"读取响应失败：{e}", "response")
+        finally:
+            sock.close()
+
+    # ---- 批量探测 ----
+
+    def get(self, station_id: str) -> Optional[Dict]:
+        """返回未过期的探测结果"""
+        result = self._results.get(station_id)
+        if result is None:
+            return None
+        ttl = self.ttl if result["ok"] else self.failure_ttl
+        if time.time() - result["checked"] > ttl:
+            return None
+        return result
+
+    def is_dead(self, station_id: str) -> bool:
+        """最近一次探测失败的电台"""
+        result = self.get(station_id)
+        return result is not None and not result["ok"]
+
+    def probe_many(self, stations: Iterable[Dict]) -> Dict[str, Dict]:
+        """并发探测一批电台（阻塞），已有未过期结果或正在探测的电台会跳过
+
+        返回本次新探测的 stationuuid -> 结果。
+        """
+        targets = []
+        with self._lock:
+            for station in stations:
+                station_id = station.get("stationuuid")
+                url = station.get("url_resolved") or station.get("url")
+                if not station_id or not url or station_id in self._in_flight:
+                    continue
+                if self.get(station_id) is not None:
+                    continue
+                self._in_flight.add(station_id)
+                targets.append((station_id, url))
+        if not targets:
+            return {}
+
+        try:
+            results = dict(zip(
+                (station_id for station_id, _ in targets),
+                self._executor.map(self.probe_url, (url for _, url in targets))
+            ))
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(station_id for station_id, _ in targets)
+
+        # 整批都在解析或连接阶段失败，多半是本机网络断开，不能据此把电台判为失效
+        failures = [r for r in results.values() if not r["ok"]]
+        if len(results) >= 3 and len(failures) == len(results) and \
+                all(r["error_stage"] in ("dns", "connect") for r in failures):
+            return {}
+
+        with self._lock:
+            self._results.update(results)
+            self._version += 1
+        return results
+
+    def submit(self, stations: Iterable[Dict], callback: Optional[Callable[[Dict[str, Dict]], None]] = None):
+        """在后台线程探测一批电台，完成后在该线程调用callback(新结果)"""
+        stations = list(stations)
+
+        def run():
+            try:
+                results = self.probe_many(stations)
+            except Exception as e:
+                print(f"探测电台失败: {e}")
+                return
+            if results and callback is not None:
+                callback(results)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def shutdown(self):
+        """关闭探测线程池"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---- 排序 ----
+
+    def _speed_bucket(self, result: Dict) -> int:
+        """起播快的为0，未探测的为1，起播慢的为2"""
+        startup = result["connect_time"] + result["ttfb"]
+        if startup <= FAST_THRESHOLD:
+            return 0
+        return 2 if startup >= SLOW_THRESHOLD else 1
+
+    def order(self, stations: Sequence[Dict]) -> Sequence[Dict]:
+        """去掉失效电台，并把起播快的电台提前、慢的电台后移（同一档内保持原顺序）
+
+        没有任何探测结果时原样返回传入的列表。传入同一个列表且探测结果没有变化、
+        也没有结果过期时，直接返回上次的排序结果。
+        """
+        now = time.time()
+        with self._lock:
+            version = self._version
+            cache = self._order_cache
+            station_ids = list(self._results)
+        if cache is not None and cache[0] == version and cache[1] is stations and now < cache[3]:
+            return cache[2]
+
+        # 先把探测过的电台整理成两个字典，排序时只做一次字典查找
+        dead = set()
+        buckets: Dict[str, int] = {}
+        expires = float("inf")
+        for station_id in station_ids:
+            result = self.get(station_id)
+            if result is None:
+                continue
+            expires = min(expires, result["checked"] + (self.ttl if result["ok"] else self.failure_ttl))
+            if not result["ok"]:
+                dead.add(station_id)
+            else:
+                buckets[station_id] = self._speed_bucket(result)
+        if not dead and not buckets:
+            ordered = stations
+        else:
+            live = [s for s in stations if s.get("stationuuid") not in dead] if dead else stations
+            ordered = sorted(live, key=lambda s: buckets.get(s.get("stationuuid"), 1))
+        with self._lock:
+            self._order_cache = (version, stations, ordered, expires)
+        return ordered
@@ -0,0 +1,173 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from http_client import get_shared_session
+from response_cache import ResponseCache, make_cache_key
+
+# 播放列表的Content-Type和扩展名
+PLAYLIST_TYPES = {
+    "audio/x-scpls": "pls",
+    "application/pls+xml": "pls",
+    "audio/x-mpegurl": "m3u",
+    "audio/mpegurl": "m3u",
+    "application/x-mpegurl": "m3u",
+    "application/vnd.apple.mpegurl": "m3u",
+}
+PLAYLIST_EXTENSIONS = {".pls": "pls", ".m3u": "m3u", ".m3u8": "m3u"}
+# 播放列表最多读取的字节数，真正的音频流不会被读取
+MAX_PLAYLIST_BYTES = 64 * 1024
+# 播放列表嵌套的最大层数
+MAX_PLAYLIST_DEPTH = 3
+
+
+def parse_pls(text: str) -> List[str]:
+    """解析PLS播放列表，按File1、File2...的顺序返回地址"""
+    entries = []
+    for line in text.splitlines():
+        name, sep, value = line.partition("=")
+        name = name.strip().lower()
+        if sep and name.startswith("file") and name[4:].isdigit() and value.strip():
+            entries.append((int(name[4:]), value.strip()))
+    return [url for _, url in sorted(entries)]
+
+
+def parse_m3u(text: str, base_url: str) -> Optional[List[str]]:
+    """解析M3U/M3U8播放列表
+
+    HLS主播放列表按码率从高到低返回各个子播放列表；HLS媒体播放列表（由分片组成）
+    本身就是最终的播放地址，返回None；普通M3U返回其中的地址。
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if any(line.startswith(("#EXT-X-TARGETDURATION", "#EXT-X-MEDIA-SEQUENCE")) for line in lines):
+        return None
+
+    variants = []
+    urls = []
+    bandwidth = None
+    for line in lines:
+        if line.startswith("#EXT-X-STREAM-INF"):
+            bandwidth = 0
+            for attr in line.partition(":")[2].split(","):
+                key, _, value = attr.partition("=")
+                if key.strip().upper() == "BANDWIDTH" and value.strip().isdigit():
+                    bandwidth = int(value.strip())
+        elif not line.startswith("#"):
+            url = urljoin(base_url, line)
+            if bandwidth is not None:
+                variants.append((bandwidth, url))
+                bandwidth = None
+            else:
+                urls.append(url)
+    if variants:
+        return [url for _, url in sorted(variants, key=lambda v: -v[0])]
+    return urls
+
+
+class StreamResolver:
+    """把电台地址解析为最终的流地址，并按stationuuid缓存
+
+    依次跟随HTTP重定向、展开PLS/M3U播放列表和HLS主播放列表，直到得到真正的
+    音频流或HLS媒体播放列表。结果缓存ttl秒；超过revalidate_after秒的结果仍会
+    直接返回，同时在后台重新解析，播放时不需要等待解析。
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, ttl: float = 6 * 3600,
+                 revalidate_after: float = 1800, timeout: tuple = (4, 8)):
+        self.cache = cache or ResponseCache(max_entries=2048, default_ttl=ttl, disk_dir="stream_cache",
+                                            max_disk_bytes=4 * 1024 * 1024)
+        self.ttl = ttl
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.session = get_shared_session()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="resolver")
+
+    # ---- 解析 ----
+
+    def resolve(self, url: str, depth: int = 0) -> str:
+        """解析出最终的流地址（阻塞，网络错误时抛出requests异常）"""
+        with self.session.get(url, stream=True, timeout=self.timeout, allow_redirects=True) as response:
+            response.raise_for_status()
+            final_url = response.url
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            kind = PLAYLIST_TYPES.get(content_type)
+            if kind is None:
+                path = urlsplit(final_url).path.lower()
+                kind = next((k for ext, k in PLAYLIST_EXTENSIONS.items() if path.endswith(ext)), None)
+            if kind is None or depth >= MAX_PLAYLIST_DEPTH:
+                # 不是播放列表，不读取响应体（音频流没有结尾）
+                return final_url
+
+            body = b""
+            for chunk in response.iter_content(8192):
+                body += chunk
+                if len(body) >= MAX_PLAYLIST_BYTES:
+                    break
+            text = body.decode(response.encoding or "utf-8", errors="replace")
+
+        entries = parse_pls(text) if kind == "pls" else parse_m3u(text, final_url)
+        if entries is None:
+            # HLS媒体播放列表，直接交给播放器
+            return final_url
+        for entry in entries:
+            try:
+                return self.resolve(urljoin(final_url, entry), depth + 1)
+            except requests.exceptions.RequestException:
+                # 播放列表中的地址失效时尝试下一个
+                continue
+        return final_url
+
+    # ---- 缓存 ----
+
+    @staticmethod
+    def _cache_key(station_id: str) -> str:
+        return make_cache_key("stream", {"station": station_id})
+
+    def cached(self, station_id: Optional[str], url: str) -> str:
+        """返回缓存的最终地址（不阻塞）
+
+        没有缓存时返回原地址并在后台解析，供下次播放使用；缓存较旧时在后台重新验证。
+        """
+        if not station_id or not url:
+            return url
+        entry = self.cache.get(self._cache_key(station_id))
+        if entry is None or entry.get("source") != url:
+            self.revalidate(station_id, url)
+            return url
+        if time.time() - entry.get("resolved_at", 0) > self.revalidate_after:
+            self.revalidate(station_id, url)
+        return entry["resolved"]
+
+    def revalidate(self, station_id: str, url: str):
+        """在后台重新解析电台地址（同一电台同时只解析一次）"""
+        with self._lock:
+            if station_id in self._pending:
+                return
+            self._pending.add(station_id)
+        self._executor.submit(self._revalidate, station_id, url)
+
+    def _revalidate(self, station_id: str, url: str):
+        try:
+            resolved = self.resolve(url)
+        except requests.exceptions.RequestException as e:
+            # 解析失败时保留旧结果，直到其过期
+            print(f"解析电台地址失败: {e}")
+            return
+        except Exception as e:
+            print(f"解析电台地址出错: {e}")
+            return
+        finally:
+            with self._lock:
+                self._pending.discard(station_id)
+        self.cache.set(self._cache_key(station_id),
+                       {"source": url, "resolved": resolved, "resolved_at": time.time()}, ttl=self.ttl)
+
+    def invalidate(self, station_id: str):
+        """丢弃电台的缓存地址（例如播放失败时）"""
+        self.cache.invalidate(self._cache_key(station_id))
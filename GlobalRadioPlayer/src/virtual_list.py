@@ -0,0 +1,277 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+
+class VirtualTreeview(ttk.Frame):
+    """虚拟化的表格列表：只为视口内可见的行创建Treeview条目，滚动时复用这些条目
+
+    数据保存在普通列表中，Treeview里始终只有一屏左右的行；滚动或数据变化时
+    只改写内容有变化的行，因此列表长度不影响刷新和滚动的耗时。
+    """
+
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, master, columns: Sequence[str], row_builder: Callable[[Any], tuple],
+                 key_func: Callable[[Any], Any], height: int = 18,
+                 image_func: Optional[Callable[[Any], Any]] = None, **tree_kwargs):
+        super().__init__(master)
+        self.row_builder = row_builder
+        self.key_func = key_func
+        self.image_func = image_func  # 返回行图标（显示在#0列），没有图标返回None
+
+        self._items: Sequence[Any] = []
+        self._key_index: Optional[Dict[Any, int]] = None
+        self._top = 0                      # 视口第一行对应的数据下标
+        self._visible_rows = height        # 视口能容纳的行数
+        self._row_height = self.DEFAULT_ROW_HEIGHT
+        self._pool: List[str] = []         # 复用的Treeview条目
+        self._rendered: Dict[str, tuple] = {}  # 条目 -> (数据键, 显示内容, 图标)，用于跳过没有变化的行
+        self._detached: Set[str] = set()   # 暂时摘下的条目
+        self._selected_key: Any = None
+        self._select_callbacks: List[Callable[[Any], None]] = []
+        self._scroll_callbacks: List[Callable[[], None]] = []
+        self._notified_view: Optional[tuple] = None  # 上次通知时的(数据列表, 视口首行, 行数)
+
+        h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL)
+        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.v_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=columns,
+            height=height,
+            selectmode="browse",
+            xscrollcommand=h_scrollbar.set,
+            **tree_kwargs
+        )
+        h_scrollbar.config(command=self.tree.xview)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "page-up"),
+                               ("<Next>", "page-down"), ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(sequence, lambda e, s=step: self._on_key(s))
+
+    # ---- 数据 ----
+
+    def set_items(self, items: Sequence[Any], keep_position: bool = True):
+        """替换列表数据（不复制列表），只重绘可见行"""
+        self._items = items
+        self._key_index = None
+        if not keep_position:
+            self._top = 0
+        self._clamp_top()
+        self._render()
+
+    def refresh_rows(self):
+        """数据内容有变化时重绘可见行（只有内容不同的行才会真正更新）"""
+        self._render()
+
+    def refresh_key(self, key: Any):
+        """只重绘指定数据键对应的行（该行不在视口内时什么也不做）"""
+        for offset, iid in enumerate(self._pool):
+            entry = self._rendered.get(iid)
+            if entry is None or entry[0] != key:
+                continue
+            self._render_row(iid, key, self._items[self._top + offset])
+            return
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def visible_items(self) -> List[Any]:
+        """视口内当前可见的数据项"""
+        return list(self._items[self._top:self._top + self._visible_rows])
+
+    def index_of_key(self, key: Any) -> int:
+        """返回数据键对应的下标，不存在返回-1"""
+        if self._key_index is None:
+            self._key_index = {self.key_func(item): i for i, item in enumerate(self._items)}
+        return self._key_index.get(key, -1)
+
+    # ---- 选择 ----
+
+    def bind_select(self, callback: Callable[[Any], None]):
+        """注册选择变化回调，参数为选中行的数据键"""
+        self._select_callbacks.append(callback)
+
+    def selected_key(self) -> Any:
+        """当前选中行的数据键（可能已滚动出视口）"""
+        return self._selected_key
+
+    def selected_index(self) -> int:
+        """当前选中行在数据中的下标，没有选中返回-1"""
+        if self._selected_key is None:
+            return -1
+        return self.index_of_key(self._selected_key)
+
+    def selected_item(self) -> Any:
+        """当前选中的数据项"""
+        index = self.selected_index()
+        return self._items[index] if index >= 0 else None
+
+    def select_key(self, key: Any, see: bool = True):
+        """按数据键选中一行"""
+        self._set_selected(key)
+        if see:
+            index = self.index_of_key(key)
+            if index >= 0:
+                self.see(index)
+        self._render()
+
+    def item_at(self, y: int) -> Any:
+        """返回窗口坐标y处的数据项（用于双击等事件）"""
+        iid = self.tree.identify_row(y)
+        if not iid or iid not in self._rendered:
+            return None
+        index = self._top + self._pool.index(iid)
+        return self._items[index] if index < len(self._items) else None
+
+    def _set_selected(self, key: Any):
+        if key == self._selected_key:
+            return
+        self._selected_key = key
+        for callback in self._select_callbacks:
+            callback(key)
+
+    def _on_tree_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        entry = self._rendered.get(selection[0])
+        if entry is not None:
+            self._set_selected(entry[0])
+
+    # ---- 滚动 ----
+
+    def bind_scroll(self, callback: Callable[[], None]):
+        """注册视口变化回调（滚动或数据变化使可见行改变时调用）"""
+        self._scroll_callbacks.append(callback)
+
+    def see(self, index: int):
+        """滚动使指定下标的行可见"""
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + self._visible_rows:
+            self._top = index - self._visible_rows + 1
+        self._clamp_top()
+        self._render()
+
+    def _clamp_top(self):
+        max_top = max(0, len(self._items) - self._visible_rows)
+        self._top = max(0, min(self._top, max_top))
+
+    def _scroll_by(self, rows: int):
+        old_top = self._top
+        self._top += rows
+        self._clamp_top()
+        if self._top != old_top:
+            self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._top = int(float(value) * len(self._items))
+        elif action == "scroll":
+            step = self._visible_rows if unit == "pages" else 1
+            self._top += int(value) * step
+        self._clamp_top()
+        self._render()
+
+    def _on_mousewheel(self, event):
+        # Windows下每格delta为120，macOS下为1
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-delta * 3)
+
+    def _on_key(self, step):
+        if not self._items:
+            return "break"
+        index = self.selected_index()
+        if step == "home":
+            index = 0
+        elif step == "end":
+            index = len(self._items) - 1
+        elif step == "page-up":
+            index = max(0, index - self._visible_rows)
+        elif step == "page-down":
+            index = min(len(self._items) - 1, index + self._visible_rows)
+        else:
+            index = max(0, min(len(self._items) - 1, index + step))
+        self.select_key(self.key_func(self._items[index]))
+        return "break"
+
+    def _on_configure(self, event):
+        # 根据实际行高计算视口能容纳的行数
+        first_row_y = self._row_height  # 表头高度，无法测量时按一行估算
+        if self._pool:
+            bbox = self.tree.bbox(self._pool[0])
+            if bbox:
+                first_row_y, self._row_height = bbox[1], max(1, bbox[3])
+        rows = max(1, (event.height - first_row_y) // self._row_height)
+        if rows != self._visible_rows:
+            self._visible_rows = rows
+            self._clamp_top()
+            self._render()
+
+    # ---- 绘制 ----
+
+    def _render_row(self, iid: str, key: Any, item: Any):
+        """重绘一行，内容和图标都没有变化时跳过"""
+        values = self.row_builder(item)
+        image = self.image_func(item) if self.image_func is not None else None
+        if self._rendered.get(iid) == (key, values, image):
+            return
+        if self.image_func is not None:
+            self.tree.item(iid, values=values, image=image or "")
+        else:
+            self.tree.item(iid, values=values)
+        self._rendered[iid] = (key, values, image)
+
+    def _render(self):
+        total = len(self._items)
+        while len(self._pool) < self._visible_rows:
+            self._pool.append(self.tree.insert("", tk.END, values=()))
+
+        selected_iid = None
+        for offset, iid in enumerate(self._pool):
+            index = self._top + offset
+            if offset < self._visible_rows and index < total:
+                if iid in self._detached:
+                    self.tree.move(iid, "", offset)
+                    self._detached.discard(iid)
+                item = self._items[index]
+                key = self.key_func(item)
+                self._render_row(iid, key, item)
+                if key == self._selected_key:
+                    selected_iid = iid
+            elif iid not in self._detached:
+                # 数据不足一屏时把多余的条目暂时摘下，等待复用
+                self.tree.detach(iid)
+                self._detached.add(iid)
+                self._rendered.pop(iid, None)
+
+        current = self.tree.selection()
+        if selected_iid is None:
+            if current:
+                self.tree.selection_remove(*current)
+        elif current != (selected_iid,):
+            self.tree.selection_set(selected_iid)
+
+        if total:
+            first = self._top / total
+            last = min(1.0, (self._top + self._visible_rows) / total)
+        else:
+            first, last = 0.0, 1.0
+        self.v_scrollbar.set(first, last)
+
+        view = (id(self._items), self._top, total)
+        if self._scroll_callbacks and self._notified_view != view:
+            self._notified_view = view
+            for callback in self._scroll_callbacks:
+                callback()
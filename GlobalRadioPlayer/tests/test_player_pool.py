@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from player_pool import PlayerPool  # noqa: E402
+
+
+class _NullWriter:
+    def write_json(self, *args, **kwargs):
+        pass
+
+
+class _FakePlayer:
+    """只记录调用顺序的播放器；play_stream会阻塞到gate被设置，模拟连接很慢的电台"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def play_stream(self, url, station_id=None, fallback_urls=()):
+        self.calls.append(("play", url))
+        self.gate.wait(5)
+        return 0
+
+    def stop(self):
+        self.calls.append(("stop",))
+
+    def pause(self):
+        self.calls.append(("pause",))
+
+    def resume(self):
+        self.calls.append(("resume",))
+
+    def release(self):
+        self.calls.append(("release",))
+
+
+class PlayerPoolScheduleTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = PlayerPool(config_path=None, writer=_NullWriter())
+        self.player = _FakePlayer()
+        self.pool.add_zone("default", self.player)
+
+    def tearDown(self):
+        self.player.gate.set()
+        self.pool._executor.shutdown(wait=True)
+
+    def _start_slow_play(self, url="http://a"):
+        """开始一个阻塞中的播放操作，返回其Future"""
+        self.player.gate.clear()
+        future = self.pool.play("default", url)
+        for _ in range(500):
+            if self.player.calls:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.player.calls, [("play", url)])
+        return future
+
+    def test_stop_then_resume_behind_slow_play_keeps_stop(self):
+        play = self._start_slow_play()
+        stop = self.pool.stop("default")
+        resume = self.pool.resume("default")
+        self.player.gate.set()
+        self.assertEqual(play.result(5), 0)
+        stop.result(5)
+        resume.result(5)
+        self.assertFalse(stop.cancelled())
+        self.assertEqual(self.player.calls, [("play", "http://a"), ("stop",), ("resume",)])
+
+    def test_pause_does_not_replace_pending_play(self):
+        self._start_slow_play()
+        play_b = self.pool.play("default", "http://b")
+        pause = self.pool.pause("default")
+        self.player.gate.set()
+        self.assertEqual(play_b.result(5), 0)
+        pause.result(5)
+        self.assertEqual(self.player.calls, [("play", "http://a"), ("play", "http://b"), ("pause",)])
+
+    def test_pending_play_is_replaced_by_newer_play(self):
+        self._start_slow_play()
+        play_b = self.pool.play("default", "http://b")
+        play_c = self.pool.play("default", "http://c")
+        self.player.gate.set()
+        self.assertEqual(play_c.result(5), 0)
+        self.assertTrue(play_b.cancelled())
+        self.assertEqual(self.player.calls, [("play", "http://a"), ("play", "http://c")])
+
+    def test_pause_and_resume_replace_each_other(self):
+        self._start_slow_play()
+        pause = self.pool.pause("default")
+        resume = self.pool.resume("default")
+        self.player.gate.set()
+        resume.result(5)
+        self.assertTrue(pause.cancelled())
+        self.assertEqual(self.player.calls, [("play", "http://a"), ("resume",)])
+
+
+if __name__ == "__main__":
+    unittest.main()